@@ -10,6 +10,9 @@ try:
 except ImportError:
     logging.warning("未安装playwright，某些功能可能无法使用")
 
+from app.core.helpers.form_helper import FormHelper
+from app.core.helpers.result_detector import SubmissionResultDetector
+
 logger = logging.getLogger(__name__)
 
 class BrowserHelper:
@@ -22,6 +25,7 @@ class BrowserHelper:
         self.context = None
         self.page = None
         self.max_retries = 3
+        self.timeout = 60000  # 默认60秒超时
         
         # 常用的用户代理字符串列表
         self.user_agents = [
@@ -74,7 +78,7 @@ class BrowserHelper:
             )
             
             # 设置超时
-            self.context.set_default_timeout(60000)  # 60秒
+            self.context.set_default_timeout(self.timeout)
             
             # 创建新页面
             self.page = await self.context.new_page()
@@ -183,7 +187,7 @@ class BrowserHelper:
             )
             
             # 设置超时
-            self.context.set_default_timeout(60000)
+            self.context.set_default_timeout(self.timeout)
             
             # 创建新页面
             self.page = await self.context.new_page()
@@ -247,29 +251,12 @@ class BrowserHelper:
                 logger.error(f"表单选择器 {form_selector} 不可见")
                 return False
             
-            # 填写表单字段
-            for field_selector, value in field_values.items():
-                logger.info(f"填写字段: {field_selector}, 值: {value}...")
-                
-                # 确保字段可见并可交互
-                try:
-                    await self.page.wait_for_selector(field_selector, state="visible", timeout=10000)
-                    
-                    # 先清空字段
-                    await self.page.fill(field_selector, "")
-                    
-                    # 随机化输入延迟，更像人类
-                    await asyncio.sleep(random.uniform(0.1, 0.5))
-                    
-                    # 输入值
-                    await self.page.fill(field_selector, value)
-                    
-                    # 随机化输入后延迟
-                    await asyncio.sleep(random.uniform(0.3, 1.0))
-                    
-                except Exception as e:
-                    logger.error(f"填写字段 {field_selector} 出错: {str(e)}")
-                    return False
+            # 填写表单字段（默认批量填写，配置了模拟人工填写的网站逐个填写并停顿）
+            statuses = await FormHelper(self.page).fill_fields(field_values)
+            failed = [selector for selector, status in statuses.items() if status != "filled"]
+            if failed:
+                logger.error(f"填写字段 {', '.join(failed)} 出错")
+                return False
             
             logger.info("表单填写成功")
             
@@ -284,15 +271,23 @@ class BrowserHelper:
             # 提交表单
             logger.info("准备提交表单...")
             
+            # 点击前安装监听，点击后等待导航、页面提示或请求响应中最先出现的信号
+            detector = SubmissionResultDetector(self.page, timeout=self.timeout / 1000)
+            await detector.arm(form_selector)
+            
             if submit_button_selector:
                 logger.info(f"找到提交按钮: {submit_button_selector}")
                 
                 # 等待按钮可用
-                await self.page.wait_for_selector(submit_button_selector, state="visible", timeout=10000)
-                
-                # 点击提交按钮
-                logger.info("点击提交按钮...")
-                await self.page.click(submit_button_selector)
+                try:
+                    await self.page.wait_for_selector(submit_button_selector, state="visible", timeout=10000)
+                    
+                    # 点击提交按钮
+                    logger.info("点击提交按钮...")
+                    await self.page.click(submit_button_selector)
+                except Exception:
+                    detector.disarm()
+                    raise
             else:
                 # 尝试常见的提交按钮选择器
                 submit_selectors = [
@@ -321,72 +316,21 @@ class BrowserHelper:
                         pass
                 
                 if not submitted:
+                    detector.disarm()
                     logger.error("未找到可点击的提交按钮")
                     return False
             
-            # 等待提交完成，检查成功条件或错误提示
-            # 注意：这里需要根据实际网站定制成功/失败的检测方式
-            try:
-                # 等待页面变化或导航完成
-                logger.info("等待表单提交结果...")
-                
-                # 监测常见的提交成功指示
-                success_selectors = [
-                    "text='Thank you'", 
-                    "text='提交成功'",
-                    "text='已收到'",
-                    "text='Success'",
-                    ".success-message",
-                    ".thank-you-page",
-                    "[class*='success']"
-                ]
-                
-                # 监测常见的错误消息
-                error_selectors = [
-                    ".error-message", 
-                    "[class*='error']",
-                    "text='failed'",
-                    "text='错误'",
-                    "text='Error'"
-                ]
-                
-                # 先等待页面加载完成
-                await asyncio.sleep(2)
-                
-                # 检查是否有成功消息
-                for selector in success_selectors:
-                    try:
-                        success = await self.page.is_visible(selector, timeout=3000)
-                        if success:
-                            logger.info(f"检测到成功消息: {selector}")
-                            # 保存成功截图
-                            await self.page.screenshot(path=f"logs/submission_success_{int(time.time())}.png")
-                            return True
-                    except Exception:
-                        pass
-                
-                # 检查是否有错误消息
-                for selector in error_selectors:
-                    try:
-                        error = await self.page.is_visible(selector, timeout=3000)
-                        if error:
-                            error_text = await self.page.text_content(selector)
-                            logger.error(f"表单提交错误: {error_text}")
-                            # 保存错误截图
-                            await self.page.screenshot(path=f"logs/submission_error_{int(time.time())}.png")
-                            return False
-                    except Exception:
-                        pass
-                
-                # 如果没有明确的成功或错误指示，则认为提交可能成功
-                logger.info("未检测到明确的成功或错误消息，假定提交已成功")
-                await self.page.screenshot(path=f"logs/submission_result_{int(time.time())}.png")
-                return True
-                
-            except PlaywrightTimeoutError:
-                logger.error("提交表单超时")
-                await self.page.screenshot(path=f"logs/submission_timeout_{int(time.time())}.png")
-                return False
+            # 等待提交结果，页面一有反应即返回
+            logger.info("等待表单提交结果...")
+            success, message = await detector.wait()
+            
+            # 保存结果截图
+            if not success:
+                logger.error(f"表单提交错误: {message}")
+                await self.page.screenshot(path=f"logs/submission_error_{int(time.time())}.png")
+            else:
+                await self.page.screenshot(path=f"logs/submission_success_{int(time.time())}.png")
+            return success
             
         except Exception as e:
             logger.error(f"提交表单失败: {str(e)}")
@@ -0,0 +1,301 @@
+import functools
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+# 字段语义及其中英文同义词
+FIELD_SYNONYMS: Dict[str, List[str]] = {
+    "name": ["name", "fullname", "full_name", "title", "product_name", "tool_name", "app_name",
+             "姓名", "名字", "名称", "产品名", "工具名", "标题"],
+    "email": ["email", "mail", "e-mail", "contact_email", "邮箱", "电子邮件", "联系邮箱"],
+    "url": ["url", "website", "web_site", "site", "link", "homepage", "home_page", "domain",
+            "网址", "链接", "网站", "产品网址", "主页"],
+    "description": ["description", "desc", "about", "details", "summary", "overview", "content",
+                    "简介", "描述", "介绍", "产品描述", "详情"],
+    "category": ["category", "categories", "type", "industry", "类别", "分类", "产品类别", "类型"],
+    "price": ["price", "pricing", "cost", "plan", "价格", "费用", "价钱", "定价"],
+    "features": ["features", "feature", "功能", "特点", "特性"],
+    "logo": ["logo", "icon", "image", "screenshot", "thumbnail", "avatar", "图标", "标志", "图片", "截图"],
+    "tags": ["tags", "tag", "keywords", "keyword", "标签", "关键词"],
+    "message": ["message", "comment", "note", "notes", "remarks", "留言", "信息", "备注", "消息"],
+}
+
+# 有格式要求的语义只能填入这些类型的字段（文本区域除外）
+_CONCEPT_INPUT_TYPES: Dict[str, Set[str]] = {
+    "email": {"email", "text"},
+    "url": {"url", "text"},
+    "logo": {"file", "url", "text"},
+}
+
+# 只能填入特定语义的字段类型
+_RESTRICTED_INPUT_TYPES: Dict[str, Set[str]] = {
+    "email": {"email"},
+    "url": {"url"},
+    "file": {"logo"},
+    "tel": set(),
+    "password": set(),
+    "number": {"price"},
+    "date": set(),
+    "checkbox": set(),
+    "radio": set(),
+}
+
+# 不能单独说明字段含义的常见词
+_GENERIC_TOKENS = {"product", "tool", "your", "the", "a", "of", "field", "input", "form", "app", "ai", "enter",
+                   "please", "产品", "工具", "请输入", "输入"}
+
+_CAMEL_RE = re.compile(r"([a-z0-9])([A-Z])")
+_ASCII_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_CJK_RE = re.compile(r"[一-鿿]+")
+
+# 各来源文字的可信度：name/id最可靠，其次是标签，再次是placeholder
+_SOURCE_WEIGHTS = (("key", 0.85), ("label", 0.75), ("placeholder", 0.6))
+
+# 每个匹配器缓存的文字分析结果条数上限
+_PROFILE_CACHE_SIZE = 4096
+
+
+def _normalize(text: str) -> str:
+    """统一大小写和分隔符，productName、product-name和product_name相同"""
+    return "_".join(_tokenize_ascii(text))
+
+
+def _tokenize_ascii(text: str) -> List[str]:
+    return _ASCII_TOKEN_RE.findall(_CAMEL_RE.sub(r"\1 \2", text or "").lower())
+
+
+class _Profile:
+    """一段文字对应的词和语义"""
+
+    __slots__ = ("tokens", "concepts")
+
+    def __init__(self, tokens: Set[str], concepts: Set[str]):
+        self.tokens = tokens
+        self.concepts = concepts
+
+
+class FieldMatcher:
+    """按打分矩阵和全局最优分配把用户数据映射到表单字段
+
+    同义词索引在创建时构建一次；每个表单字段和用户字段只分析一次，
+    之后对所有字段对打分，用匈牙利算法求总分最高的一一对应，同一个值不会被分配两次。
+    """
+
+    def __init__(self, synonyms: Optional[Dict[str, List[str]]] = None, min_confidence: float = 0.35):
+        """初始化匹配器
+
+        Args:
+            synonyms: 字段语义及其同义词，默认使用FIELD_SYNONYMS
+            min_confidence: 低于该置信度的映射会被丢弃
+        """
+        self.synonyms = synonyms or FIELD_SYNONYMS
+        self.min_confidence = min_confidence
+
+        # 英文同义词按词建索引，多词同义词（如full_name）按整体建索引；中文同义词编译为一个正则
+        self._token_index: Dict[str, Set[str]] = {}
+        self._phrase_index: Dict[str, Set[str]] = {}
+        cjk_words: Dict[str, Set[str]] = {}
+        for concept, words in self.synonyms.items():
+            for word in list(words) + [concept]:
+                if _CJK_RE.search(word):
+                    cjk_words.setdefault(word, set()).add(concept)
+                    continue
+                normalized = _normalize(word)
+                index = self._phrase_index if "_" in normalized else self._token_index
+                index.setdefault(normalized, set()).add(concept)
+        self._cjk_index = cjk_words
+        self._cjk_re = re.compile("|".join(sorted(map(re.escape, cjk_words), key=len, reverse=True))) \
+            if cjk_words else None
+
+        # 匹配器长期复用，缓存只保留最近分析过的文字
+        self._profile = functools.lru_cache(maxsize=_PROFILE_CACHE_SIZE)(self._analyze)
+
+    def _analyze(self, text: str) -> _Profile:
+        """分析一段文字中的词和语义，经由带缓存的self._profile调用"""
+        tokens = set(_tokenize_ascii(text))
+        concepts: Set[str] = set()
+        for token in tokens:
+            concepts |= self._token_index.get(token, set())
+        normalized = _normalize(text)
+        for phrase, phrase_concepts in self._phrase_index.items():
+            if phrase in normalized:
+                concepts |= phrase_concepts
+        if self._cjk_re is not None:
+            for match in self._cjk_re.findall(text or ""):
+                concepts |= self._cjk_index[match]
+                tokens.add(match)
+        tokens -= _GENERIC_TOKENS
+
+        return _Profile(tokens, concepts)
+
+    def _field_profiles(self, field: Dict[str, str]) -> List[Tuple[_Profile, float]]:
+        key_text = " ".join(filter(None, [field.get("name", ""), field.get("id", "")]))
+        sources = {
+            "key": key_text,
+            "label": field.get("label", ""),
+            "placeholder": field.get("placeholder", ""),
+        }
+        return [(self._profile(sources[source]), weight) for source, weight in _SOURCE_WEIGHTS if sources[source]]
+
+    def score(self, user_key: str, field: Dict[str, str]) -> float:
+        """计算用户字段与表单字段的匹配置信度（0到1）"""
+        return self._score(self._profile(user_key), _normalize(user_key), field, self._field_profiles(field))
+
+    def _score(self, user_profile: _Profile, user_normalized: str,
+               field: Dict[str, str], field_profiles: List[Tuple[_Profile, float]]) -> float:
+        # name或id与用户字段名完全相同
+        for attr in ("name", "id"):
+            if field.get(attr) and _normalize(field[attr]) == user_normalized:
+                return 1.0
+
+        field_type = (field.get("type") or "text").lower()
+        if field_type == "select":
+            field_type = "text"
+
+        # 字段类型与用户字段语义不兼容时不匹配（如邮箱框不填网址）
+        restricted = _RESTRICTED_INPUT_TYPES.get(field_type)
+        if restricted is not None and not (restricted & user_profile.concepts):
+            return 0.0
+        for concept in user_profile.concepts:
+            allowed = _CONCEPT_INPUT_TYPES.get(concept)
+            if allowed is not None and field_type not in allowed and field_type != "textarea":
+                return 0.0
+
+        best = 0.0
+        for profile, weight in field_profiles:
+            score = 0.0
+            if user_profile.concepts and profile.concepts:
+                shared = user_profile.concepts & profile.concepts
+                if shared:
+                    # 语义越专一越可信
+                    score = weight * len(shared) / len(user_profile.concepts | profile.concepts) ** 0.5
+            if user_profile.tokens and profile.tokens:
+                overlap = len(user_profile.tokens & profile.tokens)
+                if overlap:
+                    jaccard = overlap / len(user_profile.tokens | profile.tokens)
+                    score = max(score, weight * (0.5 + 0.5 * jaccard))
+            best = max(best, score)
+
+        if best and field_type in ("email", "url") and field_type in user_profile.concepts:
+            best += 0.15
+        if best and field_type == "textarea" and user_profile.concepts & {"description", "message", "features"}:
+            best += 0.1
+        return min(best, 1.0)
+
+    def score_matrix(self, user_keys: Sequence[str], form_fields: Sequence[Dict[str, str]]) -> List[List[float]]:
+        """计算所有用户字段×表单字段的置信度矩阵"""
+        user_profiles = [(self._profile(key), _normalize(key)) for key in user_keys]
+        matrix = []
+        for field in form_fields:
+            field_profiles = self._field_profiles(field)
+            matrix.append([self._score(profile, normalized, field, field_profiles)
+                           for profile, normalized in user_profiles])
+        return matrix
+
+    def match(self, user_keys: Iterable[str], form_fields: Sequence[Dict[str, str]]) -> List[Dict[str, object]]:
+        """求用户字段到表单字段的全局最优一一映射
+
+        Args:
+            user_keys: 用户数据的字段名
+            form_fields: 表单字段（FormHelper.get_form_fields的结果）
+
+        Returns:
+            映射列表，每项包含selector、field_index、user_key和confidence，按表单字段顺序排列
+        """
+        user_keys = list(user_keys)
+        if not user_keys or not form_fields:
+            return []
+
+        matrix = self.score_matrix(user_keys, form_fields)
+        # 低于阈值的字段对不参与分配，避免为凑满一一对应而产生错误映射
+        weights = [[score if score >= self.min_confidence else 0.0 for score in row] for row in matrix]
+
+        matches = []
+        for field_index, user_index in assign_max_weight(weights):
+            confidence = matrix[field_index][user_index]
+            if confidence < self.min_confidence:
+                continue
+            matches.append({
+                "selector": form_fields[field_index].get("selector", ""),
+                "field_index": field_index,
+                "user_key": user_keys[user_index],
+                "confidence": round(confidence, 3),
+            })
+        matches.sort(key=lambda item: item["field_index"])
+        return matches
+
+
+def assign_max_weight(weights: List[List[float]]) -> List[Tuple[int, int]]:
+    """求权重矩阵的最大权重一一分配（匈牙利算法，O(n²m)）
+
+    Args:
+        weights: rows×cols的权重矩阵，可以不是方阵
+
+    Returns:
+        (行, 列) 列表，每行、每列最多出现一次
+    """
+    if not weights or not weights[0]:
+        return []
+    rows, cols = len(weights), len(weights[0])
+    transposed = rows > cols
+    if transposed:
+        weights = [list(column) for column in zip(*weights)]
+        rows, cols = cols, rows
+
+    # 最小化代价 = -权重；u、v为势，p[j]为第j列分配到的行（1起始，0表示未分配）
+    inf = float("inf")
+    u = [0.0] * (rows + 1)
+    v = [0.0] * (cols + 1)
+    p = [0] * (cols + 1)
+    way = [0] * (cols + 1)
+    for i in range(1, rows + 1):
+        p[0] = i
+        j0 = 0
+        minv = [inf] * (cols + 1)
+        used = [False] * (cols + 1)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            cost_row = weights[i0 - 1]
+            ui0 = u[i0]
+            delta = inf
+            j1 = 0
+            for j in range(1, cols + 1):
+                if not used[j]:
+                    current = -cost_row[j - 1] - ui0 - v[j]
+                    if current < minv[j]:
+                        minv[j] = current
+                        way[j] = j0
+                    if minv[j] < delta:
+                        delta = minv[j]
+                        j1 = j
+            for j in range(cols + 1):
+                if used[j]:
+                    u[p[j]] += delta
+                    v[j] -= delta
+                else:
+                    minv[j] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        while True:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+            if j0 == 0:
+                break
+
+    pairs = [(p[j] - 1, j - 1) for j in range(1, cols + 1) if p[j]]
+    if transposed:
+        pairs = [(col, row) for row, col in pairs]
+    return sorted(pairs)
+
+
+_default_matcher: Optional[FieldMatcher] = None
+
+
+def get_field_matcher() -> FieldMatcher:
+    """获取共享的字段匹配器，同义词索引只构建一次"""
+    global _default_matcher
+    if _default_matcher is None:
+        _default_matcher = FieldMatcher()
+    return _default_matcher
@@ -0,0 +1,49 @@
+import os
+import random
+from typing import Optional
+
+from submitAI.domain_scheduler import extract_domain
+
+
+class FillProfile:
+    """目录网站的表单填写方式
+
+    默认一次性批量填写全部字段；对检测输入节奏的网站，逐个字段填写并在字段之间随机停顿。
+    """
+
+    def __init__(self, human_pacing: bool = False, min_delay: float = 0.3, max_delay: float = 1.0):
+        """初始化填写方式
+
+        Args:
+            human_pacing: 是否模拟人工逐个填写
+            min_delay: 字段之间的最短停顿秒数
+            max_delay: 字段之间的最长停顿秒数
+        """
+        self.human_pacing = human_pacing
+        self.min_delay = min_delay
+        self.max_delay = max(min_delay, max_delay)
+
+    def delay(self) -> float:
+        """字段之间的停顿秒数"""
+        return random.uniform(self.min_delay, self.max_delay)
+
+
+def get_fill_profile(url: Optional[str]) -> FillProfile:
+    """获取目录网站的填写方式，配置来自环境变量
+
+    HUMAN_PACING_DOMAINS列出需要模拟人工填写的域名（逗号分隔，包含子域名）。
+
+    Args:
+        url: 表单页面地址
+
+    Returns:
+        填写方式
+    """
+    domains = [d.strip().lower() for d in os.getenv("HUMAN_PACING_DOMAINS", "").split(",") if d.strip()]
+    domain = extract_domain(url or "")
+    human_pacing = any(domain == d or domain.endswith("." + d) for d in domains)
+    return FillProfile(
+        human_pacing=human_pacing,
+        min_delay=float(os.getenv("HUMAN_PACING_MIN_DELAY", "0.3")),
+        max_delay=float(os.getenv("HUMAN_PACING_MAX_DELAY", "1.0")),
+    )
@@ -6,18 +6,347 @@ from typing import Dict, List, Tuple, Optional, Any
 
 # 假设使用playwright
 try:
-    from playwright.async_api import Page, TimeoutError as PlaywrightTimeoutError
+    from playwright.async_api import Page
 except ImportError:
     logging.warning("未安装playwright，某些功能可能无法使用")
 
+from submitAI.form_distiller import DEFAULT_MAX_TOKENS, distill_form_html
+from app.core.helpers.field_matcher import get_field_matcher
+from app.core.helpers.fill_profile import FillProfile, get_fill_profile
+from app.core.helpers.result_detector import SubmissionResultDetector
+
 logger = logging.getLogger(__name__)
 
+# 页面脚本共用的可见性判断和选择器生成函数
+_DOM_HELPERS = """
+    const unique = (selector) => {
+        try {
+            return document.querySelectorAll(selector).length === 1;
+        } catch (e) {
+            return false;
+        }
+    };
+    const text = (el) => (el ? (el.innerText || el.textContent || "") : "").replace(/\\s+/g, " ").trim();
+    const isVisible = (el) => {
+        const style = window.getComputedStyle(el);
+        return style.visibility !== "hidden" && style.display !== "none" &&
+            !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+    };
+
+    // 从最近的带唯一ID的祖先开始，用nth-of-type定位
+    const cssPath = (el) => {
+        const parts = [];
+        let node = el;
+        while (node && node.nodeType === 1 && node !== document.documentElement) {
+            if (node.id && unique("#" + CSS.escape(node.id))) {
+                parts.unshift("#" + CSS.escape(node.id));
+                break;
+            }
+            const tag = node.tagName.toLowerCase();
+            let index = 1;
+            let sibling = node;
+            while ((sibling = sibling.previousElementSibling)) {
+                if (sibling.tagName === node.tagName) index++;
+            }
+            parts.unshift(`${tag}:nth-of-type(${index})`);
+            node = node.parentElement;
+        }
+        return parts.join(" > ");
+    };
+
+    // 依次尝试ID、name、name加value，都不唯一时使用路径
+    const bestSelector = (el) => {
+        const tag = el.tagName.toLowerCase();
+        if (el.id && unique("#" + CSS.escape(el.id))) return "#" + CSS.escape(el.id);
+        const name = el.getAttribute("name");
+        if (name) {
+            const byName = `${tag}[name="${CSS.escape(name)}"]`;
+            if (unique(byName)) return byName;
+            const value = el.getAttribute("value");
+            if (value !== null) {
+                const byValue = `${byName}[value="${CSS.escape(value)}"]`;
+                if (unique(byValue)) return byValue;
+            }
+        }
+        return cssPath(el);
+    };
+"""
+
+# 在页面中一次性收集表单结构的脚本，参数为表单选择器
+FORM_SNAPSHOT_SCRIPT = """(formSelector) => {
+    const form = document.querySelector(formSelector);
+    if (!form) return null;
+""" + _DOM_HELPERS + """
+    const labelText = (el) => {
+        if (el.labels && el.labels.length) {
+            return Array.from(el.labels).map(text).filter(Boolean).join(" ");
+        }
+        const labelledBy = el.getAttribute("aria-labelledby");
+        if (labelledBy) {
+            const label = labelledBy.split(/\\s+/).map((id) => text(document.getElementById(id))).join(" ").trim();
+            if (label) return label;
+        }
+        return el.getAttribute("aria-label") || el.getAttribute("title") || "";
+    };
+
+    const fields = [];
+    const elements = form.querySelectorAll(
+        "input:not([type='hidden']):not([type='submit']):not([type='button']):not([type='reset']), textarea, select"
+    );
+    for (const el of elements) {
+        const tag = el.tagName.toLowerCase();
+        const field = {
+            tag: tag,
+            type: tag === "input" ? (el.getAttribute("type") || "text").toLowerCase() : tag,
+            name: el.getAttribute("name") || "",
+            id: el.id || "",
+            placeholder: el.getAttribute("placeholder") || "",
+            required: el.required || el.getAttribute("aria-required") === "true",
+            label: labelText(el),
+            visible: isVisible(el),
+            disabled: el.disabled,
+            selector: bestSelector(el),
+        };
+        if (el.maxLength > 0) field.maxlength = el.maxLength;
+        if (field.type === "checkbox" || field.type === "radio") {
+            field.value = el.getAttribute("value") || "";
+            field.checked = el.checked;
+        }
+        if (tag === "select") {
+            field.multiple = el.multiple;
+            field.options = Array.from(el.options).map((option) => ({
+                value: option.getAttribute("value") || "",
+                text: text(option),
+            }));
+        }
+        fields.push(field);
+    }
+
+    const buttons = [];
+    for (const el of form.querySelectorAll("button, input[type='submit']")) {
+        const type = (el.getAttribute("type") || "submit").toLowerCase();
+        if (type !== "submit") continue;
+        buttons.push({
+            selector: bestSelector(el),
+            text: el.tagName === "INPUT" ? (el.value || "") : text(el),
+            visible: isVisible(el),
+        });
+    }
+
+    return {
+        selector: formSelector,
+        action: form.getAttribute("action") || "",
+        method: (form.getAttribute("method") || "get").toLowerCase(),
+        fields: fields,
+        buttons: buttons,
+    };
+}"""
+
+# 在页面中一次性找出所有候选表单并打分排序的脚本，参数为额外的候选选择器列表
+FORM_DISCOVERY_SCRIPT = """(extraSelectors) => {
+""" + _DOM_HELPERS + """
+    const FIELD_SELECTOR = "input:not([type='hidden']):not([type='submit']):not([type='button'])" +
+        ":not([type='reset']):not([type='image']), textarea, select";
+    const SUBMIT_SELECTOR = "button:not([type='button']):not([type='reset']), input[type='submit'], [role='button']";
+    const STRONG_KEYWORDS = ["submit your", "submit a tool", "submit tool", "add your", "add a tool", "add tool",
+        "list your", "submit product", "submit ai", "submit website", "提交工具", "提交产品", "提交网站", "收录"];
+    const WEAK_KEYWORDS = ["submit", "tool", "product", "website", "url", "description", "提交", "工具", "产品", "网址"];
+    const NEGATIVE_KEYWORDS = ["search", "newsletter", "subscribe", "login", "log in", "sign in", "password",
+        "comment", "搜索", "订阅", "登录"];
+
+    const candidates = new Set(document.querySelectorAll("form, [role='form']"));
+    for (const selector of extraSelectors) {
+        try {
+            document.querySelectorAll(selector).forEach((el) => candidates.add(el));
+        } catch (e) {
+            // 忽略页面不支持的选择器
+        }
+    }
+
+    // 不在<form>中的字段：取包含至少两个可见字段的最近祖先作为表单容器
+    for (const field of document.querySelectorAll(FIELD_SELECTOR)) {
+        if (field.closest("form") || !isVisible(field)) continue;
+        let node = field.parentElement;
+        while (node && node !== document.body) {
+            if (Array.from(node.querySelectorAll(FIELD_SELECTOR)).filter(isVisible).length >= 2) {
+                candidates.add(node);
+                break;
+            }
+            node = node.parentElement;
+        }
+    }
+
+    const ranked = [];
+    for (const el of candidates) {
+        if (el === document.body || el === document.documentElement || !isVisible(el)) continue;
+        const fields = Array.from(el.querySelectorAll(FIELD_SELECTOR)).filter(isVisible);
+        if (!fields.length) continue;
+
+        const submits = Array.from(el.querySelectorAll(SUBMIT_SELECTOR)).filter(isVisible);
+        const haystack = [
+            el.id, el.className, el.getAttribute("action"), el.getAttribute("name"),
+            text(el).slice(0, 2000),
+        ].join(" ").toLowerCase();
+
+        let score = Math.min(fields.length, 15) * 2;
+        if (submits.length) score += 5;
+        if (el.tagName === "FORM") score += 3;
+        if (el.querySelector("textarea")) score += 3;
+        if (el.querySelector("input[type='url'], input[name*='url' i], input[name*='website' i]")) score += 4;
+        if (STRONG_KEYWORDS.some((keyword) => haystack.includes(keyword))) score += 10;
+        score += Math.min(WEAK_KEYWORDS.filter((keyword) => haystack.includes(keyword)).length, 5);
+        score -= Math.min(NEGATIVE_KEYWORDS.filter((keyword) => haystack.includes(keyword)).length, 3) * 4;
+        if (fields.length === 1 && fields[0].matches("input[type='search'], input[name*='search' i], input[name='q']")) {
+            score -= 15;
+        }
+        if (el.querySelector("input[type='password']")) score -= 8;
+
+        ranked.push({
+            selector: bestSelector(el),
+            tag: el.tagName.toLowerCase(),
+            score: score,
+            field_count: fields.length,
+            has_submit: submits.length > 0,
+            element: el,
+        });
+    }
+
+    // 外层容器和内层表单包含相同字段时只保留内层
+    const result = ranked.filter((item) => !ranked.some((other) =>
+        other !== item && item.element.contains(other.element) && other.field_count === item.field_count));
+    result.sort((a, b) => b.score - a.score || a.field_count - b.field_count);
+    return result.map(({ element, ...item }) => item);
+}"""
+
+# 返回选择器列表中第一个可见元素的选择器
+FIRST_VISIBLE_SCRIPT = """(selectors) => {
+""" + _DOM_HELPERS + """
+    for (const selector of selectors) {
+        let el = null;
+        try {
+            el = document.querySelector(selector);
+        } catch (e) {
+            el = null;
+        }
+        if (el && isVisible(el)) return selector;
+    }
+    return null;
+}"""
+
+# 一次性填写多个字段并触发input/change事件，参数为[{selector, value}]列表，
+# 返回每个选择器的结果：filled、missing、hidden、error:原因，或unsupported:类型（需用Playwright填写）
+FILL_FIELDS_SCRIPT = """(entries) => {
+""" + _DOM_HELPERS + """
+    const TRUTHY = ["true", "yes", "1", "on", "checked"];
+    const fire = (el, type) => el.dispatchEvent(new Event(type, { bubbles: true }));
+
+    // 使用原型上的setter赋值，React等框架才能感知到值的变化
+    const setValue = (el, value) => {
+        const proto = el.tagName === "TEXTAREA" ? HTMLTextAreaElement.prototype :
+            el.tagName === "SELECT" ? HTMLSelectElement.prototype : HTMLInputElement.prototype;
+        const setter = Object.getOwnPropertyDescriptor(proto, "value").set;
+        setter.call(el, value);
+    };
+
+    const selectOption = (el, value) => {
+        const wanted = String(value).split(el.multiple ? "," : "\\u0000").map((v) => v.trim().toLowerCase());
+        let matched = false;
+        for (const option of el.options) {
+            const hit = wanted.includes(option.value.toLowerCase()) || wanted.includes(text(option).toLowerCase());
+            if (el.multiple) {
+                option.selected = hit;
+            } else if (hit && !matched) {
+                setValue(el, option.value);
+            }
+            matched = matched || hit;
+        }
+        return matched;
+    };
+
+    const results = {};
+    for (const { selector, value } of entries) {
+        let el = null;
+        try {
+            el = document.querySelector(selector);
+        } catch (e) {
+            results[selector] = "error:" + e.message;
+            continue;
+        }
+        if (!el) {
+            results[selector] = "missing";
+            continue;
+        }
+        if (!isVisible(el)) {
+            results[selector] = "hidden";
+            continue;
+        }
+
+        const tag = el.tagName.toLowerCase();
+        const type = tag === "input" ? (el.type || "text") : tag;
+        try {
+            if (type === "file" || (tag !== "input" && tag !== "textarea" && tag !== "select")) {
+                results[selector] = "unsupported:" + type;
+                continue;
+            }
+            if (type === "checkbox" || type === "radio") {
+                // 原生点击会切换状态并触发click、input和change事件
+                const checked = type === "radio" || TRUTHY.includes(String(value).toLowerCase());
+                if (el.checked !== checked) el.click();
+                results[selector] = "filled";
+                continue;
+            }
+            el.focus();
+            if (type === "select") {
+                if (!selectOption(el, value)) {
+                    results[selector] = "error:no matching option";
+                    continue;
+                }
+            } else {
+                setValue(el, String(value));
+                fire(el, "input");
+            }
+            fire(el, "change");
+            el.blur();
+            results[selector] = "filled";
+        } catch (e) {
+            results[selector] = "error:" + e.message;
+        }
+    }
+    return results;
+}"""
+
+# 一次性查询多个字段的类型和可见性，参数为选择器列表
+FIELD_STATE_SCRIPT = """(selectors) => {
+    const states = {};
+    for (const selector of selectors) {
+        let el = null;
+        try {
+            el = document.querySelector(selector);
+        } catch (e) {
+            el = null;
+        }
+        if (!el) {
+            states[selector] = null;
+            continue;
+        }
+        const style = window.getComputedStyle(el);
+        states[selector] = {
+            // 下拉菜单的el.type是select-one，统一使用标签名
+            type: el.tagName === "INPUT" ? (el.type || "text") : el.tagName.toLowerCase(),
+            visible: style.visibility !== "hidden" && style.display !== "none" &&
+                !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length),
+        };
+    }
+    return states;
+}"""
+
 class FormHelper:
     """提供高级表单分析和处理功能的助手类"""
     
     def __init__(self, page: Any):
         self.page = page
         self.timeout = 60000  # 默认60秒超时
+        self.form_wait_timeout = 10000  # 等待表单出现的最长时间（毫秒）
         
         # 安全的CSS选择器，不使用:contains这种非标准选择器
         self.form_selectors = [
@@ -30,6 +359,15 @@ class FormHelper:
             "[id*='form']"
         ]
         
+        # 可能包含表单的容器
+        self.container_selectors = [
+            "div[class*='form']",
+            "div[id*='form']",
+            "section[class*='form']",
+            "div[class*='contact']",
+            "section[class*='contact']"
+        ]
+        
         # 提交按钮的安全选择器
         self.submit_button_selectors = [
             "button[type='submit']",
@@ -40,167 +378,93 @@ class FormHelper:
             "button.primary"
         ]
     
+    async def rank_forms(self) -> List[Dict[str, Any]]:
+        """一次页面脚本调用找出所有候选表单并按可能性排序
+        
+        候选包括<form>、role=form、常用表单选择器匹配的元素，以及包含多个可见字段的容器。
+        按可见字段数、提交按钮和“submit your tool”等关键词打分，搜索框、登录和订阅表单减分。
+        
+        Returns:
+            按分数从高到低排列的候选列表，每项包含selector、tag、score、field_count和has_submit
+        """
+        started = time.monotonic()
+        try:
+            ranked = await self.page.evaluate(FORM_DISCOVERY_SCRIPT,
+                                              self.form_selectors + self.container_selectors)
+        except Exception as e:
+            logger.error(f"查找候选表单时出错: {str(e)}")
+            return []
+        
+        logger.info(f"找到 {len(ranked)} 个候选表单，耗时 {(time.monotonic() - started) * 1000:.0f} 毫秒")
+        return ranked
+    
     async def find_form(self) -> Optional[str]:
         """查找页面中的表单，返回有效的表单选择器"""
         logger.info("开始查找表单选择器...")
         
-        # 首先检查常见的表单选择器
-        for selector in self.form_selectors:
-            try:
-                logger.info(f"尝试选择器: {selector}")
-                # 检查表单是否存在且可见
-                is_visible = await self.page.is_visible(selector, timeout=5000)
-                if is_visible:
-                    logger.info(f"找到可见的表单元素: {selector}")
-                    
-                    # 检查表单中的输入字段数量
-                    field_count = await self.count_form_fields(selector)
-                    logger.info(f"表单包含 {field_count} 个输入字段")
-                    
-                    # 如果表单中有输入字段，可能是有效的表单
-                    if field_count > 0:
-                        return selector
-                else:
-                    logger.info(f"找到表单但不可见: {selector}")
-            except Exception as e:
-                logger.info(f"选择器 {selector} 检查出错: {str(e)}")
-        
-        # 如果常见选择器都找不到，尝试查找包含表单的容器
-        container_selectors = [
-            "div[class*='form']",
-            "div[id*='form']",
-            "section[class*='form']",
-            "div[class*='contact']",
-            "section[class*='contact']"
-        ]
-        
-        for container in container_selectors:
-            try:
-                container_visible = await self.page.is_visible(container, timeout=3000)
-                if container_visible:
-                    logger.info(f"在容器 {container} 中找到表单")
-                    # 在容器中查找表单
-                    for form in self.form_selectors:
-                        form_selector = f"{container} {form}"
-                        try:
-                            form_visible = await self.page.is_visible(form_selector, timeout=3000)
-                            if form_visible:
-                                logger.info(f"找到表单选择器: {form_selector}")
-                                return form_selector
-                        except Exception:
-                            pass
-            except Exception:
-                pass
+        for candidate in await self.rank_forms():
+            if candidate["score"] > 0:
+                logger.info(f"找到表单选择器: {candidate['selector']}（得分 {candidate['score']}，"
+                            f"{candidate['field_count']} 个字段）")
+                return candidate["selector"]
         
         logger.error("未找到可见的表单元素")
         return None
     
-    async def count_form_fields(self, form_selector: str) -> int:
-        """计算表单中的输入字段数量"""
-        try:
-            input_count = await self.page.locator(f"{form_selector} input:not([type='hidden']):not([type='submit']):not([type='button']):not([type='reset'])").count()
-            textarea_count = await self.page.locator(f"{form_selector} textarea").count()
-            select_count = await self.page.locator(f"{form_selector} select").count()
+    async def snapshot_form(self, form_selector: str) -> Optional[Dict[str, Any]]:
+        """一次页面脚本调用获取表单的完整结构
+        
+        返回表单中每个可交互字段的类型、name、id、placeholder、必填、标签文字、
+        选项和唯一的CSS选择器，以及提交按钮。字段按文档顺序排列。
+        
+        Args:
+            form_selector: 表单选择器
             
-            return input_count + textarea_count + select_count
+        Returns:
+            包含fields和buttons的字典，找不到表单时返回None
+        """
+        started = time.monotonic()
+        try:
+            snapshot = await self.page.evaluate(FORM_SNAPSHOT_SCRIPT, form_selector)
         except Exception as e:
-            logger.error(f"计算表单字段数量时出错: {str(e)}")
-            return 0
+            logger.error(f"获取表单快照时出错: {str(e)}")
+            return None
+        
+        if snapshot:
+            logger.info(f"表单快照包含 {len(snapshot['fields'])} 个字段，"
+                        f"耗时 {(time.monotonic() - started) * 1000:.0f} 毫秒")
+        return snapshot
     
-    async def get_form_fields(self, form_selector: str) -> List[Dict[str, str]]:
+    async def get_form_fields(self, form_selector: str) -> List[Dict[str, Any]]:
         """获取表单中所有可交互字段的信息"""
         logger.info("开始获取表单字段信息...")
-        fields = []
+        snapshot = await self.snapshot_form(form_selector)
+        if not snapshot:
+            return []
         
+        fields = snapshot["fields"]
+        logger.info(f"表单字段信息已保存，找到 {len(fields)} 个字段")
+        return fields
+    
+    async def get_distilled_form(self, form_selector: Optional[str] = None,
+                                 max_tokens: int = DEFAULT_MAX_TOKENS) -> str:
+        """获取精简后的表单字段清单，用于发送给模型分析
+        
+        与AI客户端的表单分析使用相同的精简格式，只保留字段、标签、选项和约束。
+        未指定表单选择器时精简整个页面。
+        """
         try:
-            # 查找所有输入字段
-            input_fields = await self.page.locator(f"{form_selector} input:not([type='hidden']):not([type='submit']):not([type='button']):not([type='reset'])").all()
-            
-            for field in input_fields:
-                try:
-                    field_info = {}
-                    field_info["type"] = await field.get_attribute("type") or "text"
-                    field_info["name"] = await field.get_attribute("name") or ""
-                    field_info["id"] = await field.get_attribute("id") or ""
-                    field_info["placeholder"] = await field.get_attribute("placeholder") or ""
-                    field_info["required"] = await field.get_attribute("required") is not None
-                    field_info["selector"] = await self.get_best_selector(field)
-                    
-                    fields.append(field_info)
-                except Exception as e:
-                    logger.error(f"获取字段信息时出错: {str(e)}")
-            
-            # 查找文本区域
-            textarea_fields = await self.page.locator(f"{form_selector} textarea").all()
-            for field in textarea_fields:
-                try:
-                    field_info = {}
-                    field_info["type"] = "textarea"
-                    field_info["name"] = await field.get_attribute("name") or ""
-                    field_info["id"] = await field.get_attribute("id") or ""
-                    field_info["placeholder"] = await field.get_attribute("placeholder") or ""
-                    field_info["required"] = await field.get_attribute("required") is not None
-                    field_info["selector"] = await self.get_best_selector(field)
-                    
-                    fields.append(field_info)
-                except Exception as e:
-                    logger.error(f"获取文本区域信息时出错: {str(e)}")
-            
-            # 查找下拉菜单
-            select_fields = await self.page.locator(f"{form_selector} select").all()
-            for field in select_fields:
-                try:
-                    field_info = {}
-                    field_info["type"] = "select"
-                    field_info["name"] = await field.get_attribute("name") or ""
-                    field_info["id"] = await field.get_attribute("id") or ""
-                    field_info["required"] = await field.get_attribute("required") is not None
-                    field_info["selector"] = await self.get_best_selector(field)
-                    
-                    # 获取选项
-                    options = await self.page.locator(f"{field_info['selector']} option").all()
-                    field_info["options"] = []
-                    for option in options:
-                        try:
-                            option_value = await option.get_attribute("value") or ""
-                            option_text = await option.inner_text()
-                            field_info["options"].append({"value": option_value, "text": option_text})
-                        except Exception:
-                            pass
-                    
-                    fields.append(field_info)
-                except Exception as e:
-                    logger.error(f"获取下拉菜单信息时出错: {str(e)}")
-            
-            logger.info(f"表单字段信息已保存，找到 {len(fields)} 个字段")
-            return fields
+            html = await self.page.evaluate("""(selector) => {
+                const root = selector ? document.querySelector(selector) : document.body;
+                return root ? root.outerHTML : "";
+            }""", form_selector)
         except Exception as e:
-            logger.error(f"获取表单字段时出错: {str(e)}")
-            return []
-    
-    async def get_best_selector(self, element: Any) -> str:
-        """为元素生成最佳CSS选择器"""
-        # 首先尝试使用ID
-        element_id = await element.get_attribute("id")
-        if element_id:
-            return f"#{element_id}"
-        
-        # 然后尝试使用name属性
-        element_name = await element.get_attribute("name")
-        if element_name:
-            tag_name = await element.evaluate("el => el.tagName.toLowerCase()")
-            return f"{tag_name}[name='{element_name}']"
-        
-        # 最后使用其他唯一属性或者组合属性
-        element_class = await element.get_attribute("class")
-        if element_class:
-            classes = element_class.strip().split()
-            if classes:
-                tag_name = await element.evaluate("el => el.tagName.toLowerCase()")
-                return f"{tag_name}.{classes[0]}"
-        
-        # 无法生成简单选择器时，返回一个相对路径
-        return await element.evaluate("el => CSS.escape(el.tagName.toLowerCase())")
+            logger.error(f"获取表单HTML时出错: {str(e)}")
+            return ""
+        
+        summary = distill_form_html(html or "", max_tokens)
+        logger.info(f"表单HTML {len(html or '')} 字符，精简为 {len(summary)} 字符")
+        return summary
     
     async def find_submit_button(self, form_selector: str) -> Optional[str]:
         """查找表单的提交按钮"""
@@ -276,177 +540,176 @@ class FormHelper:
         return None
     
     async def map_form_fields(self, user_data: Dict[str, str], form_fields: List[Dict[str, str]]) -> Dict[str, str]:
-        """智能映射用户数据到表单字段"""
+        """智能映射用户数据到表单字段
+        
+        对所有表单字段×用户字段打分后求全局最优的一一映射，同一个值不会填入两个字段。
+        """
         logger.info(f"开始智能映射表单数据, 用户提供字段数: {len(user_data)}, 表单字段数: {len(form_fields)}")
         
-        mapped_data = {}
-        
-        # 定义常见的字段类型和关键词
-        field_types = {
-            "name": ["name", "fullname", "full_name", "full-name", "姓名", "名字", "名称", "产品名", "product_name", "product-name", "tool_name", "tool-name"],
-            "email": ["email", "mail", "e-mail", "邮箱", "电子邮件", "联系邮箱", "contact_email", "contact-email"],
-            "url": ["url", "website", "web_site", "web-site", "site", "网址", "链接", "网站", "产品网址", "product_url", "product-url", "homepage", "home-page"],
-            "description": ["description", "desc", "简介", "描述", "介绍", "产品描述", "product_description", "product-description", "about", "content"],
-            "category": ["category", "类别", "分类", "产品类别", "product_category", "product-category", "type", "类型"],
-            "price": ["price", "pricing", "价格", "费用", "价钱", "product_price", "product-price"],
-            "features": ["features", "功能", "特点", "特性", "product_features", "product-features"],
-            "logo": ["logo", "图标", "标志", "product_logo", "product-logo", "icon", "图片", "image"],
-            "tags": ["tags", "标签", "关键词", "keywords", "product_tags", "product-tags"],
-            "message": ["message", "留言", "信息", "备注", "消息", "content", "内容"]
-        }
+        started = time.monotonic()
+        matches = get_field_matcher().match(user_data.keys(), form_fields)
+        mapped_data = {match["selector"]: user_data[match["user_key"]] for match in matches if match["selector"]}
         
-        # 对每个表单字段，尝试找到最匹配的用户数据
-        for form_field in form_fields:
-            field_name = form_field.get("name", "").lower()
-            field_id = form_field.get("id", "").lower()
-            field_placeholder = form_field.get("placeholder", "").lower()
-            field_type = form_field.get("type", "").lower()
-            field_selector = form_field.get("selector", "")
-            
-            # 根据字段属性猜测字段类型
-            guessed_type = None
-            
-            # 按字段类型优先匹配
-            if field_type == "email" or "email" in field_name or "email" in field_id or "email" in field_placeholder:
-                guessed_type = "email"
-            elif "url" in field_name or "url" in field_id or "website" in field_name or "website" in field_id or "链接" in field_placeholder:
-                guessed_type = "url"
-            elif "name" in field_name or "name" in field_id or "姓名" in field_placeholder:
-                guessed_type = "name"
-            elif "desc" in field_name or "desc" in field_id or "介绍" in field_placeholder or "description" in field_name:
-                guessed_type = "description"
-            elif "categ" in field_name or "categ" in field_id or "类别" in field_placeholder:
-                guessed_type = "category"
-            elif "price" in field_name or "price" in field_id or "价格" in field_placeholder:
-                guessed_type = "price"
-            elif "tag" in field_name or "tag" in field_id or "标签" in field_placeholder or "keyword" in field_name:
-                guessed_type = "tags"
-            elif field_type == "textarea":
-                guessed_type = "description"
-            
-            # 对于每个表单字段，尝试在用户数据中找到最匹配的
-            best_match = None
-            for user_key, user_value in user_data.items():
-                user_key_lower = user_key.lower()
-                
-                # 精确匹配
-                if (field_name and field_name == user_key_lower) or (field_id and field_id == user_key_lower):
-                    logger.info(f"精确匹配字段: {user_key} -> {field_selector}")
-                    best_match = user_key
-                    break
-                
-                # 部分匹配 (字段名称包含用户键或用户键包含字段名称)
-                if not best_match and ((field_name and (field_name in user_key_lower or user_key_lower in field_name)) or 
-                    (field_id and (field_id in user_key_lower or user_key_lower in field_id))):
-                    logger.info(f"部分匹配字段: {user_key} -> {field_selector} (通过 name)")
-                    best_match = user_key
-                    continue
-                
-                # 类型匹配 (如果我们猜测出了字段类型，检查用户键是否属于同一类型)
-                if not best_match and guessed_type:
-                    for key_word in field_types.get(guessed_type, []):
-                        if key_word in user_key_lower:
-                            logger.info(f"部分匹配字段: {user_key} -> {field_selector} (通过 field)")
-                            best_match = user_key
-                            break
-                    if best_match:
-                        continue
-                
-                # 对于email类型，特殊处理
-                if not best_match and field_type == "email" and "email" in user_key_lower:
-                    logger.info(f"部分匹配字段: {user_key} -> {field_selector} (通过 email)")
-                    best_match = user_key
-                    continue
-            
-            # 如果找到了匹配项，将用户数据映射到表单字段
-            if best_match:
-                mapped_data[field_selector] = user_data[best_match]
-            # 如果是email字段但没找到匹配，可以尝试特殊处理
-            elif field_type == "email" and "email" in user_data:
-                mapped_data[field_selector] = user_data["email"]
-            
-        logger.info(f"表单映射完成, 原始字段数: {len(user_data)}, 映射后字段数: {len(mapped_data)}")
+        logger.info(f"表单映射完成, 原始字段数: {len(user_data)}, 映射后字段数: {len(mapped_data)}, "
+                    f"耗时 {(time.monotonic() - started) * 1000:.1f} 毫秒")
         
         # 输出映射结果
-        for field, value in mapped_data.items():
-            logger.info(f"映射字段: {field} -> {value}")
+        for match in matches:
+            logger.info(f"映射字段: {match['user_key']} -> {match['selector']} (置信度 {match['confidence']})")
         
         return mapped_data
     
-    async def fill_form(self, form_selector: str, field_data: Dict[str, str]) -> bool:
-        """填写表单字段"""
-        logger.info("开始填写表单...")
-        logger.info(f"等待表单元素加载，尝试多种选择器，超时时间{self.timeout//1000}秒...")
-        
-        # 尝试不同的表单选择器
+    async def _wait_for_form(self, form_selector: str) -> Optional[str]:
+        """返回第一个可见的表单选择器，都不可见时等待指定的表单出现"""
         form_selectors_to_try = [form_selector, "form", ".form", "#contact-form", ".contact-form"]
-        found_form = False
+        try:
+            visible = await self.page.evaluate(FIRST_VISIBLE_SCRIPT, form_selectors_to_try)
+            if visible:
+                return visible
+            
+            # 页面可能仍在渲染，只等待指定的表单，页面上没有表单时不会等满整个超时
+            wait_timeout = min(self.timeout, self.form_wait_timeout)
+            logger.info(f"等待表单元素加载，超时时间{wait_timeout//1000}秒...")
+            await self.page.wait_for_selector(form_selector, state="visible", timeout=wait_timeout)
+            return form_selector
+        except Exception as e:
+            logger.error(f"等待表单 {form_selector} 时出错: {str(e)}")
+            return None
+    
+    async def _fill_field(self, field_selector: str, value: str, field_type: Optional[str]) -> None:
+        """用Playwright操作填写单个字段"""
+        if field_type == "select":
+            # 处理下拉菜单
+            await self.page.select_option(field_selector, value)
+        elif field_type == "checkbox":
+            # 处理复选框
+            if value.lower() in ["true", "yes", "1", "on"]:
+                await self.page.check(field_selector)
+            else:
+                await self.page.uncheck(field_selector)
+        elif field_type == "radio":
+            # 处理单选按钮
+            await self.page.check(field_selector)
+        elif field_type == "file":
+            # 文件字段的值是本地文件路径
+            await self.page.set_input_files(field_selector, value)
+        else:
+            # 处理文本区域和常规输入字段
+            await self.page.fill(field_selector, value)
+    
+    async def fill_fields(self, field_data: Dict[str, str], url: Optional[str] = None) -> Dict[str, str]:
+        """填写多个字段
         
-        for selector in form_selectors_to_try:
+        默认在一次页面脚本调用中设置全部文本、下拉、复选和单选字段的值，并触发前端框架需要的
+        input和change事件；脚本无法处理的字段（如文件上传）再逐个用Playwright填写。
+        网站配置了模拟人工填写时，逐个字段填写并随机停顿。
+        
+        Args:
+            field_data: 字段选择器到值的映射
+            url: 表单页面地址，用于选择填写方式，默认使用当前页面地址
+            
+        Returns:
+            字段选择器到填写结果的映射：filled、missing、hidden或error
+        """
+        if not field_data:
+            return {}
+        profile = get_fill_profile(url or self.page.url)
+        started = time.monotonic()
+        
+        if profile.human_pacing:
+            statuses = await self._fill_fields_paced(field_data, profile)
+        else:
+            statuses = await self.page.evaluate(
+                FILL_FIELDS_SCRIPT,
+                [{"selector": selector, "value": value} for selector, value in field_data.items()]
+            )
+            # 脚本无法设置的字段逐个填写
+            for field_selector, status in statuses.items():
+                if status.startswith("unsupported:"):
+                    try:
+                        await self._fill_field(field_selector, field_data[field_selector], status.split(":", 1)[1])
+                        statuses[field_selector] = "filled"
+                    except Exception as e:
+                        logger.error(f"填写字段 {field_selector} 时出错: {str(e)}")
+                        statuses[field_selector] = "error"
+        
+        for field_selector, status in statuses.items():
+            if status == "filled":
+                logger.info(f"填写字段: {field_selector}, 值: {field_data[field_selector]}...")
+            elif status in ("missing", "hidden"):
+                logger.warning(f"未找到字段: {field_selector}")
+            else:
+                logger.error(f"填写字段 {field_selector} 失败: {status}")
+        logger.info(f"填写 {len(field_data)} 个字段耗时 {(time.monotonic() - started) * 1000:.0f} 毫秒"
+                    f"{'（模拟人工填写）' if profile.human_pacing else ''}")
+        return statuses
+    
+    async def _fill_fields_paced(self, field_data: Dict[str, str], profile: FillProfile) -> Dict[str, str]:
+        """逐个字段填写，字段之间随机停顿"""
+        # 一次性查出所有字段的类型和可见性
+        field_states = await self.page.evaluate(FIELD_STATE_SCRIPT, list(field_data))
+        statuses = {}
+        for field_selector, value in field_data.items():
+            state = field_states.get(field_selector)
+            if not state:
+                statuses[field_selector] = "missing"
+                continue
+            if not state.get("visible"):
+                statuses[field_selector] = "hidden"
+                continue
             try:
-                logger.info(f"尝试选择器: {selector}")
-                is_visible = await self.page.is_visible(selector, timeout=10000)
-                if is_visible:
-                    logger.info(f"找到表单元素，使用选择器: {selector}")
-                    found_form = True
-                    
-                    # 在表单中填写字段
-                    for field_selector, value in field_data.items():
-                        try:
-                            # 查看字段是否存在
-                            field_exists = await self.page.is_visible(field_selector, timeout=5000)
-                            if field_exists:
-                                field_type = await self.page.evaluate(f"""
-                                    () => {{
-                                        const el = document.querySelector("{field_selector}");
-                                        if (!el) return null;
-                                        return el.type || el.tagName.toLowerCase();
-                                    }}
-                                """)
-                                
-                                logger.info(f"填写字段: {field_selector}, 类型: {field_type}, 值: {value}...")
-                                
-                                # 根据字段类型处理
-                                if field_type == "select" or field_type == "SELECT":
-                                    # 处理下拉菜单
-                                    await self.page.select_option(field_selector, value)
-                                elif field_type == "checkbox":
-                                    # 处理复选框
-                                    if value.lower() in ["true", "yes", "1", "on"]:
-                                        await self.page.check(field_selector)
-                                    else:
-                                        await self.page.uncheck(field_selector)
-                                elif field_type == "radio":
-                                    # 处理单选按钮
-                                    await self.page.check(field_selector)
-                                elif field_type == "textarea" or field_type == "TEXTAREA":
-                                    # 处理文本区域
-                                    await self.page.fill(field_selector, value)
-                                else:
-                                    # 处理常规输入字段
-                                    await self.page.fill(field_selector, value)
-                                
-                                # 随机延迟，模拟人类操作
-                                await asyncio.sleep(0.5)
-                                
-                            else:
-                                logger.warning(f"未找到字段: {field_selector}")
-                        except Exception as e:
-                            logger.error(f"填写字段 {field_selector} 时出错: {str(e)}")
-                    
-                    logger.info("表单填写成功")
-                    return True
-                else:
-                    logger.info(f"选择器 {selector} 未找到表单元素，尝试下一个")
+                await self._fill_field(field_selector, value, state.get("type"))
+                statuses[field_selector] = "filled"
             except Exception as e:
-                logger.error(f"使用选择器 {selector} 填写表单时出错: {str(e)}")
+                logger.error(f"填写字段 {field_selector} 时出错: {str(e)}")
+                statuses[field_selector] = "error"
+            await asyncio.sleep(profile.delay())
+        return statuses
+    
+    async def fill_form(self, form_selector: str, field_data: Dict[str, str]) -> bool:
+        """填写表单字段
+        
+        映射得到的字段可能包含页面上不存在或隐藏的可选字段，这些字段失败时只记录；
+        没有任何字段填写成功，或必填字段填写失败时返回False。
+        """
+        logger.info("开始填写表单...")
         
-        if not found_form:
+        selector = await self._wait_for_form(form_selector)
+        if not selector:
             logger.error("无法找到或填写表单")
             return False
+        logger.info(f"找到表单元素，使用选择器: {selector}")
+        
+        try:
+            statuses = await self.fill_fields(field_data)
+        except Exception as e:
+            logger.error(f"使用选择器 {selector} 填写表单时出错: {str(e)}")
+            return False
+        
+        failed = [field_selector for field_selector, status in statuses.items() if status != "filled"]
+        filled = len(statuses) - len(failed)
+        logger.info(f"表单填写完成: {filled} 个字段成功，{len(failed)} 个字段失败")
+        if field_data and not filled:
+            logger.error("没有任何字段填写成功")
+            return False
+        
+        if failed:
+            snapshot = await self.snapshot_form(selector)
+            required = {field["selector"] for field in (snapshot or {}).get("fields", []) if field.get("required")}
+            failed_required = [field_selector for field_selector in failed if field_selector in required]
+            if failed_required:
+                logger.error(f"必填字段 {', '.join(failed_required)} 填写失败")
+                return False
+        
+        logger.info("表单填写成功")
+        return True
     
     async def submit_form(self, form_selector: str, wait_for_navigation: bool = True) -> Tuple[bool, str]:
-        """提交表单并处理结果"""
+        """提交表单并处理结果
+        
+        wait_for_navigation为True时，页面在截止时间内没有任何反应视为提交超时；
+        为False时没有明确指示则假定成功。
+        """
         try:
             # 检查是否存在验证码
             captcha_detected = await self.check_captcha()
@@ -464,32 +727,20 @@ class FormHelper:
             
             logger.info(f"找到提交按钮: {submit_button}")
             
+            # 点击前安装监听，点击后等待导航、页面提示或请求响应中最先出现的信号
+            detector = SubmissionResultDetector(self.page, timeout=self.timeout / 1000)
+            await detector.arm(form_selector)
+            
             # 点击提交按钮
             logger.info("点击提交按钮...")
-            
-            # 准备监听导航事件
-            if wait_for_navigation:
-                # 使用Promise.race获取先发生的事件
-                navigation_promise = self.page.wait_for_navigation(timeout=self.timeout, wait_until="domcontentloaded")
-                
-                # 点击提交按钮
-                await self.page.click(submit_button)
-                
-                try:
-                    # 等待导航完成
-                    await navigation_promise
-                    logger.info("表单提交后导航完成")
-                except PlaywrightTimeoutError:
-                    logger.error(f"提交表单超时: Timeout {self.timeout}ms exceeded.")
-                    return False, "提交超时"
-            else:
-                # 直接点击提交按钮，不等待导航
+            try:
                 await self.page.click(submit_button)
-                # 等待一段时间让客户端处理
-                await asyncio.sleep(3)
+            except Exception:
+                detector.disarm()
+                raise
             
-            # 检查提交结果
-            success, message = await self.check_submission_result()
+            # 检查提交结果；要求导航时，页面一直没有反应视为超时
+            success, message = await detector.wait(assume_success=not wait_for_navigation)
             
             return success, message
             
@@ -498,74 +749,9 @@ class FormHelper:
             return False, str(e)
     
     async def check_submission_result(self) -> Tuple[bool, str]:
-        """检查表单提交结果"""
+        """检查表单提交结果（一次页面脚本调用，不等待）"""
         try:
-            # 等待页面稳定
-            await asyncio.sleep(2)
-            
-            # 检查常见的成功消息
-            success_selectors = [
-                "text='Thank you'", 
-                "text='Thanks'",
-                "text='Success'",
-                "text='Submitted'",
-                "text='Received'",
-                "text='提交成功'",
-                "text='谢谢'",
-                "text='已收到'",
-                ".success",
-                ".success-message",
-                ".thank-you",
-                ".confirmation"
-            ]
-            
-            for selector in success_selectors:
-                try:
-                    success = await self.page.is_visible(selector, timeout=3000)
-                    if success:
-                        message = await self.page.text_content(selector)
-                        logger.info(f"检测到成功消息: {message}")
-                        return True, message or "提交成功"
-                except Exception:
-                    pass
-            
-            # 检查常见的错误消息
-            error_selectors = [
-                ".error", 
-                ".error-message",
-                "[class*='error']",
-                "text='Error'",
-                "text='Failed'",
-                "text='错误'",
-                "text='失败'"
-            ]
-            
-            for selector in error_selectors:
-                try:
-                    error = await self.page.is_visible(selector, timeout=3000)
-                    if error:
-                        message = await self.page.text_content(selector)
-                        logger.error(f"检测到错误消息: {message}")
-                        return False, message or "提交失败"
-                except Exception:
-                    pass
-            
-            # 没有明确指示时，查看URL变化
-            current_url = self.page.url
-            if "thank" in current_url or "success" in current_url or "confirmation" in current_url:
-                logger.info(f"从URL判断提交成功: {current_url}")
-                return True, "根据URL判断提交成功"
-            
-            # 检查页面标题中是否包含感谢词
-            title = await self.page.title()
-            if "thank" in title.lower() or "success" in title.lower() or "confirmation" in title.lower():
-                logger.info(f"从标题判断提交成功: {title}")
-                return True, "根据标题判断提交成功"
-            
-            # 默认返回假定成功，因为部分网站可能没有明确的成功提示
-            logger.info("未检测到明确的成功或失败指示，假定提交成功")
-            return True, "未检测到明确结果，假定成功"
-        
+            return await SubmissionResultDetector(self.page).check_page()
         except Exception as e:
             logger.error(f"检查提交结果时出错: {str(e)}")
             return False, str(e)
@@ -0,0 +1,431 @@
+import asyncio
+import logging
+import time
+import urllib.parse
+from typing import Any, Dict, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 提交结果的默认等待上限（秒），与页面操作的默认超时一致；调用方通常传入自己的页面超时
+DEFAULT_RESULT_TIMEOUT = 60.0
+# 假定成功时，点击后页面没有进行中的请求达到该秒数即结束等待
+DEFAULT_QUIET_WINDOW = 3.0
+# 还有进行中的请求时，重新检查页面是否安静的间隔（秒）
+_QUIET_POLL_INTERVAL = 0.2
+# 视为提交或页面响应的请求类型，图片、样式等静态资源不计
+_TRACKED_RESOURCE_TYPES = ("document", "xhr", "fetch")
+
+SUCCESS_SELECTORS = [".success", ".success-message", ".thank-you", ".thank-you-page", ".confirmation",
+                     ".alert-success", "[class*='success']"]
+ERROR_SELECTORS = [".error", ".error-message", ".alert-danger", ".invalid-feedback", "[class*='error']"]
+# 成功和错误提示都会使用的提示区域（如Bootstrap的alert-success也带role=alert），只按文字判断
+MESSAGE_SELECTORS = ["[role='alert']", "[role='status']", "[aria-live]"]
+SUCCESS_WORDS = ["thank you", "thanks", "success", "submitted", "received", "under review", "pending review",
+                 "提交成功", "谢谢", "感谢", "已收到", "审核中"]
+ERROR_WORDS = ["error", "failed", "invalid", "required", "already exists", "try again",
+               "错误", "失败", "无效", "必填", "已存在"]
+SUCCESS_URL_WORDS = ["thank", "success", "confirmation"]
+
+# 页面脚本共用的文字和可见性判断，以及按选择器和关键词判断一个元素表示成功还是失败
+_CLASSIFY_HELPERS = """
+    const text = (el) => (el ? (el.innerText || el.textContent || "") : "").replace(/\\s+/g, " ").trim();
+    const isVisible = (el) => {
+        const style = window.getComputedStyle(el);
+        return style.visibility !== "hidden" && style.display !== "none" &&
+            !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+    };
+    const matchesAny = (el, selectors) => selectors.some((selector) => {
+        try {
+            return el.matches(selector);
+        } catch (e) {
+            return false;
+        }
+    });
+    // 点击提交前就已显示且文字未变的提示不算新信号
+    const isNew = (el) => {
+        const baseline = window.__submitBaseline;
+        return !baseline || baseline.get(el) !== text(el);
+    };
+    const findVisible = (root, selectors) => {
+        for (const selector of selectors) {
+            let found = [];
+            try {
+                found = root.querySelectorAll(selector);
+            } catch (e) {
+                continue;
+            }
+            for (const el of found) {
+                if (isVisible(el) && text(el) && isNew(el)) return el;
+            }
+        }
+        return null;
+    };
+
+    // 先判断错误再判断成功（unsuccessful中包含success）
+    const classify = (el, config) => {
+        if (!el || el.nodeType !== 1 || !isVisible(el) || !isNew(el)) return null;
+        const content = text(el);
+        if (!content) return null;
+        if (matchesAny(el, config.errorSelectors)) return { kind: "error", message: content.slice(0, 300) };
+        if (matchesAny(el, config.successSelectors)) return { kind: "success", message: content.slice(0, 300) };
+        const inner = findVisible(el, config.errorSelectors);
+        if (inner) return { kind: "error", message: text(inner).slice(0, 300) };
+        const innerSuccess = findVisible(el, config.successSelectors);
+        if (innerSuccess) return { kind: "success", message: text(innerSuccess).slice(0, 300) };
+        // 只对较短的新增文字做关键词判断，避免整页内容误判
+        if (content.length <= 300) {
+            const lower = content.toLowerCase();
+            if (config.errorWords.some((word) => lower.includes(word))) return { kind: "error", message: content };
+            if (config.successWords.some((word) => lower.includes(word))) return { kind: "success", message: content };
+        }
+        return null;
+    };
+"""
+
+# 在点击提交前安装的监听脚本：MutationObserver监视新出现或变为可见的提示，
+# 表单的invalid事件表示浏览器校验未通过，结果写入window.__submitSignal
+INSTALL_OBSERVER_SCRIPT = """(config) => {
+""" + _CLASSIFY_HELPERS + """
+    if (window.__submitObserver) window.__submitObserver.disconnect();
+    window.__submitSignal = null;
+
+    // 记录点击前已显示的提示及其文字
+    window.__submitBaseline = null;
+    const baseline = new Map();
+    for (const selector of config.errorSelectors.concat(config.successSelectors, config.messageSelectors)) {
+        try {
+            document.querySelectorAll(selector).forEach((el) => {
+                if (isVisible(el)) baseline.set(el, text(el));
+            });
+        } catch (e) {
+            // 忽略页面不支持的选择器
+        }
+    }
+    window.__submitBaseline = baseline;
+
+    const report = (signal) => {
+        if (!signal || window.__submitSignal) return;
+        window.__submitSignal = signal;
+        observer.disconnect();
+    };
+
+    const observer = new MutationObserver((mutations) => {
+        for (const mutation of mutations) {
+            if (window.__submitSignal) return;
+            if (mutation.type === "childList") {
+                for (const node of mutation.addedNodes) {
+                    report(classify(node.nodeType === 1 ? node : node.parentElement, config));
+                }
+            } else if (mutation.type === "characterData") {
+                report(classify(mutation.target.parentElement, config));
+            } else {
+                report(classify(mutation.target, config));
+            }
+        }
+    });
+    observer.observe(document.body, {
+        childList: true,
+        subtree: true,
+        characterData: true,
+        attributes: true,
+        attributeFilter: ["class", "style", "hidden", "aria-hidden"],
+    });
+    window.__submitObserver = observer;
+
+    const form = config.formSelector ? document.querySelector(config.formSelector) : null;
+    if (form) {
+        form.addEventListener("invalid", (event) => {
+            const field = event.target;
+            const name = (field.labels && field.labels.length ? text(field.labels[0]) : "") ||
+                field.getAttribute("name") || field.id || "";
+            report({ kind: "invalid", message: `${name}: ${field.validationMessage}` });
+        }, true);
+    }
+    // 返回表单的提交地址（form.action可能被名为action的输入框遮蔽，因此读取属性）
+    if (!form) return "";
+    try {
+        return new URL(form.getAttribute("action") || "", document.baseURI).href;
+    } catch (e) {
+        return "";
+    }
+}"""
+
+# 对整个页面做一次判断，用于导航后的新页面或等待超时时
+CLASSIFY_PAGE_SCRIPT = """(config) => {
+""" + _CLASSIFY_HELPERS + """
+    if (window.__submitSignal) return window.__submitSignal;
+    const error = findVisible(document, config.errorSelectors);
+    if (error) return { kind: "error", message: text(error).slice(0, 300) };
+    const success = findVisible(document, config.successSelectors);
+    if (success) return { kind: "success", message: text(success).slice(0, 300) };
+    // 提示区域和标题的样式类不能说明结果，按其中的文字判断
+    for (const el of document.querySelectorAll(config.messageSelectors.concat(["h1", "h2"]).join(", "))) {
+        const found = classify(el, config);
+        if (found) return found;
+    }
+    const lower = (document.title || "").toLowerCase();
+    if (config.successUrlWords.some((word) => lower.includes(word))) {
+        return { kind: "success", message: "根据标题判断提交成功" };
+    }
+    return null;
+}"""
+
+
+class SubmissionResultDetector:
+    """事件驱动的表单提交结果检测
+
+    在点击提交前调用arm()安装监听，点击后调用wait()。同时等待以下信号，任一信号出现即返回：
+    URL变化（页面导航）、新出现的成功或错误提示、点击后发出的POST请求的响应状态码
+    （包括Formspree等第三方表单服务）、浏览器表单校验失败，以及总的截止时间；
+    假定成功时，页面在点击后安静一段时间也会结束等待。
+
+    用法::
+
+        detector = SubmissionResultDetector(page)
+        await detector.arm(form_selector)
+        await page.click(submit_button)
+        success, message = await detector.wait()
+    """
+
+    def __init__(self, page: Any, timeout: float = DEFAULT_RESULT_TIMEOUT, settle: float = 1.0,
+                 quiet: float = DEFAULT_QUIET_WINDOW):
+        """初始化检测器
+
+        Args:
+            page: Playwright页面
+            timeout: 等待结果的截止秒数
+            settle: 收到成功的响应状态码后，再等待页面提示的秒数
+            quiet: 假定成功时，点击后没有进行中的请求达到该秒数即结束等待
+        """
+        self.page = page
+        self.timeout = timeout
+        self.settle = settle
+        self.quiet = quiet
+
+        self._start_url = ""
+        self._action_url = ""
+        self._navigated: Optional[asyncio.Future] = None
+        self._response: Optional[asyncio.Future] = None
+        self._started: Set[Any] = set()
+        self._inflight: Set[Any] = set()
+        self._last_activity = 0.0
+        self._armed = False
+
+    @property
+    def _config(self) -> Dict[str, Any]:
+        return {
+            "successSelectors": SUCCESS_SELECTORS,
+            "errorSelectors": ERROR_SELECTORS,
+            "messageSelectors": MESSAGE_SELECTORS,
+            "successWords": SUCCESS_WORDS,
+            "errorWords": ERROR_WORDS,
+            "successUrlWords": SUCCESS_URL_WORDS,
+        }
+
+    def _on_frame_navigated(self, frame: Any) -> None:
+        if frame == self.page.main_frame and frame.url != self._start_url and not self._navigated.done():
+            self._navigated.set_result(frame.url)
+
+    def _on_request(self, request: Any) -> None:
+        if request.resource_type not in _TRACKED_RESOURCE_TYPES:
+            return
+        self._started.add(request)
+        self._inflight.add(request)
+        self._last_activity = time.monotonic()
+
+    def _on_request_done(self, request: Any) -> None:
+        if request in self._inflight:
+            self._inflight.discard(request)
+            self._last_activity = time.monotonic()
+
+    def _on_response(self, response: Any) -> None:
+        if self._response.done():
+            return
+        request = response.request
+        # 只关心点击后发出的请求，点击前已在进行的轮询等不算
+        if request not in self._started:
+            return
+        if request.method not in ("POST", "PUT", "PATCH"):
+            return
+        # 第三方请求（如统计脚本）的错误不能说明提交失败；提交到本站或表单action所在站点的才算
+        if response.status >= 400 and not self._is_submit_host(response.url):
+            logger.info(f"忽略第三方请求 {response.url} 的状态码 {response.status}")
+            return
+        self._response.set_result((response.status, response.url))
+
+    def _is_submit_host(self, url: str) -> bool:
+        """请求是否发往本站（含子域名）或表单action所在的站点"""
+        host = urllib.parse.urlparse(url).hostname or ""
+        for site_url in (self._start_url, self._action_url):
+            site = urllib.parse.urlparse(site_url).hostname or ""
+            if site.startswith("www."):
+                site = site[4:]
+            if site and (host == site or host.endswith("." + site)):
+                return True
+        return False
+
+    def _quiet_until(self) -> float:
+        """页面被视为安静的时刻；还有进行中的请求时稍后再检查"""
+        if self._inflight:
+            return time.monotonic() + _QUIET_POLL_INTERVAL
+        return self._last_activity + self.quiet
+
+    async def arm(self, form_selector: Optional[str] = None) -> None:
+        """在点击提交前安装监听
+
+        Args:
+            form_selector: 表单选择器，用于监听浏览器的表单校验失败
+        """
+        loop = asyncio.get_running_loop()
+        self._start_url = self.page.url
+        self._action_url = ""
+        self._navigated = loop.create_future()
+        self._response = loop.create_future()
+        self._started = set()
+        self._inflight = set()
+        self._last_activity = time.monotonic()
+        self.page.on("framenavigated", self._on_frame_navigated)
+        self.page.on("request", self._on_request)
+        self.page.on("requestfinished", self._on_request_done)
+        self.page.on("requestfailed", self._on_request_done)
+        self.page.on("response", self._on_response)
+        self._armed = True
+        try:
+            self._action_url = await self.page.evaluate(INSTALL_OBSERVER_SCRIPT,
+                                                        dict(self._config, formSelector=form_selector)) or ""
+        except Exception as e:
+            # 监听脚本安装失败时仍可依靠导航和响应信号
+            logger.warning(f"安装提交结果监听失败: {str(e)}")
+
+    def disarm(self) -> None:
+        """移除监听"""
+        if self._armed:
+            self.page.remove_listener("framenavigated", self._on_frame_navigated)
+            self.page.remove_listener("request", self._on_request)
+            self.page.remove_listener("requestfinished", self._on_request_done)
+            self.page.remove_listener("requestfailed", self._on_request_done)
+            self.page.remove_listener("response", self._on_response)
+            self._armed = False
+
+    async def _wait_dom_signal(self) -> Dict[str, str]:
+        handle = await self.page.wait_for_function("() => window.__submitSignal", polling="raf",
+                                                   timeout=self.timeout * 1000)
+        return await handle.json_value()
+
+    async def _classify_page(self) -> Optional[Dict[str, str]]:
+        try:
+            return await self.page.evaluate(CLASSIFY_PAGE_SCRIPT, self._config)
+        except Exception as e:
+            logger.warning(f"检查页面提交结果时出错: {str(e)}")
+            return None
+
+    @staticmethod
+    def _result(signal: Dict[str, str]) -> Tuple[bool, str]:
+        if signal["kind"] == "success":
+            logger.info(f"检测到成功消息: {signal['message']}")
+            return True, signal["message"] or "提交成功"
+        if signal["kind"] == "invalid":
+            logger.error(f"表单校验未通过: {signal['message']}")
+            return False, f"表单校验未通过: {signal['message']}"
+        logger.error(f"检测到错误消息: {signal['message']}")
+        return False, signal["message"] or "提交失败"
+
+    async def check_page(self) -> Tuple[bool, str]:
+        """不等待，立即按当前页面判断提交结果，没有明确指示时假定成功"""
+        signal = await self._classify_page()
+        if signal:
+            return self._result(signal)
+        url = self.page.url
+        if any(word in url.lower() for word in SUCCESS_URL_WORDS):
+            logger.info(f"从URL判断提交成功: {url}")
+            return True, "根据URL判断提交成功"
+        logger.info("未检测到明确的成功或失败指示，假定提交成功")
+        return True, "未检测到明确结果，假定成功"
+
+    async def _after_navigation(self, url: str, deadline: float) -> Tuple[bool, str]:
+        """导航后在新页面上判断结果"""
+        try:
+            await self.page.wait_for_load_state("domcontentloaded",
+                                                timeout=max(0.1, deadline - time.monotonic()) * 1000)
+        except Exception:
+            pass
+        signal = await self._classify_page()
+        if signal:
+            return self._result(signal)
+        if any(word in url.lower() for word in SUCCESS_URL_WORDS):
+            logger.info(f"从URL判断提交成功: {url}")
+            return True, "根据URL判断提交成功"
+        logger.info(f"表单提交后导航到 {url}，未检测到错误消息")
+        return True, "表单提交后页面已跳转"
+
+    async def wait(self, assume_success: bool = True) -> Tuple[bool, str]:
+        """等待提交结果
+
+        Args:
+            assume_success: 没有任何信号时是否假定成功；为True时页面安静一段时间即结束，不必等到截止时间
+
+        Returns:
+            (是否成功, 消息)
+        """
+        started = time.monotonic()
+        deadline = started + self.timeout
+        dom_task = asyncio.ensure_future(self._wait_dom_signal())
+        pending = {dom_task, self._navigated, self._response}
+        response_status: Optional[int] = None
+        settle_until = deadline
+        try:
+            while pending:
+                now = time.monotonic()
+                if response_status is not None:
+                    # 服务器已接受请求，短暂等待页面提示后结束
+                    wake = settle_until
+                elif assume_success:
+                    wake = min(deadline, self._quiet_until())
+                else:
+                    wake = deadline
+                if wake <= now:
+                    break
+                done, pending = await asyncio.wait(pending, timeout=wake - now,
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # 到达等待时刻，回到循环开头重新判断是否结束
+                    continue
+
+                if self._navigated in done:
+                    return await self._after_navigation(self._navigated.result(), deadline)
+                if dom_task in done:
+                    try:
+                        signal = dom_task.result()
+                    except Exception:
+                        # 页面跳转销毁了执行上下文或等待超时，交给其他信号
+                        signal = None
+                    if signal:
+                        return self._result(signal)
+                if self._response in done:
+                    response_status, response_url = self._response.result()
+                    settle_until = min(deadline, time.monotonic() + self.settle)
+                    if response_status >= 400:
+                        logger.error(f"提交请求 {response_url} 返回状态码 {response_status}")
+                        signal = await self._classify_page()
+                        if signal and signal["kind"] != "success":
+                            return self._result(signal)
+                        return False, f"服务器返回错误状态码 {response_status}"
+
+            if response_status is not None:
+                logger.info(f"提交请求返回状态码 {response_status}，未检测到错误消息")
+                return True, f"服务器已接受提交（状态码 {response_status}）"
+
+            # 截止或页面安静时没有任何信号，最后检查一次整个页面
+            signal = await self._classify_page()
+            if signal:
+                return self._result(signal)
+            if assume_success:
+                logger.info("未检测到明确的成功或失败指示，假定提交成功")
+                return True, "未检测到明确结果，假定成功"
+            logger.error(f"提交表单超时: {self.timeout:.0f} 秒内页面没有反应")
+            return False, "提交超时"
+        finally:
+            dom_task.cancel()
+            await asyncio.gather(dom_task, return_exceptions=True)
+            self.disarm()
+            logger.info(f"提交结果检测耗时 {(time.monotonic() - started) * 1000:.0f} 毫秒")
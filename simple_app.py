@@ -1,4 +1,4 @@
-from fastapi import FastAPI, Request, Form, File, UploadFile, BackgroundTasks
+from fastapi import FastAPI, Request, Form, File, UploadFile
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
@@ -8,16 +8,19 @@ import os
 import uuid
 import shutil
 from datetime import datetime, timedelta
-import json
 from typing import List, Optional
+import asyncio
 from dotenv import load_dotenv
 import re
 
 # 加载环境变量
 load_dotenv()
 
-# 导入提交处理器
-from submitAI import SubmissionProcessor
+# 导入任务队列和工作进程
+from submitAI.job_queue import JobQueue
+from submitAI.submission_store import SubmissionStore
+from submitAI.worker import WorkerSupervisor, recover_orphaned_submissions
+from submitAI.usage_tracker import get_usage_tracker
 
 # 确保目录存在
 os.makedirs("app/web/static", exist_ok=True)
@@ -28,19 +31,51 @@ os.makedirs("uploads", exist_ok=True)
 os.makedirs("uploads/logos", exist_ok=True)
 os.makedirs("uploads/screenshots", exist_ok=True)
 
-# 获取 Grok API 密钥
-GROK_API_KEY = os.getenv("GROK_API_KEY")
+# 随Web服务启动的工作进程数，设置为0时需单独运行 python -m submitAI.worker
+SUBMISSION_WORKERS = int(os.getenv("SUBMISSION_WORKERS", "1"))
 
 # 创建应用
 app = FastAPI(title="自动化产品提交工具 - 简化版")
 
+# 提交状态存储（SQLite），JSON文件仅作兼容导出
+submission_store = SubmissionStore()
+
+# 提交任务队列，由独立的工作进程消费
+job_queue = JobQueue()
+
+# LLM调用用量，由工作进程写入
+usage_tracker = get_usage_tracker()
+worker_supervisor = None
+
+async def supervise_workers():
+    """定期检查工作进程，意外退出时自动重启"""
+    while True:
+        await asyncio.sleep(5)
+        worker_supervisor.check()
+
+# 添加启动事件处理器
+@app.on_event("startup")
+async def startup_event():
+    """应用启动时恢复中断的提交并拉起工作进程"""
+    global worker_supervisor
+    # 恢复上次异常退出时中断的提交
+    recovered = await asyncio.to_thread(recover_orphaned_submissions, submission_store, job_queue)
+    if recovered:
+        print(f"已恢复 {recovered} 个中断的提交")
+    
+    if SUBMISSION_WORKERS > 0:
+        worker_supervisor = WorkerSupervisor(SUBMISSION_WORKERS, job_queue.db_path)
+        worker_supervisor.start()
+        asyncio.create_task(supervise_workers())
+        print(f"已启动 {SUBMISSION_WORKERS} 个提交工作进程")
+
 # 添加关闭事件处理器
 @app.on_event("shutdown")
 async def shutdown_event():
     """应用关闭时清理资源"""
     print("正在关闭应用，清理资源...")
-    if submission_processor:
-        await submission_processor.shutdown()
+    if worker_supervisor:
+        await asyncio.to_thread(worker_supervisor.stop)
     print("资源清理完成")
 
 # 设置静态文件目录
@@ -53,9 +88,6 @@ app.mount("/logs", StaticFiles(directory="logs"), name="logs")
 # 设置模板目录
 templates = Jinja2Templates(directory="app/web/templates")
 
-# 创建提交处理器实例（使用OpenAI API密钥）
-submission_processor = SubmissionProcessor(openai_api_key=GROK_API_KEY)
-
 # 模拟存储
 submissions = {}
 
@@ -158,9 +190,9 @@ async def submit(
     # 存储提交
     submissions[submission_id] = submission
     
-    # 保存到文件
-    with open(f"submissions/{submission_id}.json", "w", encoding="utf-8") as f:
-        json.dump(submission, f, indent=2, ensure_ascii=False)
+    # 保存到存储，并导出兼容的JSON文件
+    submission_store.save_submission(submission)
+    submission_store.export_json(submission_id)
     
     # 重定向到提交列表
     return RedirectResponse(url="/submissions", status_code=303)
@@ -168,14 +200,8 @@ async def submit(
 @app.get("/submissions", response_class=HTMLResponse)
 async def list_submissions(request: Request):
     """提交列表页面"""
-    # 从文件加载所有提交
-    all_submissions = []
-    for file in Path("submissions").glob("*.json"):
-        with open(file, "r", encoding="utf-8") as f:
-            all_submissions.append(json.load(f))
-    
-    # 按创建时间排序（最新的在前面）
-    all_submissions.sort(key=lambda x: x["created_at"], reverse=True)
+    # 从存储加载所有提交（按创建时间排序，最新的在前面）
+    all_submissions = submission_store.list_submissions()
     
     return templates.TemplateResponse(
         "submissions.html", 
@@ -185,19 +211,17 @@ async def list_submissions(request: Request):
 @app.get("/submission/{submission_id}", response_class=HTMLResponse)
 async def view_submission(request: Request, submission_id: str):
     """查看提交详情"""
-    # 从文件加载提交
-    try:
-        with open(f"submissions/{submission_id}.json", "r", encoding="utf-8") as f:
-            submission = json.load(f)
-    except:
-        submission = None
+    # 从存储加载提交
+    submission = submission_store.get_submission(submission_id)
     
     if not submission:
         return RedirectResponse(url="/submissions")
     
+    usage = await asyncio.to_thread(usage_tracker.summary, submission_id)
+    
     return templates.TemplateResponse(
         "submission_detail.html", 
-        {"request": request, "user": None, "submission": submission}
+        {"request": request, "user": None, "submission": submission, "usage": usage}
     )
 
 @app.get("/submission/{submission_id}/logs", response_class=HTMLResponse)
@@ -205,13 +229,12 @@ async def view_submission_logs(request: Request, submission_id: str):
     """查看提交处理日志"""
     # 加载提交信息
     try:
-        with open(f"submissions/{submission_id}.json", "r", encoding="utf-8") as f:
-            submission = json.load(f)
-    except FileNotFoundError:
-        print(f"错误: 提交文件 submissions/{submission_id}.json 未找到.")
-        return RedirectResponse(url="/submissions")
+        submission = submission_store.get_submission(submission_id)
     except Exception as e:
-        print(f"读取提交文件 submissions/{submission_id}.json 时发生错误: {str(e)}")
+        print(f"读取提交 {submission_id} 时发生错误: {str(e)}")
+        return RedirectResponse(url="/submissions")
+    if submission is None:
+        print(f"错误: 提交 {submission_id} 未找到.")
         return RedirectResponse(url="/submissions")
     
     all_logs = []
@@ -228,23 +251,33 @@ async def view_submission_logs(request: Request, submission_id: str):
         except Exception as e:
             print(f"读取控制台日志 {console_log_path} 失败: {str(e)}")
     
-    # 2. 提交器日志 (logs/submitter_YYYY-MM-DD.log)
+    # 2. 提交器日志 (logs/submitter_YYYY-MM-DD.log，工作进程写入 submitter_YYYY-MM-DD.进程号.log)
     log_dates = [
         datetime.now().strftime('%Y-%m-%d'), 
         (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
     ]
+    
+    def rotation_index(path: Path) -> int:
+        # 按大小轮转出的旧文件（.1 最新、序号越大越旧）排在当前文件之前
+        return int(path.suffix[1:]) if path.suffix[1:].isdigit() else 0
+    
+    submitter_logs = []
     for date_str in log_dates:
-        submitter_log_path = f"logs/submitter_{date_str}.log"
-        if os.path.exists(submitter_log_path):
+        for submitter_log_path in sorted(Path("logs").glob(f"submitter_{date_str}*.log*"),
+                                         key=lambda p: -rotation_index(p)):
             try:
                 with open(submitter_log_path, "r", encoding="utf-8") as f:
                     for line in f:
                         if submission_id in line:
-                            clean_line = re.sub(r'^\[[A-Z]+\]\s+\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d+:\s+', '', line.strip())
+                            match = re.match(r'^\[[A-Z]+\]\s+(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(\.\d+)?):\s+', line.strip())
+                            clean_line = line.strip()[match.end():] if match else line.strip()
                             if clean_line:
-                                all_logs.append(clean_line)
+                                submitter_logs.append((match.group(1) if match else "", clean_line))
             except Exception as e:
                 print(f"读取提交器日志 {submitter_log_path} 失败: {str(e)}")
+    # 多个工作进程的日志按时间合并
+    submitter_logs.sort(key=lambda item: item[0])
+    all_logs.extend(line for _, line in submitter_logs)
     
     # 3. 通用服务器日志 (logs/server.log) 和浏览器日志 (logs/browser.log) - 仅当包含 submission_id
     general_log_files = ["logs/server.log", "logs/browser.log"]
@@ -317,43 +350,56 @@ async def view_submission_logs(request: Request, submission_id: str):
         }
     )
 
-async def process_submission_background(submission_id: str):
-    """在后台处理提交请求"""
-    await submission_processor.process_submission(submission_id)
-    
 @app.post("/start-submission/{submission_id}")
-async def start_submission(submission_id: str, background_tasks: BackgroundTasks):
+async def start_submission(submission_id: str):
     """开始处理提交"""
     try:
-        # 读取提交
-        with open(f"submissions/{submission_id}.json", "r", encoding="utf-8") as f:
-            submission = json.load(f)
-        
         # 更新状态为处理中
-        submission["status"] = "running"
-        with open(f"submissions/{submission_id}.json", "w", encoding="utf-8") as f:
-            json.dump(submission, f, indent=2, ensure_ascii=False)
+        if not submission_store.update_status(submission_id, "running"):
+            raise KeyError(f"提交 {submission_id} 不存在")
         
-        # 在后台任务中处理提交
-        background_tasks.add_task(process_submission_background, submission_id)
+        # 加入持久化任务队列，由工作进程领取处理
+        job_id = await asyncio.to_thread(job_queue.enqueue, submission_id)
+        print(f"提交 {submission_id} 已加入队列，任务ID: {job_id}")
         
         return RedirectResponse(url=f"/submission/{submission_id}", status_code=303)
     except Exception as e:
         print(f"开始提交失败: {str(e)}")
         return RedirectResponse(url="/submissions", status_code=303)
 
+@app.post("/cancel-submission/{submission_id}")
+async def cancel_submission(submission_id: str):
+    """取消提交：排队中的任务直接取消，运行中的任务由工作进程中止"""
+    try:
+        counts = await asyncio.to_thread(job_queue.cancel, submission_id)
+        if counts["running"]:
+            print(f"已通知工作进程取消提交 {submission_id}")
+        elif submission_store.get_status(submission_id) in ("pending", "running"):
+            # 没有运行中的任务，直接更新状态
+            submission_store.update_status(submission_id, "cancelled")
+            submission_store.export_json(submission_id)
+            print(f"提交 {submission_id} 已取消")
+    except Exception as e:
+        print(f"取消提交失败: {str(e)}")
+    return RedirectResponse(url=f"/submission/{submission_id}", status_code=303)
+
+@app.get("/api/submissions/{submission_id}/usage")
+async def get_submission_usage(submission_id: str):
+    """提交的LLM用量：总计及按目录、用途和提供方汇总的令牌数、耗时和估算费用"""
+    if not submission_store.get_submission(submission_id):
+        return {"success": False, "message": "提交不存在"}
+    usage = await asyncio.to_thread(usage_tracker.summary, submission_id)
+    return {"success": True, "submission_id": submission_id, **usage}
+
 @app.delete("/api/submissions/{submission_id}")
 async def delete_submission(submission_id: str):
     """删除指定的提交"""
-    file_path = f"submissions/{submission_id}.json"
-    
-    # 检查文件是否存在
-    if not os.path.exists(file_path):
-        return {"success": False, "message": "提交不存在"}
-    
     try:
-        # 删除提交文件
-        os.remove(file_path)
+        # 删除存储中的提交及其导出文件
+        if not submission_store.delete_submission(submission_id):
+            return {"success": False, "message": "提交不存在"}
+        
+        usage_tracker.delete_submission(submission_id)
         
         # 删除相关的日志文件
         console_log_path = f"logs/submissions/{submission_id}_console.log"
@@ -1,4 +1,22 @@
-from .submitter import SubmissionProcessor
-from .grok_client import GrokAIClient
+import importlib
 
-__all__ = ["SubmissionProcessor", "GrokAIClient"] 
\ No newline at end of file
+# 按需导入：导入form_distiller、domain_scheduler等独立子模块时，
+# 不会连带加载提交器、浏览器和LLM客户端及其依赖
+_EXPORTS = {
+    "SubmissionProcessor": ".submitter",
+    "GrokAIClient": ".grok_client",
+    "OpenAIClient": ".openai_client",
+    "LLMRouter": ".llm_router",
+    "create_llm_client": ".llm_router",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
@@ -2,7 +2,8 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from typing import Any, List
 from app.models.user import User
 from app.api.deps import get_current_active_user
-from app.models.submission import SubmissionTask
+from app.models.submission import SubmissionTask, SubmissionStatus
+from app.services.submit_service import cancel_submission_task
 
 # 导入submissions.py中定义的模拟数据库
 from app.api.endpoints.submissions import submission_tasks
@@ -34,7 +35,7 @@ def get_task_status(
     }
 
 @router.delete("/{task_id}")
-def cancel_task(
+async def cancel_task(
     task_id: str,
     current_user: User = Depends(get_current_active_user)
 ) -> Any:
@@ -48,6 +49,11 @@ def cancel_task(
     if task.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="没有权限访问该任务")
     
-    # 在真实实现中，这里应该发送取消信号给任务处理器
+    if task.status in (SubmissionStatus.COMPLETED, SubmissionStatus.FAILED, SubmissionStatus.CANCELLED):
+        raise HTTPException(status_code=400, detail="任务已结束，无法取消")
+    
+    # 中止进行中的浏览器和AI请求，剩余目录标记为已取消
+    if not cancel_submission_task(task_id):
+        raise HTTPException(status_code=409, detail="任务不在运行中")
     
     return {"status": "success", "message": "任务已取消"} 
\ No newline at end of file
@@ -8,6 +8,7 @@ class SubmissionStatus(str, Enum):
     RUNNING = "running"
     COMPLETED = "completed"
     FAILED = "failed"
+    CANCELLED = "cancelled"
 
 class DirectoryWebsite(BaseModel):
     name: str
@@ -9,17 +9,80 @@ from app.core.config import settings
 
 # 导入原始提交工具代码
 from submit_a_tool import DirectorySubmitter
+from domain_scheduler import interleave_by_domain
+from cancellation import CancellationToken
+
+# 正在执行的提交任务，按任务ID索引，保证任务对象不会被提前回收
+running_tasks: Dict[str, asyncio.Task] = {}
+
+# 正在执行的提交任务的取消令牌
+cancel_tokens: Dict[str, CancellationToken] = {}
+
+# 同时执行的提交任务数上限
+_task_slots = asyncio.Semaphore(int(os.getenv("MAX_RUNNING_TASKS", "2")))
 
 async def create_submission_task(task: SubmissionTask) -> None:
     """
     创建并启动提交任务
     """
-    # 更新任务状态
-    task.status = SubmissionStatus.RUNNING
+    # 等待执行槽位期间保持待处理状态
+    task.status = SubmissionStatus.PENDING
     task.updated_at = datetime.now()
     
-    # 创建异步任务运行提交
-    asyncio.create_task(run_submission_task(task))
+    # 创建异步任务运行提交，并登记以便查询、管理和取消
+    token = CancellationToken()
+    cancel_tokens[task.id] = token
+    running_tasks[task.id] = token.attach(asyncio.create_task(_run_with_slot(task, token)))
+    running_tasks[task.id].add_done_callback(lambda _: _forget_task(task.id))
+
+def _forget_task(task_id: str) -> None:
+    running_tasks.pop(task_id, None)
+    cancel_tokens.pop(task_id, None)
+
+def cancel_submission_task(task_id: str, reason: str = "用户取消") -> bool:
+    """
+    取消提交任务，中止进行中的浏览器操作并跳过剩余目录
+    
+    Returns:
+        任务是否仍在执行
+    """
+    token = cancel_tokens.get(task_id)
+    if token is None:
+        return False
+    token.cancel(reason)
+    return True
+
+async def _run_with_slot(task: SubmissionTask, token: CancellationToken) -> None:
+    """
+    获取执行槽位后运行提交任务
+    """
+    try:
+        async with _task_slots:
+            task.status = SubmissionStatus.RUNNING
+            task.updated_at = datetime.now()
+            await run_submission_task(task)
+    except asyncio.CancelledError:
+        if not token.cancelled:
+            raise
+        _mark_task_cancelled(task, token.reason)
+
+def _mark_task_cancelled(task: SubmissionTask, reason: str) -> None:
+    """
+    将任务标记为已取消，未完成的目录记为取消
+    """
+    finished = {result.directory_url for result in task.results}
+    for directory_url in task.request.target_directories:
+        if directory_url not in finished:
+            task.results.append(SubmissionResult(
+                directory_url=directory_url,
+                has_submission_form=False,
+                is_success=False,
+                short_reason_if_failed=f"已取消: {reason}",
+                submitted_at=datetime.now()
+            ))
+    task.status = SubmissionStatus.CANCELLED
+    task.updated_at = datetime.now()
+    print(f"任务 {task.id} 已取消: {reason}")
 
 async def run_submission_task(task: SubmissionTask) -> None:
     """
@@ -62,40 +125,11 @@ Category: {task.request.product_category or ""}
         # 初始化提交器
         directory_submitter = DirectorySubmitter()
         
-        # 对每个目标目录网站进行提交
-        for directory_url in task.request.target_directories:
-            try:
-                # 运行提交
-                result = await directory_submitter.submit_single_directory(
-                    directory_url,
-                    site_info,
-                    task.request.email
-                )
-                
-                # 创建结果对象
-                submission_result = SubmissionResult(
-                    directory_url=directory_url,
-                    has_submission_form=result.has_submission_form,
-                    is_success=result.is_success,
-                    short_reason_if_failed=result.short_reason_if_failed,
-                    submitted_at=datetime.now()
-                )
-                
-                # 添加到任务结果
-                task.results.append(submission_result)
-                task.updated_at = datetime.now()
-                
-            except Exception as e:
-                # 处理错误
-                submission_result = SubmissionResult(
-                    directory_url=directory_url,
-                    has_submission_form=False,
-                    is_success=False,
-                    short_reason_if_failed=f"Error: {str(e)[:100]}",
-                    submitted_at=datetime.now()
-                )
-                task.results.append(submission_result)
-                task.updated_at = datetime.now()
+        try:
+            await _submit_directories(task, directory_submitter, site_info)
+        finally:
+            # 关闭浏览器池（任务被取消时同样关闭）
+            await directory_submitter.close()
         
         # 完成任务
         task.status = SubmissionStatus.COMPLETED
@@ -108,4 +142,43 @@ Category: {task.request.product_category or ""}
         task.updated_at = datetime.now()
         
         # 可以在这里添加错误日志
-        print(f"任务失败: {str(e)}") 
\ No newline at end of file
+        print(f"任务失败: {str(e)}")
+
+async def _submit_directories(task: SubmissionTask, directory_submitter: DirectorySubmitter, site_info: str) -> None:
+    """
+    依次提交到每个目标目录网站
+    """
+    # 对每个目标目录网站进行提交，同一域名的目录错开处理
+    for _, directory_url in interleave_by_domain(task.request.target_directories):
+        try:
+            # 运行提交
+            result = await directory_submitter.submit_single_directory(
+                directory_url,
+                site_info,
+                task.request.email
+            )
+            
+            # 创建结果对象
+            submission_result = SubmissionResult(
+                directory_url=directory_url,
+                has_submission_form=result.has_submission_form,
+                is_success=result.is_success,
+                short_reason_if_failed=result.short_reason_if_failed,
+                submitted_at=datetime.now()
+            )
+            
+            # 添加到任务结果
+            task.results.append(submission_result)
+            task.updated_at = datetime.now()
+            
+        except Exception as e:
+            # 处理错误
+            submission_result = SubmissionResult(
+                directory_url=directory_url,
+                has_submission_form=False,
+                is_success=False,
+                short_reason_if_failed=f"Error: {str(e)[:100]}",
+                submitted_at=datetime.now()
+            )
+            task.results.append(submission_result)
+            task.updated_at = datetime.now()
@@ -0,0 +1,211 @@
+"""
+浏览器池模块，复用常驻的浏览器进程并按需租出隔离的浏览器上下文
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+class _PooledBrowser:
+    """池中的一个浏览器进程及其使用情况"""
+
+    def __init__(self, browser: Any):
+        self.browser = browser
+        self.active_contexts = 0
+        self.total_uses = 0
+        self.retired = False
+
+
+class BrowserPool:
+    """常驻浏览器池
+
+    每次租用都会在一个已启动的浏览器进程上创建新的上下文（独立的Cookie和存储），
+    用完即关闭上下文。单个浏览器进程同时承载的上下文数量有上限，
+    累计使用达到指定次数后会被回收并在需要时重新启动。
+    """
+
+    def __init__(self,
+                 launch_browser: Callable[[], Awaitable[Any]],
+                 new_context: Callable[..., Awaitable[Any]],
+                 close_context: Optional[Callable[[Any], Awaitable[None]]] = None,
+                 close_browser: Optional[Callable[[Any], Awaitable[None]]] = None,
+                 max_browsers: int = 2,
+                 max_contexts_per_browser: int = 4,
+                 recycle_after: int = 50):
+        """初始化浏览器池
+
+        Args:
+            launch_browser: 启动一个浏览器进程的协程函数
+            new_context: 在给定浏览器上创建上下文的协程函数，额外参数透传自lease()
+            close_context: 关闭上下文的协程函数
+            close_browser: 关闭浏览器进程的协程函数
+            max_browsers: 同时存活的浏览器进程数上限
+            max_contexts_per_browser: 单个浏览器进程同时租出的上下文数上限
+            recycle_after: 单个浏览器进程累计租用多少次后回收
+        """
+        self._launch_browser = launch_browser
+        self._new_context = new_context
+        self._close_context = close_context
+        self._close_browser = close_browser
+        self.max_browsers = max(1, max_browsers)
+        self.max_contexts_per_browser = max(1, max_contexts_per_browser)
+        self.recycle_after = max(1, recycle_after)
+
+        self._browsers: List[_PooledBrowser] = []
+        self._launching = 0
+        self._condition = asyncio.Condition()
+        self._closed = False
+
+        # 统计信息
+        self.launch_count = 0
+        self.lease_count = 0
+        self.recycle_count = 0
+
+    async def _acquire(self) -> _PooledBrowser:
+        """取得一个有空闲上下文槽位的浏览器，必要时启动新进程"""
+        async with self._condition:
+            while True:
+                if self._closed:
+                    raise RuntimeError("浏览器池已关闭")
+
+                # 优先使用已启动且负载最低的浏览器
+                candidates = [
+                    pooled for pooled in self._browsers
+                    if not pooled.retired and pooled.active_contexts < self.max_contexts_per_browser
+                ]
+                if candidates:
+                    pooled = min(candidates, key=lambda p: p.active_contexts)
+                    pooled.active_contexts += 1
+                    return pooled
+
+                live_browsers = sum(1 for pooled in self._browsers if not pooled.retired)
+                if live_browsers + self._launching < self.max_browsers:
+                    self._launching += 1
+                    break
+
+                await self._condition.wait()
+
+        # 在锁外启动浏览器，避免阻塞其他租用者
+        try:
+            browser = await self._launch_browser()
+        except BaseException:
+            async with self._condition:
+                self._launching -= 1
+                self._condition.notify_all()
+            raise
+
+        async with self._condition:
+            self._launching -= 1
+            pooled = _PooledBrowser(browser)
+            pooled.active_contexts = 1
+            self._browsers.append(pooled)
+            self.launch_count += 1
+            self._condition.notify_all()
+            return pooled
+
+    async def _release(self, pooled: _PooledBrowser, failed: bool = False) -> None:
+        """归还上下文槽位，并在达到回收条件时关闭浏览器进程"""
+        async with self._condition:
+            pooled.active_contexts -= 1
+            pooled.total_uses += 1
+            if failed or pooled.total_uses >= self.recycle_after:
+                pooled.retired = True
+
+            should_close = pooled.retired and pooled.active_contexts == 0 and pooled in self._browsers
+            if should_close:
+                self._browsers.remove(pooled)
+                self.recycle_count += 1
+            self._condition.notify_all()
+
+        if should_close:
+            await self._shutdown_browser(pooled.browser)
+
+    async def _shutdown_browser(self, browser: Any) -> None:
+        if self._close_browser:
+            try:
+                await self._close_browser(browser)
+            except Exception as e:
+                print(f"关闭浏览器进程失败: {str(e)}")
+
+    @asynccontextmanager
+    async def lease(self, *args, **kwargs):
+        """租用一个全新的浏览器上下文
+
+        用法::
+
+            async with pool.lease() as context:
+                ...
+
+        Args:
+            *args, **kwargs: 透传给new_context的参数
+
+        Yields:
+            新创建的浏览器上下文
+        """
+        pooled = await self._acquire()
+        failed = False
+        context = None
+        try:
+            context = await self._new_context(pooled.browser, *args, **kwargs)
+            self.lease_count += 1
+            yield context
+        except BaseException:
+            # 出错的浏览器进程不再复用
+            failed = True
+            raise
+        finally:
+            if context is not None and self._close_context:
+                try:
+                    await self._close_context(context)
+                except Exception as e:
+                    failed = True
+                    print(f"关闭浏览器上下文失败: {str(e)}")
+            await self._release(pooled, failed=failed)
+
+    async def warm_up(self, count: int = 1) -> None:
+        """预先启动浏览器进程，使首次租用不必等待启动
+
+        Args:
+            count: 需要预热的浏览器进程数
+        """
+        async with self._condition:
+            live_browsers = sum(1 for pooled in self._browsers if not pooled.retired)
+            count = max(0, min(count, self.max_browsers - live_browsers - self._launching))
+            self._launching += count
+
+        for _ in range(count):
+            try:
+                browser = await self._launch_browser()
+            except Exception as e:
+                print(f"预热浏览器失败: {str(e)}")
+                async with self._condition:
+                    self._launching -= 1
+                    self._condition.notify_all()
+                continue
+            async with self._condition:
+                self._launching -= 1
+                self._browsers.append(_PooledBrowser(browser))
+                self.launch_count += 1
+                self._condition.notify_all()
+
+    def stats(self) -> Dict[str, int]:
+        """返回池的运行统计"""
+        return {
+            "browsers": len(self._browsers),
+            "active_contexts": sum(pooled.active_contexts for pooled in self._browsers),
+            "launch_count": self.launch_count,
+            "lease_count": self.lease_count,
+            "recycle_count": self.recycle_count,
+        }
+
+    async def close(self) -> None:
+        """关闭池中所有浏览器进程"""
+        async with self._condition:
+            self._closed = True
+            browsers = list(self._browsers)
+            self._browsers.clear()
+            self._condition.notify_all()
+
+        for pooled in browsers:
+            await self._shutdown_browser(pooled.browser)
@@ -0,0 +1,72 @@
+"""
+取消令牌模块，用于中止正在执行的提交任务
+
+令牌取消时会取消所有登记在它上面的asyncio任务，进行中的HTTP请求和浏览器操作随任务一起中止，
+浏览器上下文由各自的async with块负责关闭。
+"""
+
+import asyncio
+from typing import Optional, Set
+
+
+class CancellationToken:
+    """一次提交处理的取消令牌"""
+
+    def __init__(self):
+        self._cancelled = False
+        self.abandoned = False
+        self.reason: Optional[str] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    @property
+    def cancelled(self) -> bool:
+        """是否已被取消"""
+        return self._cancelled
+
+    def cancel(self, reason: str = "用户取消") -> bool:
+        """取消令牌及其登记的全部任务
+
+        Args:
+            reason: 取消原因，写入未完成目录的结果
+
+        Returns:
+            本次调用是否触发了取消（已取消时返回False）
+        """
+        if self._cancelled:
+            return False
+        self._cancelled = True
+        self.reason = reason
+        for task in list(self._tasks):
+            if not task.done():
+                task.cancel()
+        return True
+
+    def abandon(self, reason: str) -> bool:
+        """放弃本次处理：取消令牌及其登记的全部任务，并且不再写回任何结果和状态
+
+        用于任务租约丢失、提交已由其他工作进程接手的情况。
+
+        Args:
+            reason: 放弃原因
+
+        Returns:
+            本次调用是否触发了取消（已取消时返回False）
+        """
+        self.abandoned = True
+        return self.cancel(reason)
+
+    def attach(self, task: asyncio.Task) -> asyncio.Task:
+        """登记一个任务，令牌取消时一并取消
+
+        Args:
+            task: 需要随令牌取消的任务
+
+        Returns:
+            传入的任务
+        """
+        if self._cancelled:
+            task.cancel()
+            return task
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
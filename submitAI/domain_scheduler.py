@@ -0,0 +1,318 @@
+"""
+目录域名调度模块，限制同一域名的并发提交数和相邻两次提交的最小间隔
+
+所有提交任务共用同一个调度器：某个域名处于冷却期时，等待它的任务不占用并发槽位，
+其他域名的任务可以继续执行。配置数据库路径后，多个工作进程之间也会共享限制。
+"""
+
+import asyncio
+import os
+import sqlite3
+import time
+import urllib.parse
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_DB_PATH = os.getenv("DOMAIN_SCHEDULER_DB", "data/domains.db")
+
+
+def extract_domain(url: str) -> str:
+    """从URL中提取域名（去掉www.前缀）
+
+    Args:
+        url: 目录提交地址
+
+    Returns:
+        域名
+    """
+    parsed_url = urllib.parse.urlparse(url)
+    domain = parsed_url.netloc.lower()
+    if domain.startswith('www.'):
+        domain = domain[4:]
+    return domain
+
+
+def interleave_by_domain(urls: Iterable[str]) -> List[Tuple[int, str]]:
+    """按域名轮流排列目标地址，避免同一域名的目录连在一起
+
+    Args:
+        urls: 目标目录地址列表
+
+    Returns:
+        (原始索引, 地址) 列表，域名按首次出现的顺序轮流
+    """
+    groups: "OrderedDict[str, List[Tuple[int, str]]]" = OrderedDict()
+    for index, url in enumerate(urls):
+        groups.setdefault(extract_domain(url), []).append((index, url))
+
+    ordered = []
+    queues = [list(reversed(items)) for items in groups.values()]
+    while queues:
+        for items in queues:
+            ordered.append(items.pop())
+        queues = [items for items in queues if items]
+    return ordered
+
+
+class _DomainState:
+    """单个域名的占用情况"""
+
+    def __init__(self):
+        self.active = 0
+        self.next_start = 0.0
+
+
+class DomainScheduler:
+    """按域名限流的调度器
+
+    用法::
+
+        async with scheduler.slot("aitools.neilpatel.com"):
+            ...
+    """
+
+    def __init__(self, max_per_domain: int = 1, min_interval: float = 10.0,
+                 db_path: Optional[str] = None, lease_seconds: int = 900,
+                 poll_interval: float = 1.0):
+        """初始化调度器
+
+        Args:
+            max_per_domain: 同一域名同时进行的提交数上限
+            min_interval: 同一域名相邻两次提交开始的最小间隔（秒）
+            db_path: 跨进程共享限制的SQLite数据库路径，为空时仅在进程内生效
+            lease_seconds: 跨进程占用的有效期，持有期间由slot()自动续约，进程崩溃后到期自动释放
+            poll_interval: 跨进程等待时的最长轮询间隔（秒）
+        """
+        self.max_per_domain = max(1, max_per_domain)
+        self.min_interval = max(0.0, min_interval)
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+
+        self._domains: Dict[str, _DomainState] = {}
+        self._condition = asyncio.Condition()
+
+        # 统计信息
+        self.acquire_count = 0
+        self.wait_seconds = 0.0
+
+        if db_path:
+            db_dir = os.path.dirname(db_path)
+            if db_dir:
+                os.makedirs(db_dir, exist_ok=True)
+            self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        return conn
+
+    def _init_db(self) -> None:
+        conn = self._connect()
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS domain_leases (
+                    id TEXT PRIMARY KEY,
+                    domain TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS domain_spacing (
+                    domain TEXT PRIMARY KEY,
+                    next_start_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_domain_leases_domain ON domain_leases (domain)")
+        finally:
+            conn.close()
+
+    def _try_claim_shared(self, domain: str) -> Tuple[Optional[str], float]:
+        """尝试在数据库中占用域名
+
+        Returns:
+            (占用ID, 需要等待的秒数)，占用成功时等待秒数为0
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM domain_leases WHERE expires_at < ?", (now,))
+            active = conn.execute(
+                "SELECT COUNT(*) AS count FROM domain_leases WHERE domain = ?", (domain,)
+            ).fetchone()["count"]
+            row = conn.execute(
+                "SELECT next_start_at FROM domain_spacing WHERE domain = ?", (domain,)
+            ).fetchone()
+            next_start = row["next_start_at"] if row else 0.0
+
+            if active >= self.max_per_domain or now < next_start:
+                conn.execute("COMMIT")
+                return None, max(next_start - now, 0.0)
+
+            lease_id = str(uuid.uuid4())
+            conn.execute(
+                "INSERT INTO domain_leases (id, domain, expires_at) VALUES (?, ?, ?)",
+                (lease_id, domain, now + self.lease_seconds)
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO domain_spacing (domain, next_start_at) VALUES (?, ?)",
+                (domain, now + self.min_interval)
+            )
+            conn.execute("COMMIT")
+            return lease_id, 0.0
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def _renew_shared(self, lease_id: str) -> bool:
+        """延长跨进程占用的有效期
+
+        Returns:
+            占用是否仍然存在
+        """
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                "UPDATE domain_leases SET expires_at = ? WHERE id = ?",
+                (time.time() + self.lease_seconds, lease_id)
+            )
+            return cursor.rowcount == 1
+        finally:
+            conn.close()
+
+    async def _keep_alive(self, domain: str, lease_id: str) -> None:
+        """持有槽位期间定期续约，长时间的目录提交不会因占用过期而被其他进程抢占同一域名"""
+        interval = max(1, self.lease_seconds // 3)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if not await asyncio.to_thread(self._renew_shared, lease_id):
+                    print(f"域名 {domain} 的占用已过期")
+                    return
+            except Exception as e:
+                # 单次续约失败时下个周期重试
+                print(f"续约域名 {domain} 的占用失败: {str(e)}")
+
+    def _release_shared(self, lease_id: str) -> None:
+        conn = self._connect()
+        try:
+            conn.execute("DELETE FROM domain_leases WHERE id = ?", (lease_id,))
+        finally:
+            conn.close()
+
+    async def _acquire_local(self, domain: str) -> None:
+        """等待进程内的域名槽位和间隔"""
+        async with self._condition:
+            state = self._domains.setdefault(domain, _DomainState())
+            while True:
+                now = time.monotonic()
+                if state.active < self.max_per_domain and now >= state.next_start:
+                    state.active += 1
+                    state.next_start = now + self.min_interval
+                    return
+                if state.active < self.max_per_domain:
+                    # 冷却中：到期后再检查，期间其他域名的任务可正常获取槽位
+                    try:
+                        await asyncio.wait_for(self._condition.wait(), state.next_start - now)
+                    except asyncio.TimeoutError:
+                        pass
+                else:
+                    await self._condition.wait()
+
+    async def _release_local(self, domain: str) -> None:
+        async with self._condition:
+            state = self._domains.get(domain)
+            if state:
+                state.active -= 1
+            self._condition.notify_all()
+
+    async def acquire(self, domain: str) -> Optional[str]:
+        """占用一个域名槽位，必要时等待
+
+        Args:
+            domain: 域名
+
+        Returns:
+            跨进程占用ID，未启用跨进程共享时返回None
+        """
+        started = time.monotonic()
+        await self._acquire_local(domain)
+
+        lease_id = None
+        if self.db_path:
+            try:
+                while True:
+                    lease_id, wait = await asyncio.to_thread(self._try_claim_shared, domain)
+                    if lease_id:
+                        break
+                    await asyncio.sleep(min(max(wait, 0.1), self.poll_interval))
+            except BaseException:
+                await self._release_local(domain)
+                raise
+
+        self.acquire_count += 1
+        self.wait_seconds += time.monotonic() - started
+        return lease_id
+
+    async def release(self, domain: str, lease_id: Optional[str] = None) -> None:
+        """释放域名槽位
+
+        Args:
+            domain: 域名
+            lease_id: acquire()返回的跨进程占用ID
+        """
+        if lease_id:
+            try:
+                await asyncio.to_thread(self._release_shared, lease_id)
+            except Exception as e:
+                # 释放失败时依赖占用有效期自动过期
+                print(f"释放域名 {domain} 的占用失败: {str(e)}")
+        await self._release_local(domain)
+
+    @asynccontextmanager
+    async def slot(self, domain: str):
+        """在域名槽位内执行提交
+
+        Args:
+            domain: 域名
+        """
+        lease_id = await self.acquire(domain)
+        keep_alive = asyncio.create_task(self._keep_alive(domain, lease_id)) if lease_id else None
+        try:
+            yield
+        finally:
+            if keep_alive:
+                keep_alive.cancel()
+            await self.release(domain, lease_id)
+
+    def stats(self) -> Dict[str, float]:
+        """返回调度统计"""
+        return {
+            "domains": len(self._domains),
+            "active": sum(state.active for state in self._domains.values()),
+            "acquire_count": self.acquire_count,
+            "wait_seconds": round(self.wait_seconds, 3),
+        }
+
+
+_default_scheduler: Optional[DomainScheduler] = None
+
+
+def get_domain_scheduler() -> DomainScheduler:
+    """获取进程内共享的域名调度器，配置来自环境变量"""
+    global _default_scheduler
+    if _default_scheduler is None:
+        db_path = os.getenv("DOMAIN_SCHEDULER_DB", DEFAULT_DB_PATH)
+        _default_scheduler = DomainScheduler(
+            max_per_domain=int(os.getenv("DOMAIN_MAX_CONCURRENCY", "1")),
+            min_interval=float(os.getenv("DOMAIN_MIN_INTERVAL", "10")),
+            db_path=db_path or None,
+        )
+    return _default_scheduler
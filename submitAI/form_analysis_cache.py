@@ -0,0 +1,224 @@
+"""
+表单分析缓存模块，按目录地址和表单结构指纹保存字段映射分析结果
+
+目录网站的提交表单很少变化，只要表单结构指纹不变就复用上次的分析结果，不再请求模型。
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import json
+import urllib.parse
+from html.parser import HTMLParser
+from typing import Any, Dict, Iterable, List, Optional
+
+DEFAULT_DB_PATH = os.getenv("FORM_ANALYSIS_DB", "data/form_analysis.db")
+
+# 参与指纹计算的标签和属性
+_STRUCTURAL_TAGS = {"form", "input", "select", "textarea", "button", "label", "option", "fieldset", "legend"}
+_STRUCTURAL_ATTRS = ("name", "id", "type", "for", "required", "multiple", "accept", "placeholder", "role")
+
+# 随机生成的ID、令牌等片段（较长的数字或十六进制串）
+_VOLATILE_PATTERN = re.compile(r"[0-9a-f]{8,}|\d{3,}", re.IGNORECASE)
+
+
+def _normalize_token(value: str) -> str:
+    value = " ".join(value.split()).lower()
+    return _VOLATILE_PATTERN.sub("#", value)
+
+
+class _FormStructureParser(HTMLParser):
+    """提取表单结构：标签、字段名称、类型和标签文字，忽略字段值"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.tokens: List[str] = []
+        self._text_target: Optional[str] = None
+        self._text: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag not in _STRUCTURAL_TAGS:
+            return
+        self._flush_text()
+        attrs = dict(attrs)
+        if tag == "input" and (attrs.get("type") or "").lower() == "hidden":
+            # 隐藏字段常用于一次性令牌，只保留名称
+            self.tokens.append(f"input[hidden]:{_normalize_token(attrs.get('name') or '')}")
+            return
+        parts = [tag]
+        for attr in _STRUCTURAL_ATTRS:
+            if attr in attrs:
+                parts.append(f"{attr}={_normalize_token(attrs[attr] or '')}")
+        self.tokens.append("|".join(parts))
+        if tag in ("label", "option", "legend", "button"):
+            self._text_target = tag
+
+    def handle_endtag(self, tag):
+        if tag == self._text_target:
+            self._flush_text()
+
+    def handle_data(self, data):
+        if self._text_target:
+            self._text.append(data)
+
+    def _flush_text(self):
+        if self._text_target:
+            text = _normalize_token("".join(self._text))
+            if text:
+                self.tokens.append(f"{self._text_target}-text:{text}")
+        self._text_target = None
+        self._text = []
+
+    def close(self):
+        super().close()
+        self._flush_text()
+
+
+def form_fingerprint(form_html: str, field_names: Optional[Iterable[str]] = None) -> str:
+    """计算表单结构指纹
+
+    只包含标签、字段名称/类型和标签文字，忽略字段值、随机ID和令牌，
+    因此同一表单在不同时间抓取得到的指纹相同。
+
+    Args:
+        form_html: 表单HTML
+        field_names: 我们的字段名称，字段集合变化时指纹也随之变化
+
+    Returns:
+        SHA-256十六进制摘要
+    """
+    parser = _FormStructureParser()
+    try:
+        parser.feed(form_html)
+        parser.close()
+        tokens = parser.tokens
+    except Exception:
+        # 无法解析时退回到对原文计算
+        tokens = [_normalize_token(form_html)]
+
+    if field_names is not None:
+        tokens.append("fields:" + ",".join(sorted(field_names)))
+    return hashlib.sha256("\n".join(tokens).encode("utf-8")).hexdigest()
+
+
+def normalize_directory_url(url: str) -> str:
+    """去掉查询参数、锚点和末尾斜杠，作为目录的缓存键"""
+    parsed = urllib.parse.urlparse(url)
+    netloc = parsed.netloc.lower()
+    if netloc.startswith("www."):
+        netloc = netloc[4:]
+    return f"{netloc}{parsed.path.rstrip('/')}"
+
+
+class FormAnalysisCache:
+    """目录表单分析结果存储"""
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        """初始化存储
+
+        Args:
+            db_path: SQLite数据库文件路径
+        """
+        self.db_path = db_path
+        self._local = threading.local()
+
+        # 统计信息
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._init_db()
+
+    def _conn(self) -> sqlite3.Connection:
+        """获取当前线程的数据库连接"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def _init_db(self) -> None:
+        self._conn().execute("""
+            CREATE TABLE IF NOT EXISTS form_analysis (
+                directory TEXT PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                analysis TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                hit_count INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+
+    def get(self, directory_url: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """读取分析结果，指纹与保存时不同则视为失效
+
+        Args:
+            directory_url: 目录提交地址
+            fingerprint: 当前表单的结构指纹
+
+        Returns:
+            分析结果，未命中时返回None
+        """
+        directory = normalize_directory_url(directory_url)
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT fingerprint, analysis FROM form_analysis WHERE directory = ?", (directory,)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        if row["fingerprint"] != fingerprint:
+            # 表单结构已变化
+            self.misses += 1
+            self.invalidations += 1
+            return None
+
+        conn.execute("UPDATE form_analysis SET hit_count = hit_count + 1 WHERE directory = ?", (directory,))
+        self.hits += 1
+        return json.loads(row["analysis"])
+
+    def set(self, directory_url: str, fingerprint: str, analysis: Dict[str, Any]) -> None:
+        """保存（或替换）目录的分析结果"""
+        self._conn().execute(
+            "INSERT OR REPLACE INTO form_analysis (directory, fingerprint, analysis, created_at, hit_count) "
+            "VALUES (?, ?, ?, ?, 0)",
+            (normalize_directory_url(directory_url), fingerprint,
+             json.dumps(analysis, ensure_ascii=False), time.time())
+        )
+
+    def delete(self, directory_url: str) -> None:
+        """删除目录的分析结果"""
+        self._conn().execute(
+            "DELETE FROM form_analysis WHERE directory = ?", (normalize_directory_url(directory_url),)
+        )
+
+    def stats(self) -> Dict[str, int]:
+        """返回缓存统计"""
+        entries = self._conn().execute("SELECT COUNT(*) AS count FROM form_analysis").fetchone()["count"]
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+
+_default_cache: Optional[FormAnalysisCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_form_analysis_cache() -> FormAnalysisCache:
+    """获取进程内共享的表单分析缓存"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = FormAnalysisCache()
+        return _default_cache
@@ -0,0 +1,299 @@
+"""
+表单精简模块，把页面或表单HTML压缩为紧凑的字段清单供模型分析
+
+只保留字段、标签、选项、必填、长度限制和文件类型等信息，去掉脚本、样式、SVG和样式类，
+并控制在令牌预算以内。超出预算时依次压缩选项列表和说明文字，不会丢弃字段。
+"""
+
+import os
+import re
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional
+
+DEFAULT_MAX_TOKENS = int(os.getenv("FORM_DISTILL_MAX_TOKENS", "1500"))
+
+# 内容整体忽略的标签
+_SKIP_TAGS = {"script", "style", "svg", "noscript", "template", "iframe", "head", "canvas", "video", "audio"}
+_FIELD_TAGS = {"input", "textarea", "select"}
+_IGNORED_INPUT_TYPES = {"hidden", "image", "reset"}
+_BUTTON_INPUT_TYPES = {"submit", "button"}
+
+# 字段保留的属性
+_FIELD_ATTRS = ("name", "id", "placeholder", "aria-label", "title", "maxlength", "minlength",
+                "pattern", "accept", "min", "max", "autocomplete")
+_FLAG_ATTRS = ("required", "multiple", "disabled", "readonly", "checked")
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估计文本的令牌数：ASCII约4个字符一个令牌，其他字符各算一个"""
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    return (len(text) - non_ascii) // 4 + non_ascii + 1
+
+
+def _clean_text(text: str) -> str:
+    return " ".join(text.split())
+
+
+class _FormDistillParser(HTMLParser):
+    """收集页面中的表单、字段、标签和按钮"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.forms: List[Dict[str, Any]] = []
+        self.labels_for: Dict[str, str] = {}
+
+        self._skip_depth = 0
+        self._form: Optional[Dict[str, Any]] = None
+        self._loose: Optional[Dict[str, Any]] = None
+        self._label: Optional[Dict[str, Any]] = None
+        self._select: Optional[Dict[str, Any]] = None
+        self._option: Optional[Dict[str, Any]] = None
+        self._textarea = False
+        self._button: Optional[Dict[str, Any]] = None
+        self._legend: Optional[List[str]] = None
+        self._recent_text: List[str] = []
+
+    def _current_form(self) -> Dict[str, Any]:
+        if self._form is not None:
+            return self._form
+        if self._loose is None:
+            # 不在<form>内的字段（很多单页应用不使用form标签）
+            self._loose = {"attrs": {}, "fields": [], "buttons": [], "legends": []}
+            self.forms.append(self._loose)
+        return self._loose
+
+    def handle_starttag(self, tag, attrs):
+        if self._skip_depth:
+            if tag in _SKIP_TAGS:
+                self._skip_depth += 1
+            return
+        if tag in _SKIP_TAGS:
+            self._skip_depth = 1
+            return
+
+        attrs = {k: (v if v is not None else "") for k, v in attrs}
+
+        if tag == "form":
+            self._form = {
+                "attrs": {k: attrs[k] for k in ("id", "name", "action", "method") if attrs.get(k)},
+                "fields": [], "buttons": [], "legends": [],
+            }
+            self.forms.append(self._form)
+        elif tag == "label":
+            self._label = {"for": attrs.get("for"), "text": [], "fields": []}
+        elif tag == "legend":
+            self._legend = []
+        elif tag == "option" and self._select is not None:
+            self._option = {"value": attrs.get("value"), "text": [], "selected": "selected" in attrs}
+        elif tag == "button":
+            self._button = {"type": (attrs.get("type") or "submit").lower(), "text": [],
+                            "name": attrs.get("name") or attrs.get("id") or ""}
+        elif tag in _FIELD_TAGS:
+            self._start_field(tag, attrs)
+
+    def _start_field(self, tag: str, attrs: Dict[str, str]) -> None:
+        field_type = tag if tag != "input" else (attrs.get("type") or "text").lower()
+        if field_type in _IGNORED_INPUT_TYPES:
+            return
+        if tag == "input" and field_type in _BUTTON_INPUT_TYPES:
+            self._current_form()["buttons"].append({
+                "type": field_type, "text": _clean_text(attrs.get("value") or ""),
+                "name": attrs.get("name") or attrs.get("id") or "",
+            })
+            return
+
+        field = {"tag": tag, "type": field_type, "label": "", "context": _clean_text(" ".join(self._recent_text))}
+        for attr in _FIELD_ATTRS:
+            if attrs.get(attr):
+                field[attr] = _clean_text(attrs[attr])
+        for flag in _FLAG_ATTRS:
+            if flag in attrs or attrs.get("aria-" + flag) == "true":
+                field[flag] = True
+        if field_type in ("checkbox", "radio") and attrs.get("value"):
+            # 单选和复选框的值就是可选项
+            field["value"] = _clean_text(attrs["value"])
+        self._recent_text = []
+
+        self._current_form()["fields"].append(field)
+        if self._label is not None:
+            self._label["fields"].append(field)
+        if tag == "select":
+            field["options"] = []
+            self._select = field
+        elif tag == "textarea":
+            self._textarea = True
+
+    def handle_endtag(self, tag):
+        if self._skip_depth:
+            if tag in _SKIP_TAGS:
+                self._skip_depth -= 1
+            return
+
+        if tag == "form":
+            self._form = None
+        elif tag == "label" and self._label is not None:
+            text = _clean_text(" ".join(self._label["text"]))
+            if self._label["for"]:
+                self.labels_for[self._label["for"]] = text
+            for field in self._label["fields"]:
+                field["label"] = field["label"] or text
+            self._label = None
+        elif tag == "legend" and self._legend is not None:
+            text = _clean_text(" ".join(self._legend))
+            if text:
+                self._current_form()["legends"].append(text)
+            self._legend = None
+        elif tag == "option" and self._option is not None:
+            self._finish_option()
+        elif tag == "select":
+            if self._option is not None:
+                self._finish_option()
+            self._select = None
+        elif tag == "textarea":
+            self._textarea = False
+        elif tag == "button" and self._button is not None:
+            self._button["text"] = _clean_text(" ".join(self._button["text"]))
+            if self._button["type"] in ("submit", "button"):
+                self._current_form()["buttons"].append(self._button)
+            self._button = None
+
+    def _finish_option(self) -> None:
+        text = _clean_text(" ".join(self._option["text"]))
+        value = self._option["value"]
+        if text or value:
+            option = text if not value or value == text else f"{text}={value}"
+            self._select["options"].append(option)
+        self._option = None
+
+    def handle_data(self, data):
+        if self._skip_depth or self._textarea:
+            # 忽略文本区域中的默认内容
+            return
+        text = data.strip()
+        if not text:
+            return
+        if self._option is not None:
+            self._option["text"].append(text)
+            return
+        if self._label is not None:
+            self._label["text"].append(text)
+        if self._legend is not None:
+            self._legend.append(text)
+        if self._button is not None:
+            self._button["text"].append(text)
+            return
+        # 记录字段之前最近的文字，用于没有label的字段
+        self._recent_text.append(text)
+        if len(self._recent_text) > 3:
+            self._recent_text = self._recent_text[-3:]
+
+
+def extract_form_structure(html: str) -> List[Dict[str, Any]]:
+    """提取页面中的表单结构
+
+    Args:
+        html: 页面或表单的HTML
+
+    Returns:
+        表单列表，每个表单包含attrs、fields、buttons和legends
+    """
+    parser = _FormDistillParser()
+    parser.feed(html)
+    parser.close()
+
+    forms = [form for form in parser.forms if form["fields"]]
+    for form in forms:
+        for field in form["fields"]:
+            if not field["label"] and field.get("id") in parser.labels_for:
+                field["label"] = parser.labels_for[field["id"]]
+            if field["label"]:
+                field.pop("context", None)
+    return forms
+
+
+def _format_field(field: Dict[str, Any], max_options: Optional[int], max_text: int) -> str:
+    def short(text: str) -> str:
+        return text if len(text) <= max_text else text[:max_text] + "…"
+
+    kind = field["tag"] if field["tag"] != "input" else f"input[{field['type']}]"
+    parts = [kind]
+    for attr in ("name", "id"):
+        if field.get(attr):
+            parts.append(f"{attr}={field[attr]}")
+    if field.get("label"):
+        parts.append(f'label="{short(field["label"])}"')
+    elif field.get("aria-label"):
+        parts.append(f'label="{short(field["aria-label"])}"')
+    elif field.get("context"):
+        parts.append(f'near="{short(field["context"])}"')
+    for attr in ("placeholder", "title"):
+        if field.get(attr) and max_text > 0:
+            parts.append(f'{attr}="{short(field[attr])}"')
+    for attr in ("value", "maxlength", "minlength", "pattern", "accept", "min", "max"):
+        if field.get(attr):
+            parts.append(f"{attr}={field[attr]}")
+    parts.extend(flag for flag in _FLAG_ATTRS if field.get(flag))
+
+    options = field.get("options")
+    if options:
+        shown = options if max_options is None else options[:max_options]
+        text = "|".join(short(option) for option in shown)
+        if len(shown) < len(options):
+            text += f"|…(+{len(options) - len(shown)})"
+        parts.append(f"options=[{text}]")
+    return "- " + " ".join(parts)
+
+
+def _format_forms(forms: List[Dict[str, Any]], max_options: Optional[int], max_text: int) -> str:
+    lines = []
+    for form in forms:
+        header = " ".join(f"{k}={v}" for k, v in form["attrs"].items())
+        lines.append(f"form {header}".rstrip())
+        for legend in form["legends"]:
+            lines.append(f'  section "{legend[:max_text or 40]}"')
+        for field in form["fields"]:
+            lines.append("  " + _format_field(field, max_options, max_text))
+        for button in form["buttons"]:
+            if button["type"] == "submit" or button["text"]:
+                lines.append(f'  - button[{button["type"]}] "{button["text"][:40]}"')
+    return "\n".join(lines)
+
+
+def distill_forms(forms: List[Dict[str, Any]], max_tokens: int = DEFAULT_MAX_TOKENS) -> str:
+    """把表单结构格式化为令牌预算内的文本
+
+    Args:
+        forms: extract_form_structure的结果
+        max_tokens: 令牌预算
+
+    Returns:
+        精简后的表单描述
+    """
+    # 逐级压缩：先限制选项数，再缩短说明文字，最后去掉说明文字
+    levels = [(None, 120), (30, 80), (12, 60), (6, 40), (3, 25), (0, 0)]
+    text = ""
+    for max_options, max_text in levels:
+        text = _format_forms(forms, max_options, max_text)
+        if estimate_tokens(text) <= max_tokens:
+            return text
+    return text
+
+
+def distill_form_html(html: str, max_tokens: int = DEFAULT_MAX_TOKENS) -> str:
+    """把页面或表单HTML精简为令牌预算内的字段清单
+
+    Args:
+        html: 页面或表单的HTML
+        max_tokens: 令牌预算
+
+    Returns:
+        精简后的表单描述，没有找到字段时返回去掉标签的页面文字摘要
+    """
+    forms = extract_form_structure(html)
+    if forms:
+        return distill_forms(forms, max_tokens)
+
+    # 没有可识别的字段时，至少保留可见文字
+    text = re.sub(r"<(script|style|svg|noscript)[^>]*>.*?</\1>", " ", html, flags=re.DOTALL | re.IGNORECASE)
+    text = _clean_text(re.sub(r"<[^>]+>", " ", text))
+    return text[:max_tokens * 2]
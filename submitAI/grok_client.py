@@ -1,122 +1,40 @@
-import json
-import aiohttp
 import os
 from typing import List, Dict, Any, Optional
-from .proxy_helper import get_aiohttp_proxy
+from .llm_cache import LLMCache
+from .llm_provider import LLMProvider
+from .form_analysis_cache import FormAnalysisCache
 
-class GrokAIClient:
+class GrokAIClient(LLMProvider):
     """Grok API客户端，用于调用AI完成表单填写和提交"""
     
-    def __init__(self, api_key: str):
+    DEFAULT_API_URL = "https://api.x.ai/v1/chat/completions"
+    DEFAULT_MODEL = "grok-3-latest"
+    
+    def __init__(self, api_key: str, cache: Optional[LLMCache] = None,
+                 form_cache: Optional[FormAnalysisCache] = None,
+                 api_url: Optional[str] = None, model: Optional[str] = None):
         """初始化Grok API客户端
         
         Args:
             api_key: Grok API密钥
+            cache: 响应缓存，默认使用进程内共享的磁盘缓存
+            form_cache: 目录表单分析结果存储，默认使用进程内共享的存储
+            api_url: 接口地址，默认读取环境变量GROK_API_URL
+            model: 模型名称，默认读取环境变量GROK_MODEL
         """
-        self.api_key = api_key
-        self.api_url = "https://api.x.ai/v1/chat/completions"
-        self.model = "grok-3-latest"
-        
-    async def chat_completion(self, 
-                            messages: List[Dict[str, str]], 
-                            temperature: float = 0.7, 
-                            max_tokens: Optional[int] = None) -> Dict[str, Any]:
-        """发送聊天完成请求到Grok API
-        
-        Args:
-            messages: 消息列表
-            temperature: 温度参数，控制输出随机性
-            max_tokens: 最大生成令牌数
-            
-        Returns:
-            API响应
-        """
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.api_key}"
-        }
-        
-        payload = {
-            "messages": messages,
-            "model": self.model,
-            "temperature": temperature,
-            "stream": False
-        }
-        
-        if max_tokens is not None:
-            payload["max_tokens"] = max_tokens
-        
-        # 获取代理设置
-        proxy = get_aiohttp_proxy()
-        
-        # 使用代理设置创建会话
-        async with aiohttp.ClientSession() as session:
-            # 如果有代理设置，使用代理
-            conn_kwargs = {}
-            if proxy:
-                conn_kwargs['proxy'] = proxy
-                print(f"使用代理: {proxy}")
-            
-            async with session.post(self.api_url, headers=headers, json=payload, **conn_kwargs) as response:
-                if response.status != 200:
-                    error_text = await response.text()
-                    raise Exception(f"API调用失败，状态码: {response.status}, 错误: {error_text}")
-                
-                result = await response.json()
-                return result
-    
-    async def generate_submission_content(self, 
-                                    form_fields: Dict[str, Any], 
-                                    target_url: str) -> Dict[str, Any]:
-        """生成用于网站提交的内容
-        
-        Args:
-            form_fields: 表单字段信息
-            target_url: 目标提交网址
-            
-        Returns:
-            生成的提交内容
-        """
-        # 构建提示词
-        prompt = self._build_submission_prompt(form_fields, target_url)
-        
-        # 调用API
-        messages = [
-            {"role": "system", "content": "你是一个专业的AI工具提交助手，帮助用户将AI工具信息提交到目录网站。"
-                               "你擅长理解网站表单结构，并生成最合适的提交内容，以增加审核通过率。"},
-            {"role": "user", "content": prompt}
-        ]
-        
-        response = await self.chat_completion(messages, temperature=0.3)
-        
-        # 解析响应
-        ai_response = response.get("choices", [{}])[0].get("message", {}).get("content", "")
-        
-        try:
-            # 尝试解析JSON响应
-            result = json.loads(ai_response)
-            return result
-        except:
-            # 如果不是有效的JSON，返回原始文本
-            return {"error": "无法解析AI响应", "raw_response": ai_response}
+        super().__init__(
+            "grok", api_key,
+            api_url=api_url or os.getenv("GROK_API_URL", self.DEFAULT_API_URL),
+            model=model or os.getenv("GROK_MODEL", self.DEFAULT_MODEL),
+            cache=cache, form_cache=form_cache
+        )
     
-    async def analyze_submission_form(self, form_html: str, form_fields: Dict[str, Any]) -> Dict[str, Any]:
-        """分析提交表单结构并匹配我们的字段
-        
-        Args:
-            form_html: 表单HTML内容
-            form_fields: 我们的表单字段
-            
-        Returns:
-            字段映射和填写策略
-        """
-        # 将表单字段转换为JSON字符串
-        fields_json = json.dumps(form_fields, indent=2, ensure_ascii=False)
-        
+    def _build_form_analysis_messages(self, form_summary: str, fields_json: str) -> List[Dict[str, str]]:
+        """构建表单分析请求的消息列表"""
         # 构建提示词
         prompt = (
             "分析下面的HTML表单，并确定如何将我们的产品信息映射到表单字段中：\n\n"
-            "HTML表单：\n```html\n" + form_html + "\n```\n\n"
+            "表单字段清单（由HTML精简而来，每行一个字段及其属性、标签和选项）：\n```\n" + form_summary + "\n```\n\n"
             "我们的产品信息：\n```json\n" + fields_json + "\n```\n\n"
             "请提供一个JSON格式的映射，包含：\n"
             "1. 表单中的每个输入字段的ID或名称\n"
@@ -131,56 +49,18 @@ class GrokAIClient:
             '  "special_instructions": "..."\n'
             "}"
         )
-        
-        # 调用API
-        messages = [
+        return [
             {"role": "system", "content": "你是一个专业的网页分析助手，擅长分析HTML表单结构并提供字段映射。"},
             {"role": "user", "content": prompt}
         ]
-        
-        response = await self.chat_completion(messages, temperature=0.2)
-        
-        # 解析响应
-        ai_response = response.get("choices", [{}])[0].get("message", {}).get("content", "")
-        
-        try:
-            # 提取JSON部分
-            import re
-            json_match = re.search(r'```json\n(.*?)\n```', ai_response, re.DOTALL)
-            if json_match:
-                result = json.loads(json_match.group(1))
-            else:
-                # 尝试直接解析整个响应
-                result = json.loads(ai_response)
-            return result
-        except:
-            # 如果无法解析为JSON，返回原始文本
-            return {"error": "无法解析AI响应", "raw_response": ai_response}
     
-    async def generate_form_filling_instructions(self, 
-                                           form_html: str, 
-                                           form_fields: Dict[str, Any],
-                                           target_url: str) -> str:
-        """生成表单填写指令
-        
-        Args:
-            form_html: 表单HTML内容
-            form_fields: 我们的表单字段
-            target_url: 目标提交网址
-            
-        Returns:
-            表单填写指令
-        """
-        # 限制HTML内容长度，避免超出token限制
-        limited_html = form_html[:2000]
-        
-        # 将表单字段转换为JSON字符串
-        fields_json = json.dumps(form_fields, indent=2, ensure_ascii=False)
-        
+    def _build_form_filling_messages(self, form_summary: str, fields_json: str,
+                                     target_url: str) -> List[Dict[str, str]]:
+        """构建填写指令请求的消息列表"""
         # 构建提示词
         prompt = (
             "我需要你帮我生成一组具体的指令，用于在以下URL的表单中填写我们的产品信息：" + target_url + "\n\n"
-            "表单HTML片段:\n```html\n" + limited_html + "\n```\n\n"
+            "表单字段清单:\n```\n" + form_summary + "\n```\n\n"
             "我们的产品信息:\n```json\n" + fields_json + "\n```\n\n"
             "请生成详细的步骤说明，包括:\n"
             "1. 如何找到每个相关的表单字段\n"
@@ -189,18 +69,10 @@ class GrokAIClient:
             "4. 提交后可能的验证步骤\n\n"
             "格式要求：生成纯文本步骤，以编号形式列出，便于程序解析。"
         )
-        
-        # 调用API
-        messages = [
+        return [
             {"role": "system", "content": "你是一个专业的网页自动化助手，擅长生成网页填表指令。"},
             {"role": "user", "content": prompt}
         ]
-        
-        response = await self.chat_completion(messages, temperature=0.2)
-        
-        # 获取响应
-        ai_response = response.get("choices", [{}])[0].get("message", {}).get("content", "")
-        return ai_response
     
     def _build_submission_prompt(self, form_fields: Dict[str, Any], target_url: str) -> str:
         """构建提交提示词
@@ -213,7 +85,7 @@ class GrokAIClient:
             构建的提示词
         """
         # 将表单字段转换为格式化文本
-        fields_text = "\n".join([f"- {k}: {v}" for k, v in form_fields.items() if v])
+        fields_text = self._fields_text(form_fields)
         
         # 构建提示词
         prompt = (
@@ -231,4 +103,38 @@ class GrokAIClient:
             "- special_fields（如有需要）\n\n"
             "确保返回的内容格式符合预期，并对描述进行优化，使其更容易被该目录网站接受。"
         )
-        return prompt 
\ No newline at end of file
+        return prompt 
+    
+    def _build_batch_submission_prompt(self, form_fields: Dict[str, Any], target_urls: List[str]) -> str:
+        """构建批量提交提示词
+        
+        Args:
+            form_fields: 表单字段
+            target_urls: 目标URL列表
+            
+        Returns:
+            构建的提示词
+        """
+        # 将表单字段转换为格式化文本
+        fields_text = self._fields_text(form_fields)
+        sites_text = "\n".join([f"{index}. {url}" for index, url in enumerate(target_urls)])
+        
+        # 构建提示词
+        prompt = (
+            "我需要将AI工具分别提交到以下目录网站：\n" + sites_text + "\n\n"
+            "我的产品信息如下：\n" + fields_text + "\n\n"
+            "请为每个网站分别生成以下内容：\n"
+            "1. 一个优化后的简短描述（最多150字）\n"
+            "2. 一个详细描述（针对该网站优化，突出工具的核心功能和价值）\n"
+            "3. 适合该网站的标签（以JSON数组格式）\n"
+            "4. 任何其他需要特别调整的字段\n\n"
+            "请只返回一个JSON对象，格式如下：\n"
+            "{\n"
+            '  "results": [\n'
+            '    {"index": 网站编号, "target_url": "网站地址", "short_description": "...", '
+            '"detailed_description": "...", "tags": ["..."], "special_fields": {}}\n'
+            "  ]\n"
+            "}\n\n"
+            "results中必须为每个网站各包含一项。"
+        )
+        return prompt
@@ -0,0 +1,80 @@
+"""
+HTTP会话模块，为LLM客户端提供延迟创建、长连接复用的aiohttp会话
+"""
+
+import asyncio
+from typing import Optional
+
+import aiohttp
+
+from .proxy_helper import get_aiohttp_proxy
+
+
+# 视为暂时性故障、可以重试的aiohttp异常
+TRANSIENT_ERRORS = (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError)
+
+
+class PooledSession:
+    """客户端持有的aiohttp会话
+
+    首次使用时创建会话，之后的请求复用连接池中的长连接（跳过DNS、TCP和TLS握手）。
+    代理设置在创建时解析一次。
+    """
+
+    def __init__(self, limit: int = 100, limit_per_host: int = 20,
+                 keepalive_timeout: float = 60.0, ttl_dns_cache: int = 300,
+                 timeout: Optional[aiohttp.ClientTimeout] = None):
+        """初始化会话配置
+
+        Args:
+            limit: 连接池总连接数上限
+            limit_per_host: 单个主机的连接数上限
+            keepalive_timeout: 空闲长连接保持的秒数
+            ttl_dns_cache: DNS解析结果缓存的秒数
+            timeout: 默认请求超时，默认只限制建立连接的时间
+        """
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.ttl_dns_cache = ttl_dns_cache
+        self.timeout = timeout or aiohttp.ClientTimeout(total=None, sock_connect=10)
+
+        # 代理只解析一次
+        self.proxy = get_aiohttp_proxy()
+        if self.proxy:
+            print(f"使用代理: {self.proxy}")
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def get(self) -> aiohttp.ClientSession:
+        """获取会话，尚未创建、已关闭或事件循环变化时重新创建"""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=self.ttl_dns_cache,
+                enable_cleanup_closed=True,
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+            self._loop = loop
+        return self._session
+
+    def request_kwargs(self, timeout: Optional[float] = None) -> dict:
+        """单次请求需要附加的参数（代理和本次请求的超时）
+
+        Args:
+            timeout: 本次请求的总超时秒数
+        """
+        kwargs = {"proxy": self.proxy} if self.proxy else {}
+        if timeout is not None:
+            kwargs["timeout"] = aiohttp.ClientTimeout(total=timeout, sock_connect=self.timeout.sock_connect)
+        return kwargs
+
+    async def aclose(self) -> None:
+        """关闭会话及其连接池"""
+        session, self._session = self._session, None
+        if session is not None and not session.closed:
+            await session.close()
@@ -0,0 +1,327 @@
+"""
+持久化任务队列模块，基于SQLite保存提交任务，支持租约、心跳和崩溃后重新入队
+"""
+
+import os
+import sqlite3
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+# 任务状态
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+DEFAULT_DB_PATH = os.getenv("JOB_QUEUE_DB", "data/jobs.db")
+
+
+class JobQueue:
+    """SQLite持久化任务队列
+
+    Web进程只负责入队；工作进程通过claim()领取任务并持有一段时间的租约，
+    运行期间定期heartbeat()续约。工作进程崩溃后租约过期，任务会被重新放回队列。
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH,
+                 lease_seconds: int = 120,
+                 max_attempts: int = 3):
+        """初始化任务队列
+
+        Args:
+            db_path: SQLite数据库文件路径
+            lease_seconds: 每次领取或心跳后租约的有效秒数
+            max_attempts: 单个任务最多尝试次数
+        """
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        return conn
+
+    def _init_db(self) -> None:
+        conn = self._connect()
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    submission_id TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    priority INTEGER NOT NULL DEFAULT 0,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_attempts INTEGER NOT NULL,
+                    worker_id TEXT,
+                    lease_expires_at REAL,
+                    last_error TEXT,
+                    cancel_requested INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs (status, priority DESC, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_submission ON jobs (submission_id)")
+        finally:
+            conn.close()
+
+    def enqueue(self, submission_id: str, priority: int = 0) -> str:
+        """将提交加入队列
+
+        同一提交已在排队或运行中时不会重复入队，直接返回已有任务ID。
+
+        Args:
+            submission_id: 提交ID
+            priority: 优先级，数值越大越先处理
+
+        Returns:
+            任务ID
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE submission_id = ? AND status IN (?, ?)",
+                (submission_id, JOB_QUEUED, JOB_RUNNING)
+            ).fetchone()
+            if row:
+                conn.execute("COMMIT")
+                return row["id"]
+
+            job_id = str(uuid.uuid4())
+            conn.execute(
+                "INSERT INTO jobs (id, submission_id, status, priority, attempts, max_attempts, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, 0, ?, ?, ?)",
+                (job_id, submission_id, JOB_QUEUED, priority, self.max_attempts, now, now)
+            )
+            conn.execute("COMMIT")
+            return job_id
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def claim(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        """领取一个排队中的任务
+
+        Args:
+            worker_id: 工作进程标识
+
+        Returns:
+            任务信息，队列为空时返回None
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            self._requeue_expired(conn, now)
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = ? ORDER BY priority DESC, created_at LIMIT 1",
+                (JOB_QUEUED,)
+            ).fetchone()
+            if not row:
+                conn.execute("COMMIT")
+                return None
+
+            conn.execute(
+                "UPDATE jobs SET status = ?, worker_id = ?, lease_expires_at = ?, attempts = attempts + 1, updated_at = ? "
+                "WHERE id = ?",
+                (JOB_RUNNING, worker_id, now + self.lease_seconds, now, row["id"])
+            )
+            conn.execute("COMMIT")
+
+            job = dict(row)
+            job.update(status=JOB_RUNNING, worker_id=worker_id, attempts=row["attempts"] + 1)
+            return job
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        """续约任务
+
+        Returns:
+            是否仍由该工作进程持有任务
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                "UPDATE jobs SET lease_expires_at = ?, updated_at = ? WHERE id = ? AND worker_id = ? AND status = ?",
+                (now + self.lease_seconds, now, job_id, worker_id, JOB_RUNNING)
+            )
+            return cursor.rowcount == 1
+        finally:
+            conn.close()
+
+    def complete(self, job_id: str, worker_id: str) -> None:
+        """标记任务完成"""
+        self._finish(job_id, worker_id, JOB_COMPLETED, None)
+
+    def fail(self, job_id: str, worker_id: str, error: str, retry: bool = True) -> None:
+        """标记任务失败
+
+        Args:
+            job_id: 任务ID
+            worker_id: 工作进程标识
+            error: 错误信息
+            retry: 是否在尚有尝试次数时重新入队
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT attempts, max_attempts FROM jobs WHERE id = ? AND worker_id = ?",
+                (job_id, worker_id)
+            ).fetchone()
+            if row:
+                status = JOB_QUEUED if retry and row["attempts"] < row["max_attempts"] else JOB_FAILED
+                conn.execute(
+                    "UPDATE jobs SET status = ?, worker_id = NULL, lease_expires_at = NULL, last_error = ?, updated_at = ? "
+                    "WHERE id = ?",
+                    (status, error[:500], now, job_id)
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def cancel(self, submission_id: str) -> Dict[str, int]:
+        """取消提交的任务
+        
+        排队中的任务直接标记为已取消；运行中的任务只设置取消标记，
+        由持有它的工作进程在心跳时发现并中止执行。
+        
+        Args:
+            submission_id: 提交ID
+            
+        Returns:
+            {"queued": 直接取消的任务数, "running": 已通知取消的运行中任务数}
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            queued = conn.execute(
+                "UPDATE jobs SET status = ?, last_error = ?, updated_at = ? WHERE submission_id = ? AND status = ?",
+                (JOB_CANCELLED, "用户取消", now, submission_id, JOB_QUEUED)
+            ).rowcount
+            running = conn.execute(
+                "UPDATE jobs SET cancel_requested = 1, updated_at = ? WHERE submission_id = ? AND status = ?",
+                (now, submission_id, JOB_RUNNING)
+            ).rowcount
+            conn.execute("COMMIT")
+            return {"queued": queued, "running": running}
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+    
+    def is_cancel_requested(self, job_id: str) -> bool:
+        """任务是否被请求取消"""
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            return bool(row and row["cancel_requested"])
+        finally:
+            conn.close()
+    
+    def mark_cancelled(self, job_id: str, worker_id: str) -> None:
+        """标记运行中的任务已按请求取消"""
+        self._finish(job_id, worker_id, JOB_CANCELLED, "用户取消")
+    
+    def _finish(self, job_id: str, worker_id: str, status: str, error: Optional[str]) -> None:
+        conn = self._connect()
+        try:
+            conn.execute(
+                "UPDATE jobs SET status = ?, lease_expires_at = NULL, last_error = ?, updated_at = ? "
+                "WHERE id = ? AND worker_id = ?",
+                (status, error, time.time(), job_id, worker_id)
+            )
+        finally:
+            conn.close()
+
+    def _requeue_expired(self, conn: sqlite3.Connection, now: float) -> int:
+        """将租约过期的任务放回队列，超过尝试次数的标记为失败，已请求取消的标记为已取消"""
+        conn.execute(
+            "UPDATE jobs SET status = ?, worker_id = NULL, lease_expires_at = NULL, updated_at = ? "
+            "WHERE status = ? AND lease_expires_at < ? AND cancel_requested = 1",
+            (JOB_CANCELLED, now, JOB_RUNNING, now)
+        )
+        conn.execute(
+            "UPDATE jobs SET status = ?, worker_id = NULL, lease_expires_at = NULL, last_error = ?, updated_at = ? "
+            "WHERE status = ? AND lease_expires_at < ? AND attempts >= max_attempts",
+            (JOB_FAILED, "工作进程租约过期，已达最大尝试次数", now, JOB_RUNNING, now)
+        )
+        cursor = conn.execute(
+            "UPDATE jobs SET status = ?, worker_id = NULL, lease_expires_at = NULL, last_error = ?, updated_at = ? "
+            "WHERE status = ? AND lease_expires_at < ?",
+            (JOB_QUEUED, "工作进程租约过期，重新入队", now, JOB_RUNNING, now)
+        )
+        return cursor.rowcount
+
+    def requeue_expired(self) -> int:
+        """将租约过期的任务放回队列
+
+        Returns:
+            重新入队的任务数
+        """
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            count = self._requeue_expired(conn, time.time())
+            conn.execute("COMMIT")
+            return count
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """获取任务信息"""
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            return dict(row) if row else None
+        finally:
+            conn.close()
+
+    def jobs_for_submission(self, submission_id: str) -> List[Dict[str, Any]]:
+        """获取某个提交的全部任务，最新的在前"""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT * FROM jobs WHERE submission_id = ? ORDER BY created_at DESC",
+                (submission_id,)
+            ).fetchall()
+            return [dict(row) for row in rows]
+        finally:
+            conn.close()
+
+    def stats(self) -> Dict[str, int]:
+        """按状态统计任务数"""
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT status, COUNT(*) AS count FROM jobs GROUP BY status").fetchall()
+            return {row["status"]: row["count"] for row in rows}
+        finally:
+            conn.close()
@@ -0,0 +1,185 @@
+"""
+LLM响应缓存模块，按模型、消息和采样参数的哈希在SQLite中缓存聊天完成结果
+
+提交重试或重复提交到同一目录时，相同的请求直接返回缓存，不再消耗token。
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+DEFAULT_DB_PATH = os.getenv("LLM_CACHE_DB", "data/llm_cache.db")
+
+
+class LLMCache:
+    """内容寻址的LLM响应缓存，带过期时间和按最近访问淘汰"""
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH,
+                 ttl_seconds: int = 7 * 24 * 3600,
+                 max_entries: int = 5000,
+                 enabled: bool = True):
+        """初始化缓存
+
+        Args:
+            db_path: SQLite数据库文件路径
+            ttl_seconds: 缓存条目的有效秒数
+            max_entries: 最多保留的条目数，超出时淘汰最久未访问的条目
+            enabled: 是否启用缓存，关闭后读写都会被跳过
+        """
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self.enabled = enabled
+        self._local = threading.local()
+
+        # 统计信息
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if enabled:
+            db_dir = os.path.dirname(db_path)
+            if db_dir:
+                os.makedirs(db_dir, exist_ok=True)
+            self._init_db()
+
+    def _conn(self) -> sqlite3.Connection:
+        """获取当前线程的数据库连接"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def _init_db(self) -> None:
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                hit_count INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_access ON llm_cache (last_access)")
+
+    @staticmethod
+    def make_key(api_url: str, model: str, messages: List[Dict[str, str]], temperature: float,
+                 max_tokens: Optional[int] = None) -> str:
+        """计算请求的缓存键
+
+        不同接口地址即使模型名称相同（如指向兼容代理的OPENAI_API_URL）也不共用缓存。
+
+        Args:
+            api_url: 接口地址
+            model: 模型名称
+            messages: 消息列表
+            temperature: 温度参数
+            max_tokens: 最大生成令牌数
+
+        Returns:
+            SHA-256十六进制摘要
+        """
+        payload = json.dumps(
+            {"api_url": api_url, "model": model, "messages": messages, "temperature": temperature, "max_tokens": max_tokens},
+            ensure_ascii=False, sort_keys=True, separators=(",", ":")
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """读取未过期的缓存响应，命中时更新访问时间"""
+        if not self.enabled:
+            return None
+        now = time.time()
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or now - row["created_at"] > self.ttl_seconds:
+            self.misses += 1
+            return None
+
+        conn.execute(
+            "UPDATE llm_cache SET last_access = ?, hit_count = hit_count + 1 WHERE key = ?", (now, key)
+        )
+        self.hits += 1
+        return json.loads(row["response"])
+
+    def set(self, key: str, response: Dict[str, Any], model: Optional[str] = None) -> None:
+        """写入缓存，并在超出容量时淘汰最久未访问的条目"""
+        if not self.enabled:
+            return
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, model, response, created_at, last_access, hit_count) "
+                "VALUES (?, ?, ?, ?, ?, 0)",
+                (key, model, json.dumps(response, ensure_ascii=False), now, now)
+            )
+            conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+            count = conn.execute("SELECT COUNT(*) AS count FROM llm_cache").fetchone()["count"]
+            if count > self.max_entries:
+                cursor = conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN "
+                    "(SELECT key FROM llm_cache ORDER BY last_access LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+                self.evictions += cursor.rowcount
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def delete(self, key: str) -> None:
+        """删除单个缓存条目（例如响应无法解析时）"""
+        if self.enabled:
+            self._conn().execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        """清空缓存"""
+        if self.enabled:
+            self._conn().execute("DELETE FROM llm_cache")
+
+    def stats(self) -> Dict[str, Any]:
+        """返回缓存统计"""
+        entries = 0
+        if self.enabled:
+            entries = self._conn().execute("SELECT COUNT(*) AS count FROM llm_cache").fetchone()["count"]
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "evictions": self.evictions,
+        }
+
+
+_default_cache: Optional[LLMCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMCache:
+    """获取进程内共享的LLM缓存，配置来自环境变量"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = LLMCache(
+                ttl_seconds=int(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600))),
+                max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000")),
+                enabled=os.getenv("LLM_CACHE_ENABLED", "true").lower() not in ("0", "false", "no"),
+            )
+        return _default_cache
@@ -0,0 +1,674 @@
+"""
+LLM提供方基类，封装聊天完成接口的调用、流式解析、请求合并、缓存、限流、重试和熔断
+
+各提供方（OpenAI、Grok等）只需指定接口地址和模型，并实现各自的提示词。
+"""
+
+import abc
+import asyncio
+import json
+import re
+import time
+from contextlib import asynccontextmanager
+from typing import List, Dict, Any, AsyncContextManager, Callable, Iterable, Optional, Set
+from .http_session import PooledSession, TRANSIENT_ERRORS
+from .llm_cache import LLMCache, get_llm_cache
+from .form_analysis_cache import FormAnalysisCache, form_fingerprint, get_form_analysis_cache
+from .resilience import LLMAPIError, ResilientCaller, get_circuit_breaker, parse_retry_after
+from .streaming import IncrementalJSONParser, extract_delta, iter_sse_data
+from .form_distiller import distill_form_html, estimate_tokens
+from .usage_tracker import UsageTracker, get_usage_tracker
+from .singleflight import SingleFlight, get_single_flight
+from .rate_limiter import DEFAULT_COMPLETION_TOKENS, LLMRateLimiter, get_rate_limiter
+
+# 提交流程使用的生成内容字段，流式接收时到齐即可结束；special_fields是可选字段，
+# 模型输出了它才等待其完整，没有输出时流在对象结束时自然结束
+SUBMISSION_CONTENT_KEYS = ("short_description", "detailed_description", "tags", "special_fields")
+
+
+class LLMProvider(abc.ABC):
+    """兼容OpenAI聊天完成接口的LLM提供方
+    
+    请求、解析和错误处理由基类完成，子类只提供各自的提示词。
+    """
+    
+    # 表单分析和填写指令请求的最大生成令牌数，为None时由接口决定
+    FORM_MAX_TOKENS: Optional[int] = None
+    # 提示词中产品信息单个字段的最大字符数，为None时不截断
+    FIELD_VALUE_MAX_CHARS: Optional[int] = None
+    
+    def __init__(self, name: str, api_key: str, api_url: str, model: str,
+                 cache: Optional[LLMCache] = None,
+                 form_cache: Optional[FormAnalysisCache] = None,
+                 usage: Optional[UsageTracker] = None,
+                 flights: Optional[SingleFlight] = None,
+                 limiter: Optional[LLMRateLimiter] = None):
+        """初始化提供方
+        
+        Args:
+            name: 提供方名称，用于日志和统计
+            api_key: API密钥
+            api_url: 聊天完成接口地址
+            model: 模型名称
+            cache: 响应缓存，默认使用进程内共享的磁盘缓存
+            form_cache: 目录表单分析结果存储，默认使用进程内共享的存储
+            usage: 用量统计，默认使用进程内共享的存储
+            flights: 请求合并组，默认使用进程内共享的合并组
+            limiter: 限流器，默认使用该提供方在进程内共享的限流器
+        """
+        self.name = name
+        self.api_key = api_key
+        self.api_url = api_url
+        self.model = model
+        
+        # 延迟创建的共享HTTP会话
+        self._http = PooledSession()
+        
+        # 同一接口的客户端共享熔断器
+        self._resilience = ResilientCaller(get_circuit_breaker(self.api_url),
+                                           retry_exceptions=TRANSIENT_ERRORS)
+        
+        # 相同请求直接返回缓存的响应
+        self.cache = cache or get_llm_cache()
+        
+        # 表单结构未变化的目录复用上次的字段映射
+        self.form_cache = form_cache or get_form_analysis_cache()
+        
+        # 记录每次调用的令牌数、耗时和费用
+        self.usage = usage or get_usage_tracker()
+        
+        # 相同请求同时进行时只调用一次，位于响应缓存之前
+        self.flights = flights or get_single_flight()
+        
+        # 控制同时进行的请求数和每分钟的请求数、令牌数
+        self.limiter = limiter or get_rate_limiter(self.name)
+        
+    @staticmethod
+    def _estimate_request_tokens(messages: List[Dict[str, str]], max_tokens: Optional[int]) -> int:
+        """预估一次请求消耗的令牌数，用于限流"""
+        prompt_tokens = estimate_tokens("".join(m.get("content", "") for m in messages))
+        return prompt_tokens + (max_tokens or DEFAULT_COMPLETION_TOKENS)
+    
+    def _rate_gate(self, messages: List[Dict[str, str]], max_tokens: Optional[int],
+                   usage: Dict[str, Any]) -> Callable[[], AsyncContextManager[Any]]:
+        """为每次HTTP尝试占用一个限流许可，重试同样计入每分钟请求数和令牌数，退避等待期间不占用
+        
+        Args:
+            messages: 消息列表
+            max_tokens: 最大生成令牌数
+            usage: 尝试成功后由attempt写入的令牌用量，用于按实际用量结算许可
+        """
+        estimated = self._estimate_request_tokens(messages, max_tokens)
+        
+        @asynccontextmanager
+        async def gate():
+            async with self.limiter.slot(estimated) as permit:
+                yield
+                permit.used_tokens = usage.get("total_tokens")
+        
+        return gate
+    
+    async def _record_usage(self, started: float, usage: Optional[Dict[str, Any]] = None,
+                            messages: Optional[List[Dict[str, str]]] = None,
+                            output_text: str = "", cached: bool = False, success: bool = True) -> None:
+        """记录一次调用的用量，接口没有返回用量时按文本长度估算"""
+        estimated = False
+        if usage:
+            prompt_tokens = usage.get("prompt_tokens", 0)
+            completion_tokens = usage.get("completion_tokens", 0)
+        elif cached or not success:
+            prompt_tokens = completion_tokens = 0
+        else:
+            estimated = True
+            prompt_tokens = estimate_tokens("".join(m.get("content", "") for m in messages or []))
+            completion_tokens = estimate_tokens(output_text)
+        try:
+            await asyncio.to_thread(
+                self.usage.record, self.name, self.model, prompt_tokens, completion_tokens,
+                time.monotonic() - started, cached, estimated, success
+            )
+        except Exception as e:
+            # 统计失败不影响调用结果
+            print(f"记录LLM用量失败: {str(e)}")
+        
+    async def chat_completion(self, 
+                            messages: List[Dict[str, str]], 
+                            temperature: float = 0.7, 
+                            max_tokens: Optional[int] = None,
+                            use_cache: bool = True) -> Dict[str, Any]:
+        """发送聊天完成请求到提供方接口
+        
+        Args:
+            messages: 消息列表
+            temperature: 温度参数，控制输出随机性
+            max_tokens: 最大生成令牌数
+            use_cache: 是否读写响应缓存，为False时总是请求API
+            
+        Returns:
+            API响应
+        """
+        started = time.monotonic()
+        flight_key = ("chat", use_cache, self._cache_key(messages, temperature, max_tokens))
+        result, shared = await self.flights.do(
+            flight_key, lambda: self._chat_completion(messages, temperature, max_tokens, use_cache)
+        )
+        if shared:
+            # 复用了同时进行的相同请求，不产生额外费用
+            await self._record_usage(started, cached=True)
+        return result
+    
+    async def _chat_completion(self, messages: List[Dict[str, str]], temperature: float,
+                               max_tokens: Optional[int], use_cache: bool) -> Dict[str, Any]:
+        """查缓存并在未命中时调用接口，由chat_completion合并相同请求后调用"""
+        started = time.monotonic()
+        cache_key = None
+        if use_cache and self.cache.enabled:
+            cache_key = self._cache_key(messages, temperature, max_tokens)
+            try:
+                cached = await asyncio.to_thread(self.cache.get, cache_key)
+            except Exception as e:
+                print(f"读取LLM缓存失败: {str(e)}")
+                cached = None
+            if cached is not None:
+                await self._record_usage(started, cached=True)
+                return cached
+        
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.api_key}"
+        }
+        
+        payload = {
+            "messages": messages,
+            "model": self.model,
+            "temperature": temperature,
+            "stream": False
+        }
+        
+        if max_tokens is not None:
+            payload["max_tokens"] = max_tokens
+        
+        usage: Dict[str, Any] = {}
+        
+        async def attempt(timeout: float) -> Dict[str, Any]:
+            usage.clear()
+            # 复用客户端的会话和长连接，代理设置在创建会话时已解析
+            session = self._http.get()
+            async with session.post(self.api_url, headers=headers, json=payload,
+                                    **self._http.request_kwargs(timeout)) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                    if response.status == 429:
+                        # 已触发限额，暂停放行其他请求
+                        self.limiter.pause(retry_after or 1.0)
+                    raise LLMAPIError(response.status, error_text, retry_after)
+                result = await response.json()
+            usage.update(result.get("usage") or {})
+            return result
+        
+        # 限流、5xx和超时按退避重试，接口持续故障时熔断；每次尝试各自占用限流许可
+        try:
+            result = await self._resilience.call(attempt, self._rate_gate(messages, max_tokens, usage))
+        except Exception:
+            await self._record_usage(started, success=False)
+            raise
+        await self._record_usage(started, result.get("usage"), messages,
+                                 result.get("choices", [{}])[0].get("message", {}).get("content", ""))
+        
+        if cache_key:
+            try:
+                await asyncio.to_thread(self.cache.set, cache_key, result, self.model)
+            except Exception as e:
+                # 缓存写入失败不影响本次结果
+                print(f"写入LLM缓存失败: {str(e)}")
+        return result
+    
+    async def stream_json_completion(self,
+                                     messages: List[Dict[str, str]],
+                                     temperature: float = 0.7,
+                                     max_tokens: Optional[int] = None,
+                                     required_keys: Optional[Iterable[str]] = None,
+                                     on_field: Optional[Callable[[str, Any], None]] = None,
+                                     use_cache: bool = True) -> Dict[str, Any]:
+        """以流式方式请求JSON输出，边接收边解析顶层字段
+        
+        Args:
+            messages: 消息列表
+            temperature: 温度参数，控制输出随机性
+            max_tokens: 最大生成令牌数
+            required_keys: 所需字段，全部到齐后提前结束请求
+            on_field: 每个字段完整时调用的回调，参数为字段名和字段值
+            use_cache: 是否读写响应缓存
+            
+        Returns:
+            解析出的JSON对象（提前结束时只包含已完整的字段）
+        """
+        started = time.monotonic()
+        required_keys = list(required_keys or [])
+        flight_key = ("stream", use_cache, tuple(required_keys),
+                      self._cache_key(messages, temperature, max_tokens))
+        result, shared = await self.flights.do(
+            flight_key,
+            lambda: self._stream_json_completion(messages, temperature, max_tokens,
+                                                 required_keys, on_field, use_cache)
+        )
+        if shared:
+            # 发起方的回调已在流式接收时调用，这里为本调用方补发全部字段
+            if on_field:
+                for key, value in result.items():
+                    on_field(key, value)
+            await self._record_usage(started, cached=True)
+        return result
+    
+    async def _stream_json_completion(self, messages: List[Dict[str, str]], temperature: float,
+                                      max_tokens: Optional[int], required_keys: List[str],
+                                      on_field: Optional[Callable[[str, Any], None]],
+                                      use_cache: bool) -> Dict[str, Any]:
+        """查缓存并在未命中时流式调用接口，由stream_json_completion合并相同请求后调用"""
+        started = time.monotonic()
+        cache_key = None
+        if use_cache and self.cache.enabled:
+            # 与非流式请求共用缓存键，完整的流式响应也可供chat_completion使用
+            cache_key = self._cache_key(messages, temperature, max_tokens)
+            try:
+                cached = await asyncio.to_thread(self.cache.get, cache_key)
+            except Exception as e:
+                print(f"读取LLM缓存失败: {str(e)}")
+                cached = None
+            if cached is not None:
+                parser = IncrementalJSONParser()
+                parser.feed(cached.get("choices", [{}])[0].get("message", {}).get("content", ""))
+                if on_field:
+                    for key, value in parser.fields.items():
+                        on_field(key, value)
+                await self._record_usage(started, cached=True)
+                return parser.result()
+        
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.api_key}"
+        }
+        
+        payload = {
+            "messages": messages,
+            "model": self.model,
+            "temperature": temperature,
+            "stream": True,
+            # 在最后一个事件中返回令牌用量
+            "stream_options": {"include_usage": True}
+        }
+        
+        if max_tokens is not None:
+            payload["max_tokens"] = max_tokens
+        
+        usage: Dict[str, Any] = {}
+        # 中途失败重试时新的解析器会重新解析出已回调过的字段，每个字段只回调一次
+        delivered: Set[str] = set()
+        
+        async def attempt(timeout: float) -> IncrementalJSONParser:
+            parser = IncrementalJSONParser()
+            usage.clear()
+            session = self._http.get()
+            async with session.post(self.api_url, headers=headers, json=payload,
+                                    **self._http.request_kwargs(timeout)) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                    if response.status == 429:
+                        # 已触发限额，暂停放行其他请求
+                        self.limiter.pause(retry_after or 1.0)
+                    raise LLMAPIError(response.status, error_text, retry_after)
+                async for data in iter_sse_data(response.content):
+                    event = json.loads(data)
+                    usage.update(event.get("usage") or {})
+                    completed = parser.feed(extract_delta(event))
+                    if on_field:
+                        for key, value in completed.items():
+                            if key not in delivered:
+                                delivered.add(key)
+                                on_field(key, value)
+                    if required_keys and not parser.done and parser.has_fields(required_keys):
+                        # 所需字段已到齐，关闭连接不再接收剩余输出
+                        break
+            return parser
+        
+        try:
+            parser = await self._resilience.call(attempt, self._rate_gate(messages, max_tokens, usage))
+        except Exception:
+            await self._record_usage(started, success=False)
+            raise
+        # 提前结束时接口不会返回用量，按已接收的文本估算
+        await self._record_usage(started, usage or None, messages, parser.text)
+        
+        complete = parser.done or bool(required_keys and parser.has_fields(required_keys))
+        if cache_key and complete:
+            # 缓存完整的响应；提前结束时缓存已解析的所需字段，重试时同样不再调用接口
+            content = parser.text if parser.done else json.dumps(parser.result(), ensure_ascii=False)
+            cached_response = {"choices": [{"message": {"role": "assistant", "content": content}}]}
+            try:
+                await asyncio.to_thread(self.cache.set, cache_key, cached_response, self.model)
+            except Exception as e:
+                print(f"写入LLM缓存失败: {str(e)}")
+        return parser.result()
+    
+    def circuit_state(self) -> str:
+        """接口熔断器的当前状态"""
+        return self._resilience.breaker.state
+    
+    def call_stats(self) -> Dict[str, Any]:
+        """返回接口调用的重试统计、熔断器状态、请求合并和限流统计"""
+        stats = self._resilience.stats()
+        stats["single_flight"] = self.flights.stats()
+        stats["rate_limit"] = self.limiter.stats()
+        return stats
+    
+    def _cache_key(self, messages: List[Dict[str, str]], temperature: float,
+                   max_tokens: Optional[int] = None) -> str:
+        """本接口上请求的缓存键，也用于合并相同的进行中请求"""
+        return LLMCache.make_key(self.api_url, self.model, messages, temperature, max_tokens)
+    
+    async def _invalidate_cached(self, messages: List[Dict[str, str]], temperature: float,
+                                 max_tokens: Optional[int] = None):
+        """删除无法使用的缓存响应，下次请求重新调用API"""
+        if self.cache.enabled:
+            key = self._cache_key(messages, temperature, max_tokens)
+            await asyncio.to_thread(self.cache.delete, key)
+    
+    async def aclose(self):
+        """关闭客户端持有的HTTP会话"""
+        await self._http.aclose()
+    
+    async def generate_submission_content(self, 
+                                    form_fields: Dict[str, Any], 
+                                    target_url: str,
+                                    use_cache: bool = True,
+                                    stream: bool = True,
+                                    on_field: Optional[Callable[[str, Any], None]] = None) -> Dict[str, Any]:
+        """生成用于网站提交的内容
+        
+        Args:
+            form_fields: 表单字段信息
+            target_url: 目标提交网址
+            use_cache: 是否使用响应缓存
+            stream: 是否流式接收，提交所需的字段到齐后即结束请求
+            on_field: 流式接收时每个字段完整后调用的回调
+            
+        Returns:
+            生成的提交内容
+        """
+        # 构建提示词
+        prompt = self._build_submission_prompt(form_fields, target_url)
+        
+        # 调用API
+        messages = [
+            {"role": "system", "content": "你是一个专业的AI工具提交助手，帮助用户将AI工具信息提交到目录网站。"
+                               "你擅长理解网站表单结构，并生成最合适的提交内容，以增加审核通过率。"},
+            {"role": "user", "content": prompt}
+        ]
+        
+        if stream:
+            result = await self.stream_json_completion(messages, temperature=0.3,
+                                                       required_keys=SUBMISSION_CONTENT_KEYS,
+                                                       on_field=on_field, use_cache=use_cache)
+            if result:
+                return result
+            # 流式输出中没有可用的JSON时，按非流式请求重新获取
+        
+        response = await self.chat_completion(messages, temperature=0.3, use_cache=use_cache)
+        
+        # 解析响应
+        ai_response = response.get("choices", [{}])[0].get("message", {}).get("content", "")
+        
+        try:
+            # 尝试解析JSON响应
+            result = json.loads(ai_response)
+            return result
+        except:
+            # 如果不是有效的JSON，返回原始文本，并且不保留该缓存
+            await self._invalidate_cached(messages, temperature=0.3)
+            return {"error": "无法解析AI响应", "raw_response": ai_response}
+    
+    async def generate_batch_submission_content(self,
+                                          form_fields: Dict[str, Any],
+                                          target_urls: List[str],
+                                          use_cache: bool = True) -> Dict[str, Dict[str, Any]]:
+        """一次调用为多个目录网站生成提交内容
+        
+        解析失败或缺少的条目会单独调用generate_submission_content补全。
+        
+        Args:
+            form_fields: 表单字段信息
+            target_urls: 目标提交网址列表
+            use_cache: 是否使用响应缓存
+            
+        Returns:
+            按目标网址索引的提交内容
+        """
+        target_urls = list(dict.fromkeys(target_urls))
+        if len(target_urls) == 1:
+            return {target_urls[0]: await self.generate_submission_content(form_fields, target_urls[0], use_cache)}
+        
+        results: Dict[str, Dict[str, Any]] = {}
+        
+        # 构建提示词
+        prompt = self._build_batch_submission_prompt(form_fields, target_urls)
+        
+        # 调用API
+        messages = [
+            {"role": "system", "content": "你是一个专业的AI工具提交助手，帮助用户将AI工具信息提交到目录网站。"
+                               "你擅长理解网站表单结构，并生成最合适的提交内容，以增加审核通过率。"},
+            {"role": "user", "content": prompt}
+        ]
+        
+        try:
+            response = await self.chat_completion(messages, temperature=0.3, use_cache=use_cache)
+            ai_response = response.get("choices", [{}])[0].get("message", {}).get("content", "")
+            results = self._parse_batch_submission_response(ai_response, target_urls)
+            if len(results) < len(target_urls):
+                await self._invalidate_cached(messages, temperature=0.3)
+        except Exception as e:
+            print(f"批量生成提交内容失败，改为逐个生成: {str(e)}")
+        
+        # 对解析失败的条目逐个生成
+        missing = [url for url in target_urls if url not in results]
+        if missing:
+            print(f"批量结果中有 {len(missing)} 个目录无效，单独生成")
+            fallback = await asyncio.gather(
+                *[self.generate_submission_content(form_fields, url, use_cache) for url in missing],
+                return_exceptions=True
+            )
+            for url, content in zip(missing, fallback):
+                if isinstance(content, Exception):
+                    content = {"error": f"API调用失败: {str(content)}"}
+                results[url] = content
+        
+        return results
+    
+    def _parse_batch_submission_response(self, ai_response: str,
+                                         target_urls: List[str]) -> Dict[str, Dict[str, Any]]:
+        """解析批量生成的响应，只保留结构完整的条目
+        
+        Args:
+            ai_response: 模型返回的文本
+            target_urls: 请求的目标网址列表
+            
+        Returns:
+            按目标网址索引的有效提交内容
+        """
+        json_match = re.search(r'```(?:json)?\s*\n(.*?)\n```', ai_response, re.DOTALL)
+        try:
+            data = json.loads(json_match.group(1) if json_match else ai_response)
+        except Exception:
+            return {}
+        
+        entries = data.get("results", []) if isinstance(data, dict) else data
+        if not isinstance(entries, list):
+            return {}
+        
+        results = {}
+        for position, entry in enumerate(entries):
+            if not isinstance(entry, dict):
+                continue
+            # 优先按编号对应，其次按网址
+            url = entry.get("target_url")
+            if url not in target_urls:
+                try:
+                    index = int(entry.get("index", position))
+                except (TypeError, ValueError):
+                    continue
+                if not 0 <= index < len(target_urls):
+                    continue
+                url = target_urls[index]
+            
+            if not isinstance(entry.get("short_description"), str) or not entry["short_description"]:
+                continue
+            if not isinstance(entry.get("detailed_description"), str) or not entry["detailed_description"]:
+                continue
+            if not isinstance(entry.get("tags"), list):
+                continue
+            
+            content = {k: v for k, v in entry.items() if k not in ("index", "target_url")}
+            results[url] = content
+        return results
+    
+    async def analyze_submission_form(self, form_html: str, form_fields: Dict[str, Any],
+                                      use_cache: bool = True,
+                                      target_url: Optional[str] = None) -> Dict[str, Any]:
+        """分析提交表单结构并匹配我们的字段
+        
+        提供target_url时，按目录地址和表单结构指纹复用已保存的分析结果，
+        只有表单结构变化后才重新请求模型。
+        
+        Args:
+            form_html: 表单HTML内容
+            form_fields: 我们的表单字段
+            use_cache: 是否使用响应缓存和已保存的分析结果
+            target_url: 表单所在的目录提交地址
+            
+        Returns:
+            字段映射和填写策略
+        """
+        fingerprint = None
+        if target_url:
+            fingerprint = form_fingerprint(form_html, form_fields.keys())
+            if use_cache:
+                try:
+                    stored = await asyncio.to_thread(self.form_cache.get, target_url, fingerprint)
+                except Exception as e:
+                    print(f"读取表单分析结果失败: {str(e)}")
+                    stored = None
+                if stored is not None:
+                    print(f"表单结构未变化，复用已保存的字段映射: {target_url}")
+                    return stored
+        
+        result = await self._request_form_analysis(form_html, form_fields, use_cache)
+        
+        if fingerprint and isinstance(result, dict) and "error" not in result and result.get("field_mappings"):
+            try:
+                await asyncio.to_thread(self.form_cache.set, target_url, fingerprint, result)
+            except Exception as e:
+                print(f"保存表单分析结果失败: {str(e)}")
+        return result
+    
+    def _fields_json(self, form_fields: Dict[str, Any]) -> str:
+        """把产品信息转换为提示词中的JSON，按FIELD_VALUE_MAX_CHARS截断过长的文本字段"""
+        limit = self.FIELD_VALUE_MAX_CHARS
+        if limit is not None:
+            form_fields = {k: v[:limit] + "... [内容已截断]" if isinstance(v, str) and len(v) > limit else v
+                           for k, v in form_fields.items()}
+        return json.dumps(form_fields, indent=2, ensure_ascii=False)
+    
+    @staticmethod
+    def _fields_text(form_fields: Dict[str, Any]) -> str:
+        """把产品信息转换为提示词中的列表文本，忽略空字段"""
+        return "\n".join([f"- {k}: {v}" for k, v in form_fields.items() if v])
+    
+    @staticmethod
+    def _website_name(target_url: str) -> str:
+        """从目录地址中提取网站名称，如 https://www.futuretools.io/submit -> Futuretools"""
+        domain_match = re.search(r'https?://(?:www\.)?([^/]+)', target_url)
+        website_domain = domain_match.group(1) if domain_match else target_url
+        return website_domain.split('.')[0].capitalize()
+    
+    async def _request_form_analysis(self, form_html: str, form_fields: Dict[str, Any],
+                                     use_cache: bool = True) -> Dict[str, Any]:
+        """请求模型分析表单结构
+        
+        Returns:
+            模型返回的字段映射；调用或解析失败时返回包含error的字典
+        """
+        # 将表单HTML精简为字段清单，在令牌预算内保留全部字段
+        messages = self._build_form_analysis_messages(distill_form_html(form_html), self._fields_json(form_fields))
+        
+        try:
+            response = await self.chat_completion(messages, temperature=0.2, max_tokens=self.FORM_MAX_TOKENS,
+                                                  use_cache=use_cache)
+        except Exception as e:
+            return {"error": f"API调用失败: {str(e)}"}
+        
+        ai_response = response.get("choices", [{}])[0].get("message", {}).get("content", "")
+        try:
+            # 提取JSON部分，没有代码块时尝试直接解析整个响应
+            json_match = re.search(r'```json\n(.*?)\n```', ai_response, re.DOTALL)
+            return json.loads(json_match.group(1) if json_match else ai_response)
+        except Exception as e:
+            # 如果无法解析为JSON，返回原始文本和错误消息，并且不保留该缓存
+            await self._invalidate_cached(messages, temperature=0.2, max_tokens=self.FORM_MAX_TOKENS)
+            return {"error": f"无法解析AI响应: {str(e)}", "raw_response": ai_response}
+    
+    async def generate_form_filling_instructions(self, 
+                                           form_html: str, 
+                                           form_fields: Dict[str, Any],
+                                           target_url: str,
+                                           use_cache: bool = True) -> str:
+        """生成表单填写指令
+        
+        Args:
+            form_html: 表单HTML内容
+            form_fields: 我们的表单字段
+            target_url: 目标提交网址
+            use_cache: 是否使用响应缓存
+            
+        Returns:
+            表单填写指令
+        """
+        messages = self._build_form_filling_messages(distill_form_html(form_html),
+                                                     self._fields_json(form_fields), target_url)
+        response = await self.chat_completion(messages, temperature=0.2, max_tokens=self.FORM_MAX_TOKENS,
+                                              use_cache=use_cache)
+        return response.get("choices", [{}])[0].get("message", {}).get("content", "")
+    
+    @abc.abstractmethod
+    def _build_form_analysis_messages(self, form_summary: str, fields_json: str) -> List[Dict[str, str]]:
+        """构建表单分析请求的消息列表
+        
+        Args:
+            form_summary: 精简后的表单字段清单
+            fields_json: 产品信息JSON
+            
+        Returns:
+            消息列表
+        """
+    
+    @abc.abstractmethod
+    def _build_form_filling_messages(self, form_summary: str, fields_json: str,
+                                     target_url: str) -> List[Dict[str, str]]:
+        """构建填写指令请求的消息列表
+        
+        Args:
+            form_summary: 精简后的表单字段清单
+            fields_json: 产品信息JSON
+            target_url: 目标提交网址
+            
+        Returns:
+            消息列表
+        """
+    
+    @abc.abstractmethod
+    def _build_submission_prompt(self, form_fields: Dict[str, Any], target_url: str) -> str:
+        """构建单个目录的提交提示词"""
+    
+    @abc.abstractmethod
+    def _build_batch_submission_prompt(self, form_fields: Dict[str, Any], target_urls: List[str]) -> str:
+        """构建多个目录的批量提交提示词"""
@@ -0,0 +1,234 @@
+"""
+LLM路由模块，按顺序在多个提供方之间故障转移，并可对慢请求发起对冲
+
+故障转移：当前提供方调用失败或返回无效结果时，换用下一个提供方。
+对冲：当前提供方的耗时超过其历史耗时的指定分位数时，同时向下一个提供方发起相同请求，
+采用先返回的有效结果并取消另一个请求。
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from .llm_provider import LLMProvider
+from .usage_tracker import llm_purpose
+
+
+class LLMRouter:
+    """多个LLM提供方的路由，对外提供与单个提供方相同的生成接口"""
+
+    def __init__(self, providers: List[LLMProvider], hedge: bool = False,
+                 hedge_percentile: float = 95.0, hedge_min_samples: int = 20,
+                 hedge_default_delay: float = 15.0, latency_window: int = 200):
+        """初始化路由
+
+        Args:
+            providers: 按优先级排列的提供方
+            hedge: 是否启用对冲请求
+            hedge_percentile: 触发对冲的耗时分位数
+            hedge_min_samples: 耗时样本少于该数量时使用默认对冲延迟
+            hedge_default_delay: 默认对冲延迟秒数
+            latency_window: 每个提供方每种调用保留的耗时样本数
+        """
+        if not providers:
+            raise ValueError("至少需要一个LLM提供方")
+        self.providers = list(providers)
+        self.hedge = hedge
+        self.hedge_percentile = min(100.0, max(0.0, hedge_percentile))
+        self.hedge_min_samples = max(1, hedge_min_samples)
+        self.hedge_default_delay = hedge_default_delay
+        self.latency_window = latency_window
+
+        self._latencies: Dict[Tuple[str, str], Deque[float]] = {}
+
+        # 统计信息
+        self.failovers = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    @property
+    def name(self) -> str:
+        return "+".join(provider.name for provider in self.providers)
+
+    def _record_latency(self, provider: LLMProvider, operation: str, elapsed: float) -> None:
+        key = (provider.name, operation)
+        if key not in self._latencies:
+            self._latencies[key] = deque(maxlen=self.latency_window)
+        self._latencies[key].append(elapsed)
+
+    def hedge_delay(self, provider: LLMProvider, operation: str) -> float:
+        """提供方该类调用的对冲延迟（耗时分位数）"""
+        samples = self._latencies.get((provider.name, operation))
+        if not samples or len(samples) < self.hedge_min_samples:
+            return self.hedge_default_delay
+        ordered = sorted(samples)
+        index = min(len(ordered) - 1, int(len(ordered) * self.hedge_percentile / 100))
+        return ordered[index]
+
+    def _ordered_providers(self) -> List[LLMProvider]:
+        """可用的提供方排在前面，熔断中的提供方作为最后的备选"""
+        available = [p for p in self.providers if p.circuit_state() != "open"]
+        tripped = [p for p in self.providers if p.circuit_state() == "open"]
+        return available + tripped
+
+    @staticmethod
+    def _is_valid(result: Any) -> bool:
+        if not result:
+            return False
+        if isinstance(result, dict) and "error" in result:
+            return False
+        return True
+
+    async def _timed(self, provider: LLMProvider, operation: str, args: tuple, kwargs: dict) -> Any:
+        started = time.monotonic()
+        result = await getattr(provider, operation)(*args, **kwargs)
+        if self._is_valid(result):
+            self._record_latency(provider, operation, time.monotonic() - started)
+        return result
+
+    async def _call(self, operation: str, *args, **kwargs) -> Any:
+        """按顺序调用提供方，失败时故障转移，慢请求时对冲"""
+        # 以调用名称作为用量统计的用途，在创建任务前设置以便各提供方任务继承
+        with llm_purpose(operation):
+            return await self._route(operation, args, kwargs)
+
+    async def _route(self, operation: str, args: tuple, kwargs: dict) -> Any:
+        candidates = self._ordered_providers()
+        pending: Dict[asyncio.Task, LLMProvider] = {}
+        hedged: set = set()
+        next_index = 0
+        last_error: Optional[BaseException] = None
+        last_result: Any = None
+
+        def launch() -> asyncio.Task:
+            nonlocal next_index
+            provider = candidates[next_index]
+            next_index += 1
+            task = asyncio.create_task(self._timed(provider, operation, args, kwargs))
+            pending[task] = provider
+            return task
+
+        launch()
+        try:
+            while pending:
+                timeout = None
+                if self.hedge and len(pending) == 1 and next_index < len(candidates):
+                    timeout = self.hedge_delay(next(iter(pending.values())), operation)
+
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # 当前请求慢于历史分位数，向下一个提供方发起对冲请求
+                    self.hedges += 1
+                    print(f"{operation} 在 {timeout:.1f} 秒内未完成，对冲请求 {candidates[next_index].name}")
+                    hedged.add(launch())
+                    continue
+
+                for task in done:
+                    provider = pending.pop(task)
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        last_error = e
+                        print(f"提供方 {provider.name} 调用 {operation} 失败: {str(e)}")
+                        continue
+                    if self._is_valid(result):
+                        if task in hedged:
+                            self.hedge_wins += 1
+                        return result
+                    last_result = result
+                    print(f"提供方 {provider.name} 调用 {operation} 返回无效结果")
+
+                if not pending and next_index < len(candidates):
+                    self.failovers += 1
+                    print(f"故障转移到提供方 {candidates[next_index].name}")
+                    launch()
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+        if last_result is not None:
+            return last_result
+        raise last_error
+
+    async def generate_submission_content(self, form_fields: Dict[str, Any], target_url: str,
+                                          use_cache: bool = True, **kwargs) -> Dict[str, Any]:
+        """生成用于网站提交的内容，参数同LLMProvider.generate_submission_content
+
+        对冲时两个提供方都可能调用on_field回调。
+        """
+        return await self._call("generate_submission_content", form_fields, target_url,
+                                use_cache=use_cache, **kwargs)
+
+    async def generate_batch_submission_content(self, form_fields: Dict[str, Any], target_urls: List[str],
+                                                use_cache: bool = True) -> Dict[str, Dict[str, Any]]:
+        """一次调用为多个目录网站生成提交内容"""
+        return await self._call("generate_batch_submission_content", form_fields, target_urls,
+                                use_cache=use_cache)
+
+    async def analyze_submission_form(self, form_html: str, form_fields: Dict[str, Any],
+                                      use_cache: bool = True,
+                                      target_url: Optional[str] = None) -> Dict[str, Any]:
+        """分析提交表单结构并匹配我们的字段"""
+        return await self._call("analyze_submission_form", form_html, form_fields,
+                                use_cache=use_cache, target_url=target_url)
+
+    async def generate_form_filling_instructions(self, form_html: str, form_fields: Dict[str, Any],
+                                                 target_url: str, use_cache: bool = True) -> str:
+        """生成表单填写指令"""
+        return await self._call("generate_form_filling_instructions", form_html, form_fields,
+                                target_url, use_cache=use_cache)
+
+    def call_stats(self) -> Dict[str, Any]:
+        """返回路由统计和各提供方的调用统计"""
+        return {
+            "failovers": self.failovers,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "providers": {provider.name: provider.call_stats() for provider in self.providers},
+        }
+
+    async def aclose(self) -> None:
+        """关闭全部提供方"""
+        for provider in self.providers:
+            await provider.aclose()
+
+
+def create_llm_client(openai_api_key: Optional[str] = None,
+                      grok_api_key: Optional[str] = None) -> Optional[LLMRouter]:
+    """根据环境变量创建LLM路由
+
+    LLM_PROVIDERS指定提供方顺序（逗号分隔，默认openai,grok），只启用配置了API密钥的提供方。
+
+    Args:
+        openai_api_key: OpenAI API密钥，默认读取OPENAI_API_KEY
+        grok_api_key: Grok API密钥，默认读取GROK_API_KEY
+
+    Returns:
+        LLM路由，没有可用的提供方时返回None
+    """
+    from .grok_client import GrokAIClient
+    from .openai_client import OpenAIClient
+
+    factories = {
+        "openai": (OpenAIClient, openai_api_key or os.getenv("OPENAI_API_KEY")),
+        "grok": (GrokAIClient, grok_api_key or os.getenv("GROK_API_KEY")),
+    }
+    providers = []
+    for name in os.getenv("LLM_PROVIDERS", "openai,grok").split(","):
+        name = name.strip().lower()
+        if name in factories and factories[name][1]:
+            client_class, api_key = factories[name]
+            providers.append(client_class(api_key))
+
+    if not providers:
+        return None
+    return LLMRouter(
+        providers,
+        hedge=os.getenv("LLM_HEDGING", "false").lower() in ("1", "true", "yes"),
+        hedge_percentile=float(os.getenv("LLM_HEDGE_PERCENTILE", "95")),
+        hedge_default_delay=float(os.getenv("LLM_HEDGE_DEFAULT_DELAY", "15")),
+    )
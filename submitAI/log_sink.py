@@ -0,0 +1,232 @@
+"""
+日志输出模块，通过队列和后台线程批量写入日志文件
+
+日志记录自动携带当前上下文中的提交ID和目录索引，文件按日期和大小轮转。
+多个工作进程各自写入带进程后缀的文件，轮转只在本进程的文件上进行。
+"""
+
+import atexit
+import contextvars
+import json
+import os
+import queue
+import sys
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+# 当前正在处理的提交ID和目录索引，由调用方在任务上下文中设置
+current_submission_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "current_submission_id", default=None
+)
+current_directory_index: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar(
+    "current_directory_index", default=None
+)
+
+
+@contextmanager
+def log_context(submission_id: Optional[str] = None, directory_index: Optional[int] = None):
+    """在当前上下文中设置日志标签
+
+    Args:
+        submission_id: 提交ID
+        directory_index: 目录索引
+    """
+    tokens = []
+    if submission_id is not None:
+        tokens.append((current_submission_id, current_submission_id.set(submission_id)))
+    if directory_index is not None:
+        tokens.append((current_directory_index, current_directory_index.set(directory_index)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+class LogSink:
+    """队列式日志输出
+
+    调用方只把日志记录放入队列，由后台线程批量写入文件并回显到控制台，
+    避免在事件循环中逐行打开、写入、关闭文件。
+    """
+
+    def __init__(self, log_dir: str = "logs", prefix: str = "submitter",
+                 max_bytes: int = 10 * 1024 * 1024, backup_count: int = 5,
+                 flush_interval: float = 0.5, batch_size: int = 500,
+                 fmt: str = "text", echo: bool = True, suffix: str = ""):
+        """初始化日志输出
+
+        Args:
+            log_dir: 日志目录
+            prefix: 日志文件名前缀，文件名为 {prefix}_YYYY-MM-DD.log
+            max_bytes: 单个日志文件的最大字节数，超过后轮转
+            backup_count: 每天保留的轮转文件数
+            flush_interval: 后台线程最长等待多久写一次
+            batch_size: 单次批量写入的最大记录数
+            fmt: 输出格式，text为兼容的文本行，json为每行一个JSON记录
+            echo: 是否同时输出到控制台
+            suffix: 文件名后缀，设置后文件名为 {prefix}_YYYY-MM-DD.{suffix}.log，
+                多个进程写同一目录时用于区分各自的文件
+        """
+        self.log_dir = log_dir
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.fmt = fmt
+        self.echo = echo
+        self.suffix = suffix
+
+        os.makedirs(log_dir, exist_ok=True)
+
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+        self._file = None
+        self._file_path = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="log-sink", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def emit(self, level: str, message: str,
+             submission_id: Optional[str] = None, directory_index: Optional[int] = None) -> None:
+        """放入一条日志记录，不阻塞调用方
+
+        Args:
+            level: 日志级别
+            message: 日志内容
+            submission_id: 提交ID，默认取当前上下文
+            directory_index: 目录索引，默认取当前上下文
+        """
+        if self._closed:
+            return
+        self._queue.put({
+            "level": level.upper(),
+            "timestamp": datetime.now().isoformat(),
+            "submission_id": submission_id if submission_id is not None else current_submission_id.get(),
+            "directory_index": directory_index if directory_index is not None else current_directory_index.get(),
+            "message": message,
+        })
+
+    def _format(self, record: Dict[str, Any]) -> str:
+        if self.fmt == "json":
+            return json.dumps(record, ensure_ascii=False)
+
+        tag = ""
+        if record["submission_id"]:
+            tag = record["submission_id"]
+            if record["directory_index"] is not None:
+                tag += f"#{record['directory_index']}"
+            tag = f"[{tag}] "
+        return f"[{record['level']}] {record['timestamp']}: {tag}{record['message']}"
+
+    def _current_path(self, timestamp: str) -> str:
+        suffix = f".{self.suffix}" if self.suffix else ""
+        return os.path.join(self.log_dir, f"{self.prefix}_{timestamp[:10]}{suffix}.log")
+
+    def _rotate(self, path: str) -> None:
+        """按大小轮转：path -> path.1 -> path.2 ..."""
+        self._close_file()
+        for i in range(self.backup_count - 1, 0, -1):
+            src = f"{path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{path}.{i + 1}")
+        if self.backup_count > 0:
+            os.replace(path, f"{path}.1")
+        else:
+            os.remove(path)
+
+    def _close_file(self) -> None:
+        if self._file:
+            self._file.close()
+            self._file = None
+            self._file_path = None
+
+    def _write_batch(self, records: List[Dict[str, Any]]) -> None:
+        lines_by_path: Dict[str, List[str]] = {}
+        for record in records:
+            line = self._format(record)
+            lines_by_path.setdefault(self._current_path(record["timestamp"]), []).append(line)
+            if self.echo:
+                print(line)
+
+        for path, lines in lines_by_path.items():
+            try:
+                if self._file_path != path:
+                    # 日期变化时切换到新文件
+                    self._close_file()
+                    self._file = open(path, "a", encoding="utf-8")
+                    self._file_path = path
+                self._file.write("\n".join(lines) + "\n")
+                self._file.flush()
+                if self._file.tell() >= self.max_bytes:
+                    self._rotate(path)
+            except Exception as e:
+                # 日志写入失败不影响业务流程
+                print(f"写入日志失败: {str(e)}", file=sys.stderr)
+                self._close_file()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                record = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            batch = []
+            stop = record is None
+            if record is not None:
+                batch.append(record)
+            while not stop and len(batch) < self.batch_size:
+                try:
+                    record = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if record is None:
+                    stop = True
+                else:
+                    batch.append(record)
+
+            if batch:
+                self._write_batch(batch)
+            for _ in range(len(batch) + (1 if stop else 0)):
+                self._queue.task_done()
+            if stop:
+                self._close_file()
+                return
+
+    def flush(self) -> None:
+        """等待队列中已有的日志全部写入"""
+        if not self._closed:
+            self._queue.join()
+
+    def close(self) -> None:
+        """写完剩余日志并停止后台线程"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+
+_default_sink: Optional[LogSink] = None
+_default_sink_lock = threading.Lock()
+
+
+def get_log_sink() -> LogSink:
+    """获取进程内共享的提交器日志输出
+    
+    LOG_FILE_SUFFIX由工作进程设置为各自的进程号，使每个进程只轮转自己的文件。
+    """
+    global _default_sink
+    with _default_sink_lock:
+        if _default_sink is None:
+            _default_sink = LogSink(
+                max_bytes=int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024))),
+                backup_count=int(os.getenv("LOG_BACKUP_COUNT", "5")),
+                fmt=os.getenv("LOG_FORMAT", "text"),
+                suffix=os.getenv("LOG_FILE_SUFFIX", ""),
+            )
+        return _default_sink
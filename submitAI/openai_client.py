@@ -1,140 +1,42 @@
-import json
-import aiohttp
 import os
 from typing import List, Dict, Any, Optional
-from .proxy_helper import get_aiohttp_proxy
+from .llm_cache import LLMCache
+from .llm_provider import LLMProvider
+from .form_analysis_cache import FormAnalysisCache
 
-class OpenAIClient:
+class OpenAIClient(LLMProvider):
     """OpenAI API客户端，用于调用AI完成表单填写和提交"""
     
-    def __init__(self, api_key: str):
+    DEFAULT_API_URL = "https://api.openai.com/v1/chat/completions"
+    DEFAULT_MODEL = "gpt-3.5-turbo"
+    FORM_MAX_TOKENS = 2000
+    FIELD_VALUE_MAX_CHARS = 150
+    
+    def __init__(self, api_key: str, cache: Optional[LLMCache] = None,
+                 form_cache: Optional[FormAnalysisCache] = None,
+                 api_url: Optional[str] = None, model: Optional[str] = None):
         """初始化OpenAI API客户端
         
         Args:
             api_key: OpenAI API密钥
+            cache: 响应缓存，默认使用进程内共享的磁盘缓存
+            form_cache: 目录表单分析结果存储，默认使用进程内共享的存储
+            api_url: 接口地址，默认读取环境变量OPENAI_API_URL
+            model: 模型名称，默认读取环境变量OPENAI_MODEL
         """
-        self.api_key = api_key
-        self.api_url = "https://api.openai.com/v1/chat/completions"
-        self.model = "gpt-3.5-turbo"
-        
-    async def chat_completion(self, 
-                            messages: List[Dict[str, str]], 
-                            temperature: float = 0.7, 
-                            max_tokens: Optional[int] = None) -> Dict[str, Any]:
-        """发送聊天完成请求到OpenAI API
-        
-        Args:
-            messages: 消息列表
-            temperature: 温度参数，控制输出随机性
-            max_tokens: 最大生成令牌数
-            
-        Returns:
-            API响应
-        """
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.api_key}"
-        }
-        
-        payload = {
-            "messages": messages,
-            "model": self.model,
-            "temperature": temperature,
-            "stream": False
-        }
-        
-        if max_tokens is not None:
-            payload["max_tokens"] = max_tokens
-        
-        # 获取代理设置
-        proxy = get_aiohttp_proxy()
-        
-        # 使用代理设置创建会话
-        async with aiohttp.ClientSession() as session:
-            # 如果有代理设置，使用代理
-            conn_kwargs = {}
-            if proxy:
-                conn_kwargs['proxy'] = proxy
-                print(f"使用代理: {proxy}")
-            
-            async with session.post(self.api_url, headers=headers, json=payload, **conn_kwargs) as response:
-                if response.status != 200:
-                    error_text = await response.text()
-                    raise Exception(f"API调用失败，状态码: {response.status}, 错误: {error_text}")
-                
-                result = await response.json()
-                return result
-    
-    async def generate_submission_content(self, 
-                                    form_fields: Dict[str, Any], 
-                                    target_url: str) -> Dict[str, Any]:
-        """生成用于网站提交的内容
-        
-        Args:
-            form_fields: 表单字段信息
-            target_url: 目标提交网址
-            
-        Returns:
-            生成的提交内容
-        """
-        # 构建提示词
-        prompt = self._build_submission_prompt(form_fields, target_url)
-        
-        # 调用API
-        messages = [
-            {"role": "system", "content": "你是一个专业的AI工具提交助手，帮助用户将AI工具信息提交到目录网站。"
-                               "你擅长理解网站表单结构，并生成最合适的提交内容，以增加审核通过率。"},
-            {"role": "user", "content": prompt}
-        ]
-        
-        response = await self.chat_completion(messages, temperature=0.3)
-        
-        # 解析响应
-        ai_response = response.get("choices", [{}])[0].get("message", {}).get("content", "")
-        
-        try:
-            # 尝试解析JSON响应
-            result = json.loads(ai_response)
-            return result
-        except:
-            # 如果不是有效的JSON，返回原始文本
-            return {"error": "无法解析AI响应", "raw_response": ai_response}
+        super().__init__(
+            "openai", api_key,
+            api_url=api_url or os.getenv("OPENAI_API_URL", self.DEFAULT_API_URL),
+            model=model or os.getenv("OPENAI_MODEL", self.DEFAULT_MODEL),
+            cache=cache, form_cache=form_cache
+        )
     
-    async def analyze_submission_form(self, form_html: str, form_fields: Dict[str, Any]) -> Dict[str, Any]:
-        """分析提交表单结构并匹配我们的字段
-        
-        Args:
-            form_html: 表单HTML内容
-            form_fields: 我们的表单字段
-            
-        Returns:
-            字段映射和填写策略
-        """
-        # 将表单HTML截断到合理的长度，避免超出token限制
-        max_html_length = 6000  # 降低为6000字符，减少token用量
-        if len(form_html) > max_html_length:
-            print(f"表单HTML过长 ({len(form_html)} 字符)，截断至 {max_html_length} 字符")
-            form_html = form_html[:max_html_length] + "\n... [内容已截断] ..."
-            
-        # 将表单字段转换为JSON字符串
-        fields_json = json.dumps(form_fields, indent=2, ensure_ascii=False)
-        
-        # 限制字段内容长度，避免大文本字段占用太多token
-        if len(fields_json) > 2000:
-            print(f"表单字段内容过长 ({len(fields_json)} 字符)，缩减内容")
-            # 创建精简版字段
-            simplified_fields = {}
-            for k, v in form_fields.items():
-                if isinstance(v, str) and len(v) > 200:
-                    simplified_fields[k] = v[:200] + "... [内容已截断]"
-                else:
-                    simplified_fields[k] = v
-            fields_json = json.dumps(simplified_fields, indent=2, ensure_ascii=False)
-        
+    def _build_form_analysis_messages(self, form_summary: str, fields_json: str) -> List[Dict[str, str]]:
+        """构建表单分析请求的消息列表"""
         # 构建提示词 - 增强版
         prompt = (
             "你是一名专业的AI表单分析专家。你的任务是详细分析下面的HTML表单结构，并提供精确的字段映射策略。\n\n"
-            "HTML表单：\n```html\n" + form_html + "\n```\n\n"
+            "表单字段清单（由HTML精简而来，每行一个字段及其属性、标签和选项）：\n```\n" + form_summary + "\n```\n\n"
             "我们的产品信息：\n```json\n" + fields_json + "\n```\n\n"
             "请执行以下步骤：\n"
             "1. 首先识别表单中的所有输入字段，包括类型、是否必填、ID、名称等属性\n"
@@ -168,70 +70,18 @@ class OpenAIClient:
             "}\n\n"
             "确保你的分析尽可能详细和准确，这将直接用于自动填写表单。"
         )
-        
-        # 调用API
-        messages = [
+        return [
             {"role": "system", "content": "你是一个专业的网页分析助手，擅长分析HTML表单结构并提供字段映射。你总是尽可能精确地分析，不仅基于字段名称，还会考虑标签文本、占位符、字段类型和上下文来确定最佳映射。"},
             {"role": "user", "content": prompt}
         ]
-        
-        try:
-            response = await self.chat_completion(messages, temperature=0.2, max_tokens=2000) # 降低为2000
-            
-            # 解析响应
-            ai_response = response.get("choices", [{}])[0].get("message", {}).get("content", "")
-            
-            try:
-                # 提取JSON部分
-                import re
-                json_match = re.search(r'```json\n(.*?)\n```', ai_response, re.DOTALL)
-                if json_match:
-                    result = json.loads(json_match.group(1))
-                else:
-                    # 尝试直接解析整个响应
-                    result = json.loads(ai_response)
-                return result
-            except Exception as e:
-                # 如果无法解析为JSON，返回原始文本和错误消息
-                return {"error": f"无法解析AI响应: {str(e)}", "raw_response": ai_response}
-        except Exception as e:
-            # API调用错误处理
-            return {"error": f"API调用失败: {str(e)}"}
     
-    async def generate_form_filling_instructions(self, 
-                                           form_html: str, 
-                                           form_fields: Dict[str, Any],
-                                           target_url: str) -> str:
-        """生成表单填写指令
-        
-        Args:
-            form_html: 表单HTML内容
-            form_fields: 我们的表单字段
-            target_url: 目标提交网址
-            
-        Returns:
-            表单填写指令
-        """
-        # 限制HTML内容长度，避免超出token限制
-        max_html_length = 5000  # 更加严格地限制HTML长度
-        if len(form_html) > max_html_length:
-            print(f"表单HTML过长 ({len(form_html)} 字符)，截断至 {max_html_length} 字符")
-            form_html = form_html[:max_html_length] + "\n... [内容已截断] ..."
-        
-        # 将表单字段转换为JSON字符串，同时限制大文本字段
-        simplified_fields = {}
-        for k, v in form_fields.items():
-            if isinstance(v, str) and len(v) > 150:  # 更严格地限制字段长度
-                simplified_fields[k] = v[:150] + "... [内容已截断]"
-            else:
-                simplified_fields[k] = v
-        
-        fields_json = json.dumps(simplified_fields, indent=2, ensure_ascii=False)
-        
+    def _build_form_filling_messages(self, form_summary: str, fields_json: str,
+                                     target_url: str) -> List[Dict[str, str]]:
+        """构建填写指令请求的消息列表"""
         # 构建提示词 - 优化版
         prompt = (
             f"为以下URL的表单制定填写计划: {target_url}\n\n"
-            f"表单HTML片段:\n```html\n{form_html}\n```\n\n"
+            f"表单字段清单:\n```\n{form_summary}\n```\n\n"
             f"产品信息:\n```json\n{fields_json}\n```\n\n"
             "提供一个详细的表单填写计划，包括:\n"
             "1. 每个表单字段的匹配策略\n"
@@ -242,22 +92,10 @@ class OpenAIClient:
             "- special_instructions: 任何特殊处理说明\n"
             "- submission_strategy: 提交表单的建议"
         )
-        
-        # 调用API
-        messages = [
+        return [
             {"role": "system", "content": "你是一个专业的网页自动化助手，擅长分析HTML表单结构并生成精确的填表指令。你的输出必须是机器可读的JSON格式。"},
             {"role": "user", "content": prompt}
         ]
-        
-        try:
-            response = await self.chat_completion(messages, temperature=0.2, max_tokens=2000)  # 降低为2000
-            
-            # 获取响应
-            ai_response = response.get("choices", [{}])[0].get("message", {}).get("content", "")
-            return ai_response
-        except Exception as e:
-            # 处理API调用失败
-            return f"{{\"error\": \"API调用失败: {str(e)}\"}}"
     
     def _build_submission_prompt(self, form_fields: Dict[str, Any], target_url: str) -> str:
         """构建提交提示词
@@ -270,13 +108,10 @@ class OpenAIClient:
             构建的提示词
         """
         # 将表单字段转换为格式化文本
-        fields_text = "\n".join([f"- {k}: {v}" for k, v in form_fields.items() if v])
+        fields_text = self._fields_text(form_fields)
         
-        # 提取目标网站的域名和名称
-        import re
-        domain_match = re.search(r'https?://(?:www\.)?([^/]+)', target_url)
-        website_domain = domain_match.group(1) if domain_match else target_url
-        website_name = website_domain.split('.')[0].capitalize()
+        # 目标网站的名称
+        website_name = self._website_name(target_url)
         
         # 构建提示词 - 增强版
         prompt = (
@@ -302,4 +137,43 @@ class OpenAIClient:
             "- 包含结构化格式，便于阅读\n\n"
             "JSON结构应包含：short_description, detailed_description, tags, special_fields(如需)"
         )
-        return prompt 
\ No newline at end of file
+        return prompt 
+    
+    def _build_batch_submission_prompt(self, form_fields: Dict[str, Any], target_urls: List[str]) -> str:
+        """构建批量提交提示词
+        
+        Args:
+            form_fields: 表单字段
+            target_urls: 目标URL列表
+            
+        Returns:
+            构建的提示词
+        """
+        # 将表单字段转换为格式化文本
+        fields_text = self._fields_text(form_fields)
+        
+        # 列出所有目标网站及其名称
+        sites_text = "\n".join([f"{index}. {url} ({self._website_name(url)})"
+                                for index, url in enumerate(target_urls)])
+        
+        prompt = (
+            f"你是AI工具提交专家，特别擅长针对不同目录网站优化提交内容。需要将我们的AI工具分别提交到以下 {len(target_urls)} 个网站：\n"
+            f"{sites_text}\n\n"
+            f"我的产品详细信息如下：\n{fields_text}\n\n"
+            "请针对每个平台的特点和受众，分别生成优化的提交内容，每个网站包括：\n\n"
+            "1. 简短描述(150字以内)：清晰简洁，突出卖点，让用户立即理解工具价值\n"
+            "2. 详细描述：为该平台量身定制，包含开场介绍、主要功能、使用场景、差异化优势、"
+            "价格/可访问性信息和号召性用语\n"
+            "3. 标签：5-8个最适合在该平台上分类和搜索的相关标签\n"
+            "4. 其他需调整的字段：基于该网站特点可能需要调整的其他内容\n\n"
+            "内容要求：风格专业但友好，避免过度营销语言，突出实际价值，不同网站之间的描述应有所区别。\n\n"
+            "只返回一个JSON对象，格式如下：\n"
+            "{\n"
+            '  "results": [\n'
+            '    {"index": 网站编号, "target_url": "网站地址", "short_description": "...", '
+            '"detailed_description": "...", "tags": ["..."], "special_fields": {}}\n'
+            "  ]\n"
+            "}\n"
+            "results中必须为上面列出的每个网站各包含一项。"
+        )
+        return prompt
@@ -0,0 +1,168 @@
+"""
+预取流水线模块，让内容生成阶段提前于浏览器阶段运行
+
+生产端按给定顺序提前生成后续条目的结果，已生成但尚未取走的批次数受缓冲区大小限制；
+消费端按需取用，使两个阶段的耗时相互重叠而不是累加。
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Set
+
+
+class _Unit:
+    """一次生成调用（单个条目或一批条目）"""
+
+    def __init__(self, task: asyncio.Task, keys: List[Hashable], buffered: bool):
+        self.task = task
+        self.remaining: Set[Hashable] = set(keys)
+        self.buffered = buffered
+
+
+class PrefetchPipeline:
+    """有界预取流水线
+
+    用法::
+
+        pipeline = PrefetchPipeline(keys, produce, depth=2)
+        pipeline.start()
+        try:
+            value = await pipeline.get(key)
+        finally:
+            await pipeline.close()
+
+    提供produce_batch时，生产端每次为batch_size个条目发起一次生成调用。
+    """
+
+    def __init__(self, keys: Iterable[Hashable],
+                 produce: Optional[Callable[[Any], Awaitable[Any]]] = None,
+                 depth: int = 2,
+                 produce_batch: Optional[Callable[[List[Any]], Awaitable[Dict[Any, Any]]]] = None,
+                 batch_size: int = 1):
+        """初始化流水线
+
+        Args:
+            keys: 预计的消费顺序
+            produce: 生成单个条目结果的协程函数
+            depth: 缓冲区大小，即最多提前生成（含生成中）且尚未取完的批次数
+            produce_batch: 批量生成的协程函数，返回 {条目键: 结果}
+            batch_size: 每批的条目数，仅在提供produce_batch时生效
+        """
+        if produce is None and produce_batch is None:
+            raise ValueError("produce和produce_batch至少需要提供一个")
+
+        self._keys: List[Hashable] = list(keys)
+        self._produce = produce
+        self._produce_batch = produce_batch
+        self.depth = max(1, depth)
+        self.batch_size = max(1, batch_size) if produce_batch else 1
+
+        self._buffer_slots = asyncio.Semaphore(self.depth)
+        self._units: Dict[Hashable, Optional[_Unit]] = {}
+        self._producer: Optional[asyncio.Task] = None
+
+        # 统计信息
+        self.prefetch_hits = 0
+        self.prefetch_misses = 0
+        self.produce_calls = 0
+
+    def start(self) -> None:
+        """启动生产端
+
+        生产端任务复制调用时的上下文，后台预取的生成调用都运行在该上下文中；
+        get()按需发起的生成则运行在调用get()的任务的上下文中。
+        """
+        if self._producer is None:
+            self._producer = asyncio.create_task(self._run_producer())
+
+    async def _produce_unit(self, keys: List[Hashable]) -> Dict[Hashable, Any]:
+        self.produce_calls += 1
+        if self._produce_batch:
+            return await self._produce_batch(keys)
+        return {keys[0]: await self._produce(keys[0])}
+
+    def _start_unit(self, keys: List[Hashable], buffered: bool) -> _Unit:
+        unit = _Unit(asyncio.create_task(self._produce_unit(keys)), keys, buffered)
+        for key in keys:
+            self._units[key] = unit
+        return unit
+
+    async def _run_producer(self) -> None:
+        index = 0
+        while index < len(self._keys):
+            await self._buffer_slots.acquire()
+            batch = []
+            while index < len(self._keys) and len(batch) < self.batch_size:
+                key = self._keys[index]
+                index += 1
+                if key not in self._units:
+                    batch.append(key)
+            if batch:
+                self._start_unit(batch, buffered=True)
+            else:
+                # 消费端已按需生成或放弃了这些条目
+                self._buffer_slots.release()
+
+    def _consume(self, unit: _Unit, key: Hashable) -> None:
+        """标记条目已取走，整批取完后释放缓冲区位置"""
+        unit.remaining.discard(key)
+        if not unit.remaining:
+            if unit.buffered:
+                unit.buffered = False
+                self._buffer_slots.release()
+            if not unit.task.done():
+                unit.task.cancel()
+
+    async def get(self, key: Hashable) -> Any:
+        """取得条目的结果，尚未开始生成时立即生成
+
+        Args:
+            key: 条目键
+
+        Returns:
+            该条目的生成结果，生成失败时抛出对应异常
+        """
+        unit = self._units.get(key)
+        if unit is None:
+            # 消费顺序超前于生产端时直接生成，避免等待缓冲区而互相阻塞
+            self.prefetch_misses += 1
+            unit = self._start_unit([key], buffered=False)
+        elif unit.task.done():
+            self.prefetch_hits += 1
+        else:
+            self.prefetch_misses += 1
+
+        try:
+            results = await asyncio.shield(unit.task)
+        except asyncio.CancelledError:
+            # 调用方被取消时由discard()或close()清理
+            raise
+        except Exception:
+            self._consume(unit, key)
+            raise
+        self._consume(unit, key)
+        if key not in results:
+            raise KeyError(f"生成结果中缺少条目 {key}")
+        return results[key]
+
+    def discard(self, key: Hashable) -> None:
+        """放弃某个条目（例如对应目录不再处理），释放其缓冲区位置"""
+        if key not in self._units:
+            # 标记为已放弃，生产端会跳过
+            self._units[key] = None
+            return
+        unit = self._units[key]
+        if unit is not None and key in unit.remaining:
+            self._consume(unit, key)
+
+    async def close(self) -> None:
+        """停止生产端并取消未取走的生成任务"""
+        pending = []
+        if self._producer and not self._producer.done():
+            self._producer.cancel()
+            pending.append(self._producer)
+        for unit in set(u for u in self._units.values() if u is not None):
+            if not unit.task.done():
+                unit.task.cancel()
+                pending.append(unit.task)
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
@@ -0,0 +1,380 @@
+"""
+LLM调用限流模块，限制同时进行的请求数以及每分钟的请求数和令牌数
+
+并发提交较多时，不加限制地调用接口会很快触发提供方的RPM/TPM限额并引发连串的429。
+限流器把请求平滑地控制在限额以内，排队时交互请求（浏览器会话正在等待的调用）优先于批量预取。
+配置数据库路径后，多个工作进程之间也会共享限额。
+"""
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+# 排队优先级，数值越小越优先
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+
+# 请求未指定max_tokens时预估的输出令牌数
+DEFAULT_COMPLETION_TOKENS = 1000
+
+current_llm_priority: contextvars.ContextVar[int] = contextvars.ContextVar(
+    "current_llm_priority", default=PRIORITY_INTERACTIVE
+)
+
+
+@contextmanager
+def llm_priority(priority: int):
+    """在当前上下文中设置LLM调用的排队优先级"""
+    token = current_llm_priority.set(priority)
+    try:
+        yield
+    finally:
+        current_llm_priority.reset(token)
+
+
+class _TokenBucket:
+    """按分钟配额匀速补充的令牌桶，配额为0时不限制"""
+
+    def __init__(self, per_minute: float, burst_seconds: float):
+        self.rate = max(0.0, per_minute) / 60.0
+        # 桶容量只允许burst_seconds秒的突发量，使请求均匀分布在一分钟内
+        self.capacity = max(1.0, self.rate * burst_seconds) if self.rate else 0.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        if self.rate:
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, cost: float, now: float) -> float:
+        """距离可以扣除cost的秒数，超过桶容量的请求在桶满时放行"""
+        if not self.rate:
+            return 0.0
+        self._refill(now)
+        needed = min(cost, self.capacity)
+        if self.level >= needed:
+            return 0.0
+        return (needed - self.level) / self.rate
+
+    def take(self, cost: float) -> None:
+        if self.rate:
+            self.level -= cost
+
+    def refund(self, amount: float) -> None:
+        if self.rate:
+            self.level = min(self.capacity, self.level + amount)
+
+
+class RatePermit:
+    """一次获准的调用，调用结束后可填入实际用量以归还多扣的令牌"""
+
+    def __init__(self, tokens: int, lease_id: Optional[str] = None):
+        self.tokens = tokens
+        self.lease_id = lease_id
+        self.used_tokens: Optional[int] = None
+
+
+class LLMRateLimiter:
+    """单个LLM提供方的限流器
+
+    用法::
+
+        async with limiter.slot(estimated_tokens) as permit:
+            ...
+            permit.used_tokens = usage["total_tokens"]
+    """
+
+    def __init__(self, name: str, max_in_flight: int = 8, rpm: float = 0, tpm: float = 0,
+                 burst_seconds: float = 10.0, db_path: Optional[str] = None,
+                 lease_seconds: int = 600, poll_interval: float = 1.0):
+        """初始化限流器
+
+        Args:
+            name: 提供方名称，跨进程共享时作为限额的键
+            max_in_flight: 同时进行的请求数上限
+            rpm: 每分钟请求数上限，0表示不限制
+            tpm: 每分钟令牌数上限（输入加预估输出），0表示不限制
+            burst_seconds: 允许的突发量相当于多少秒的配额
+            db_path: 跨进程共享限额的SQLite数据库路径，为空时仅在进程内生效
+            lease_seconds: 跨进程占用的有效期，进程崩溃后到期自动释放
+            poll_interval: 跨进程等待时的最长轮询间隔（秒）
+        """
+        self.name = name
+        self.max_in_flight = max(1, max_in_flight)
+        self.rpm = max(0.0, rpm)
+        self.tpm = max(0.0, tpm)
+        self.burst_seconds = max(1.0, burst_seconds)
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+
+        self._requests = _TokenBucket(self.rpm, self.burst_seconds)
+        self._tokens = _TokenBucket(self.tpm, self.burst_seconds)
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._waiters: List[Tuple[int, int]] = []
+        self._seq = itertools.count()
+        self._condition = asyncio.Condition()
+
+        # 统计信息
+        self.acquire_count = 0
+        self.throttled = 0
+        self.wait_seconds = 0.0
+
+        if db_path:
+            db_dir = os.path.dirname(db_path)
+            if db_dir:
+                os.makedirs(db_dir, exist_ok=True)
+            self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        return conn
+
+    def _init_db(self) -> None:
+        conn = self._connect()
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_rate_leases (
+                    id TEXT PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_rate_buckets (
+                    name TEXT PRIMARY KEY,
+                    requests REAL NOT NULL,
+                    tokens REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_rate_leases_name ON llm_rate_leases (name)")
+        finally:
+            conn.close()
+
+    def _try_claim_shared(self, tokens: int) -> Tuple[Optional[str], float]:
+        """尝试在数据库中占用一个请求名额并扣除配额
+
+        Returns:
+            (占用ID, 需要等待的秒数)，占用成功时等待秒数为0
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM llm_rate_leases WHERE expires_at < ?", (now,))
+            active = conn.execute(
+                "SELECT COUNT(*) AS count FROM llm_rate_leases WHERE name = ?", (self.name,)
+            ).fetchone()["count"]
+            row = conn.execute(
+                "SELECT requests, tokens, updated_at FROM llm_rate_buckets WHERE name = ?", (self.name,)
+            ).fetchone()
+
+            # 按经过的时间补充两个桶
+            elapsed = max(0.0, now - row["updated_at"]) if row else 0.0
+            requests = self._requests.capacity if row is None else min(
+                self._requests.capacity, row["requests"] + elapsed * self._requests.rate)
+            available_tokens = self._tokens.capacity if row is None else min(
+                self._tokens.capacity, row["tokens"] + elapsed * self._tokens.rate)
+
+            wait = 0.0
+            if self._requests.rate and requests < 1:
+                wait = max(wait, (1 - requests) / self._requests.rate)
+            needed = min(tokens, self._tokens.capacity)
+            if self._tokens.rate and available_tokens < needed:
+                wait = max(wait, (needed - available_tokens) / self._tokens.rate)
+
+            lease_id = None
+            if active < self.max_in_flight and wait <= 0:
+                lease_id = str(uuid.uuid4())
+                conn.execute(
+                    "INSERT INTO llm_rate_leases (id, name, expires_at) VALUES (?, ?, ?)",
+                    (lease_id, self.name, now + self.lease_seconds)
+                )
+                if self._requests.rate:
+                    requests -= 1
+                if self._tokens.rate:
+                    available_tokens -= tokens
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_rate_buckets (name, requests, tokens, updated_at) "
+                "VALUES (?, ?, ?, ?)",
+                (self.name, requests, available_tokens, now)
+            )
+            conn.execute("COMMIT")
+            return lease_id, wait
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def _release_shared(self, lease_id: str, refund: float) -> None:
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM llm_rate_leases WHERE id = ?", (lease_id,))
+            if refund and self._tokens.rate:
+                conn.execute(
+                    "UPDATE llm_rate_buckets SET tokens = MIN(?, tokens + ?) WHERE name = ?",
+                    (self._tokens.capacity, refund, self.name)
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    async def _acquire_local(self, tokens: int, priority: int) -> None:
+        """按优先级排队等待进程内的请求名额和配额"""
+        async with self._condition:
+            entry = (priority, next(self._seq))
+            heapq.heappush(self._waiters, entry)
+            try:
+                throttled = False
+                while True:
+                    timeout = None
+                    if self._waiters[0] == entry and self._in_flight < self.max_in_flight:
+                        now = time.monotonic()
+                        timeout = max(self._paused_until - now,
+                                      self._requests.wait_time(1, now),
+                                      self._tokens.wait_time(tokens, now))
+                        if timeout <= 0:
+                            self._requests.take(1)
+                            self._tokens.take(tokens)
+                            self._in_flight += 1
+                            return
+                        if not throttled:
+                            throttled = True
+                            self.throttled += 1
+                    # 不在队首或名额已满时等待通知，配额不足时等到配额补足
+                    try:
+                        await asyncio.wait_for(self._condition.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+            finally:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+                self._condition.notify_all()
+
+    async def _release_local(self, refund: float) -> None:
+        async with self._condition:
+            self._in_flight -= 1
+            if refund:
+                self._tokens.refund(refund)
+            self._condition.notify_all()
+
+    async def acquire(self, tokens: int, priority: Optional[int] = None) -> RatePermit:
+        """获取一次调用的许可，必要时排队等待
+
+        Args:
+            tokens: 本次调用预估的令牌数
+            priority: 排队优先级，默认取自当前上下文
+
+        Returns:
+            调用许可
+        """
+        if priority is None:
+            priority = current_llm_priority.get()
+        started = time.monotonic()
+        await self._acquire_local(tokens, priority)
+
+        permit = RatePermit(tokens)
+        if self.db_path:
+            try:
+                while True:
+                    permit.lease_id, wait = await asyncio.to_thread(self._try_claim_shared, tokens)
+                    if permit.lease_id:
+                        break
+                    await asyncio.sleep(min(max(wait, 0.1), self.poll_interval))
+            except BaseException:
+                await self._release_local(0)
+                raise
+
+        self.acquire_count += 1
+        self.wait_seconds += time.monotonic() - started
+        return permit
+
+    async def release(self, permit: RatePermit) -> None:
+        """释放调用许可，填入了实际用量时归还多扣的令牌
+
+        Args:
+            permit: acquire()返回的许可
+        """
+        refund = 0.0
+        if permit.used_tokens is not None:
+            refund = max(0.0, permit.tokens - permit.used_tokens)
+        if permit.lease_id:
+            try:
+                await asyncio.to_thread(self._release_shared, permit.lease_id, refund)
+            except Exception as e:
+                # 释放失败时依赖占用有效期自动过期
+                print(f"释放LLM限流占用失败: {str(e)}")
+        await self._release_local(refund)
+
+    @asynccontextmanager
+    async def slot(self, tokens: int, priority: Optional[int] = None):
+        """在限流许可内执行一次调用
+
+        Args:
+            tokens: 本次调用预估的令牌数
+            priority: 排队优先级，默认取自当前上下文
+        """
+        permit = await self.acquire(tokens, priority)
+        try:
+            yield permit
+        finally:
+            await self.release(permit)
+
+    def pause(self, seconds: float) -> None:
+        """收到429时暂停放行新请求，避免其他请求继续撞上限额"""
+        self._paused_until = max(self._paused_until, time.monotonic() + max(0.0, seconds))
+
+    def stats(self) -> Dict[str, Any]:
+        """返回限流统计"""
+        return {
+            "in_flight": self._in_flight,
+            "queued": len(self._waiters),
+            "acquire_count": self.acquire_count,
+            "throttled": self.throttled,
+            "wait_seconds": round(self.wait_seconds, 3),
+        }
+
+
+def _env(name: str, key: str, default: str) -> str:
+    """读取提供方专用的配置（如OPENAI_RPM），未设置时使用通用配置（如LLM_RPM）"""
+    return os.getenv(f"{name.upper()}_{key}") or os.getenv(f"LLM_{key}", default)
+
+
+_limiters: Dict[str, LLMRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(name: str) -> LLMRateLimiter:
+    """获取提供方对应的进程内共享限流器，配置来自环境变量"""
+    with _limiters_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            limiter = LLMRateLimiter(
+                name,
+                max_in_flight=int(_env(name, "MAX_IN_FLIGHT", "8")),
+                rpm=float(_env(name, "RPM", "0")),
+                tpm=float(_env(name, "TPM", "0")),
+                burst_seconds=float(os.getenv("LLM_RATE_BURST_SECONDS", "10")),
+                db_path=os.getenv("LLM_RATE_LIMIT_DB") or None,
+            )
+            _limiters[name] = limiter
+        return limiter
@@ -0,0 +1,312 @@
+"""
+调用弹性模块，为LLM接口调用提供重试、退避和熔断
+
+暂时性错误（限流、5xx、超时、连接中断）按指数退避加随机抖动重试，并遵循Retry-After；
+同一接口连续失败达到阈值后熔断，熔断期间直接失败，避免每个目录都等满超时。
+"""
+
+import asyncio
+import contextlib
+import email.utils
+import os
+import random
+import threading
+import time
+from typing import Any, AsyncContextManager, Awaitable, Callable, Dict, Optional, Tuple, Type
+
+# 可以重试的HTTP状态码
+RETRYABLE_STATUSES = {408, 409, 425, 429, 500, 502, 503, 504, 520, 522, 524, 529}
+
+
+class LLMAPIError(Exception):
+    """LLM接口返回了非200响应"""
+
+    def __init__(self, status: int, message: str, retry_after: Optional[float] = None):
+        super().__init__(f"API调用失败，状态码: {status}, 错误: {message}")
+        self.status = status
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self) -> bool:
+        return self.status in RETRYABLE_STATUSES
+
+
+class CircuitOpenError(Exception):
+    """熔断器打开，调用被直接拒绝"""
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析Retry-After响应头（秒数或HTTP日期）
+
+    Args:
+        value: 响应头的值
+
+    Returns:
+        需要等待的秒数，无法解析时返回None
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at is None:
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class RetryPolicy:
+    """重试策略"""
+
+    def __init__(self, max_attempts: int = 4, base_delay: float = 1.0, max_delay: float = 30.0,
+                 attempt_timeout: float = 90.0, total_timeout: float = 240.0):
+        """初始化重试策略
+
+        Args:
+            max_attempts: 最多尝试次数（含首次）
+            base_delay: 第一次重试前的基础等待秒数，之后每次翻倍
+            max_delay: 单次等待的上限秒数
+            attempt_timeout: 单次尝试的超时秒数
+            total_timeout: 整个调用（含重试和等待）的截止秒数
+        """
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.attempt_timeout = attempt_timeout
+        self.total_timeout = total_timeout
+
+    @classmethod
+    def from_env(cls) -> "RetryPolicy":
+        """从环境变量读取重试策略"""
+        return cls(
+            max_attempts=int(os.getenv("LLM_MAX_ATTEMPTS", "4")),
+            base_delay=float(os.getenv("LLM_RETRY_BASE_DELAY", "1")),
+            max_delay=float(os.getenv("LLM_RETRY_MAX_DELAY", "30")),
+            attempt_timeout=float(os.getenv("LLM_ATTEMPT_TIMEOUT", "90")),
+            total_timeout=float(os.getenv("LLM_TOTAL_TIMEOUT", "240")),
+        )
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """计算第attempt次失败后的等待秒数（全抖动指数退避）"""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+        if retry_after is not None:
+            # 服务端要求的等待时间优先
+            delay = max(delay, retry_after)
+        return delay
+
+
+class CircuitBreaker:
+    """单个接口的熔断器
+
+    连续失败failure_threshold次后打开，reset_timeout秒后进入半开状态，
+    只放行一个探测请求，成功则关闭，失败则重新打开。
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """初始化熔断器
+
+        Args:
+            name: 接口名称，用于日志和统计
+            failure_threshold: 打开熔断器所需的连续失败次数
+            reset_timeout: 打开后多少秒允许探测请求
+        """
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+        # 统计信息
+        self.times_opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """是否允许发起请求"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    self.rejected += 1
+                    return False
+                self._state = self.HALF_OPEN
+            # 半开状态只放行一个探测请求
+            if self._probe_in_flight:
+                self.rejected += 1
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def retry_in(self) -> float:
+        """距离允许探测请求的剩余秒数"""
+        with self._lock:
+            if self._state != self.OPEN:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self.times_opened += 1
+                    print(f"接口 {self.name} 连续失败 {self._failures} 次，熔断 {self.reset_timeout:.0f} 秒")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def release_probe(self) -> None:
+        """探测请求未得出结论（例如被取消）时归还探测名额"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+        }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    """获取接口对应的进程内共享熔断器，配置来自环境变量"""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                name,
+                failure_threshold=int(os.getenv("LLM_BREAKER_THRESHOLD", "5")),
+                reset_timeout=float(os.getenv("LLM_BREAKER_RESET", "30")),
+            )
+            _breakers[name] = breaker
+        return breaker
+
+
+class ResilientCaller:
+    """按重试策略和熔断器执行异步调用"""
+
+    def __init__(self, breaker: CircuitBreaker, policy: Optional[RetryPolicy] = None,
+                 retry_exceptions: Tuple[Type[BaseException], ...] = ()):
+        """初始化调用器
+
+        Args:
+            breaker: 接口的熔断器
+            policy: 重试策略，默认从环境变量读取
+            retry_exceptions: 除超时和LLMAPIError外，视为暂时性错误的异常类型
+        """
+        self.breaker = breaker
+        self.policy = policy or RetryPolicy.from_env()
+        self.retry_exceptions = (asyncio.TimeoutError, ConnectionError) + tuple(retry_exceptions)
+
+        # 统计信息
+        self.calls = 0
+        self.attempts = 0
+        self.retries = 0
+        self.successes = 0
+        self.failures = 0
+
+    def _is_transient(self, error: BaseException) -> bool:
+        if isinstance(error, LLMAPIError):
+            return error.retryable
+        return isinstance(error, self.retry_exceptions)
+
+    async def call(self, attempt: Callable[[float], Awaitable[Any]],
+                   gate: Optional[Callable[[], AsyncContextManager[Any]]] = None) -> Any:
+        """执行调用，暂时性错误时退避重试
+
+        Args:
+            attempt: 发起单次请求的协程函数，参数为本次尝试的超时秒数
+            gate: 每次尝试前进入、尝试结束即退出的异步上下文（如限流许可），退避等待期间不持有，
+                排队等待的时间不计入超时
+
+        Returns:
+            attempt的返回值
+        """
+        self.calls += 1
+        deadline = time.monotonic() + self.policy.total_timeout
+        attempt_no = 0
+
+        while True:
+            if not self.breaker.allow():
+                self.failures += 1
+                raise CircuitOpenError(
+                    f"接口 {self.breaker.name} 已熔断，{self.breaker.retry_in():.1f} 秒后重试"
+                )
+
+            attempt_no += 1
+            self.attempts += 1
+            try:
+                queued = time.monotonic()
+                async with (gate() if gate else contextlib.nullcontext()):
+                    deadline += time.monotonic() - queued
+                    remaining = deadline - time.monotonic()
+                    timeout = max(0.1, min(self.policy.attempt_timeout, remaining))
+                    result = await asyncio.wait_for(attempt(timeout), timeout=timeout)
+            except asyncio.CancelledError:
+                self.breaker.release_probe()
+                raise
+            except Exception as e:
+                transient = self._is_transient(e)
+                if transient:
+                    self.breaker.record_failure()
+                else:
+                    # 请求本身的错误（如400、401）不代表接口不可用
+                    self.breaker.record_success()
+
+                retry_after = getattr(e, "retry_after", None)
+                delay = self.policy.backoff(attempt_no, retry_after)
+                if (not transient or attempt_no >= self.policy.max_attempts
+                        or time.monotonic() + delay >= deadline):
+                    self.failures += 1
+                    raise
+                self.retries += 1
+                print(f"调用 {self.breaker.name} 失败（第 {attempt_no} 次）: {str(e) or type(e).__name__}，"
+                      f"{delay:.1f} 秒后重试")
+                await asyncio.sleep(delay)
+                continue
+
+            self.breaker.record_success()
+            self.successes += 1
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        """返回调用统计和熔断器状态"""
+        return {
+            "calls": self.calls,
+            "attempts": self.attempts,
+            "retries": self.retries,
+            "successes": self.successes,
+            "failures": self.failures,
+            "breaker": self.breaker.stats(),
+        }
@@ -0,0 +1,95 @@
+"""
+请求合并模块，相同请求同时进行时只向上游发起一次调用
+
+多个工作协程为同一目录生成内容、或重复点击开始提交时，会同时发出完全相同的提示词。
+第一个调用方负责执行请求，其余调用方等待同一个结果，不再各自查缓存和调用API。
+"""
+
+import asyncio
+import copy
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class _Flight:
+    """一次进行中的调用"""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """按请求键合并同时进行的异步调用"""
+
+    def __init__(self):
+        # 键中包含事件循环，不同线程的事件循环之间不共享任务
+        self._flights: Dict[Tuple[int, Hashable], _Flight] = {}
+
+        # 统计信息
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """执行调用，相同键的调用正在进行时等待其结果
+
+        上游调用在独立任务中执行，某个调用方被取消不会影响其他调用方；
+        所有调用方都取消后才取消上游调用。
+
+        Args:
+            key: 请求键
+            fn: 发起上游调用的协程函数
+
+        Returns:
+            (结果, 是否复用了其他调用方的请求)，复用的结果是深拷贝，可以放心修改
+        """
+        flight_key = (id(asyncio.get_running_loop()), key)
+        flight = self._flights.get(flight_key)
+        shared = flight is not None
+        if shared:
+            self.coalesced += 1
+        else:
+            self.leaders += 1
+            # 任务继承发起方的上下文（提交ID、目录和用途），用量记在发起方名下
+            flight = _Flight(asyncio.create_task(fn()))
+            self._flights[flight_key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(flight_key, flight))
+
+        flight.waiters += 1
+        try:
+            result = await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if not flight.task.done() and flight.waiters == 1:
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+        return (copy.deepcopy(result) if shared else result), shared
+
+    def _forget(self, flight_key: Tuple[int, Hashable], flight: _Flight) -> None:
+        if self._flights.get(flight_key) is flight:
+            del self._flights[flight_key]
+
+    def in_flight(self) -> int:
+        """进行中的上游调用数"""
+        return len(self._flights)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "in_flight": self.in_flight(),
+        }
+
+
+_default_group: Optional[SingleFlight] = None
+_default_group_lock = threading.Lock()
+
+
+def get_single_flight() -> SingleFlight:
+    """获取进程内共享的请求合并组，同一进程内所有客户端实例共用"""
+    global _default_group
+    with _default_group_lock:
+        if _default_group is None:
+            _default_group = SingleFlight()
+        return _default_group
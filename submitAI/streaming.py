@@ -0,0 +1,140 @@
+"""
+流式响应模块，解析SSE事件流并增量提取模型输出中的JSON字段
+
+模型逐段输出JSON时，顶层对象的每个字段一旦完整即可取用，
+调用方拿到所需字段后可以提前结束请求，不必等待整个响应生成完毕。
+"""
+
+import json
+from typing import Any, AsyncIterator, Dict, Iterable, Optional
+
+
+async def iter_sse_data(lines: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """从SSE响应体中逐个取出data字段
+
+    Args:
+        lines: 按行读取的响应体（如aiohttp的response.content）
+
+    Yields:
+        每个事件的data内容，遇到[DONE]时结束
+    """
+    data_lines = []
+    async for raw in lines:
+        line = raw.decode("utf-8", errors="replace").rstrip("\r\n")
+        if not line:
+            # 空行表示一个事件结束
+            if data_lines:
+                data = "\n".join(data_lines)
+                data_lines = []
+                if data.strip() == "[DONE]":
+                    return
+                yield data
+            continue
+        if line.startswith(":"):
+            # 注释或心跳
+            continue
+        if line.startswith("data:"):
+            data_lines.append(line[5:].lstrip(" "))
+    if data_lines:
+        data = "\n".join(data_lines)
+        if data.strip() != "[DONE]":
+            yield data
+
+
+def extract_delta(event: Dict[str, Any]) -> str:
+    """取出聊天完成流式事件中的增量文本"""
+    choices = event.get("choices") or [{}]
+    return (choices[0].get("delta") or {}).get("content") or ""
+
+
+class IncrementalJSONParser:
+    """增量解析模型输出中的顶层JSON对象
+
+    跳过对象之前的说明文字和```json代码块标记，每当顶层对象的一个字段完整时解析出该字段。
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.fields: Dict[str, Any] = {}
+        self.done = False
+
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._started = False
+        self._member_start: Optional[int] = None
+
+    def feed(self, chunk: str) -> Dict[str, Any]:
+        """输入一段文本
+
+        Args:
+            chunk: 新到达的文本
+
+        Returns:
+            本次新解析出的完整字段
+        """
+        self.text += chunk
+        completed: Dict[str, Any] = {}
+        text = self.text
+
+        while self._pos < len(text) and not self.done:
+            ch = text[self._pos]
+
+            if not self._started:
+                if ch == "{":
+                    self._started = True
+                    self._depth = 1
+                    self._member_start = self._pos + 1
+                self._pos += 1
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._complete_member(self._pos, completed)
+                    self.done = True
+            elif ch == "," and self._depth == 1:
+                self._complete_member(self._pos, completed)
+                self._member_start = self._pos + 1
+            self._pos += 1
+
+        return completed
+
+    def _complete_member(self, end: int, completed: Dict[str, Any]) -> None:
+        member = self.text[self._member_start:end].strip()
+        if not member:
+            return
+        try:
+            parsed = json.loads("{" + member + "}")
+        except ValueError:
+            return
+        self.fields.update(parsed)
+        completed.update(parsed)
+
+    def has_fields(self, keys: Iterable[str]) -> bool:
+        """所需字段是否都已完整"""
+        return all(key in self.fields for key in keys)
+
+    def result(self) -> Dict[str, Any]:
+        """返回解析结果，对象完整时以整体解析为准"""
+        if self.done:
+            start = self.text.find("{")
+            try:
+                parsed = json.loads(self.text[start:self._pos])
+                if isinstance(parsed, dict):
+                    return parsed
+            except ValueError:
+                pass
+        return dict(self.fields)
@@ -0,0 +1,258 @@
+"""
+提交状态存储模块，基于SQLite（WAL模式）保存提交及每个目录的结果
+
+每个目录结果单独一行，更新单个结果只写一行；提交的JSON文件仅作为兼容导出。
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+DEFAULT_DB_PATH = os.getenv("SUBMISSION_DB", "data/submissions.db")
+
+
+class SubmissionStore:
+    """提交状态存储"""
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, json_dir: str = "submissions",
+                 import_json: bool = True):
+        """初始化存储
+
+        Args:
+            db_path: SQLite数据库文件路径
+            json_dir: 兼容导出的JSON文件目录
+            import_json: 是否导入数据库中尚不存在的旧JSON提交文件
+        """
+        self.db_path = db_path
+        self.json_dir = json_dir
+        self._local = threading.local()
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        os.makedirs(json_dir, exist_ok=True)
+
+        self._init_db()
+        if import_json:
+            self.import_json_files()
+
+    def _conn(self) -> sqlite3.Connection:
+        """获取当前线程的数据库连接"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def _init_db(self) -> None:
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS submissions (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                created_at TEXT,
+                updated_at TEXT,
+                data TEXT NOT NULL
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS submission_results (
+                submission_id TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                directory_url TEXT,
+                is_success INTEGER,
+                submitted_at TEXT,
+                data TEXT NOT NULL,
+                PRIMARY KEY (submission_id, idx)
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_submissions_created ON submissions (created_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_submissions_status ON submissions (status)")
+
+    @staticmethod
+    def _split(submission: Dict[str, Any]):
+        """拆分提交主体和结果列表"""
+        body = {k: v for k, v in submission.items() if k != "results"}
+        return body, submission.get("results", [])
+
+    @staticmethod
+    def _success_value(result: Dict[str, Any]) -> Optional[int]:
+        is_success = result.get("is_success")
+        return None if is_success is None else int(bool(is_success))
+
+    def save_submission(self, submission: Dict[str, Any]) -> None:
+        """整体写入一个提交（新建或覆盖），在一个事务内完成"""
+        body, results = self._split(submission)
+        now = datetime.now().isoformat()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO submissions (id, status, created_at, updated_at, data) VALUES (?, ?, ?, ?, ?)",
+                (body["id"], body.get("status", "pending"), body.get("created_at"), now,
+                 json.dumps(body, ensure_ascii=False))
+            )
+            conn.execute("DELETE FROM submission_results WHERE submission_id = ?", (body["id"],))
+            conn.executemany(
+                "INSERT INTO submission_results (submission_id, idx, directory_url, is_success, submitted_at, data) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (body["id"], idx, result.get("directory_url"), self._success_value(result),
+                     result.get("submitted_at"), json.dumps(result, ensure_ascii=False))
+                    for idx, result in enumerate(results)
+                ]
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def update_result(self, submission_id: str, index: int, result: Dict[str, Any]) -> None:
+        """更新单个目录结果（单行写入）"""
+        self._conn().execute(
+            "UPDATE submission_results SET directory_url = ?, is_success = ?, submitted_at = ?, data = ? "
+            "WHERE submission_id = ? AND idx = ?",
+            (result.get("directory_url"), self._success_value(result), result.get("submitted_at"),
+             json.dumps(result, ensure_ascii=False), submission_id, index)
+        )
+
+    def update_status(self, submission_id: str, status: str) -> bool:
+        """更新提交整体状态
+
+        Returns:
+            提交是否存在
+        """
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT data FROM submissions WHERE id = ?", (submission_id,)).fetchone()
+            if not row:
+                conn.execute("COMMIT")
+                return False
+            body = json.loads(row["data"])
+            body["status"] = status
+            conn.execute(
+                "UPDATE submissions SET status = ?, updated_at = ?, data = ? WHERE id = ?",
+                (status, datetime.now().isoformat(), json.dumps(body, ensure_ascii=False), submission_id)
+            )
+            conn.execute("COMMIT")
+            return True
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get_status(self, submission_id: str) -> Optional[str]:
+        """仅读取提交状态"""
+        row = self._conn().execute("SELECT status FROM submissions WHERE id = ?", (submission_id,)).fetchone()
+        return row["status"] if row else None
+
+    def get_submission(self, submission_id: str) -> Optional[Dict[str, Any]]:
+        """读取完整提交（含结果列表）"""
+        conn = self._conn()
+        row = conn.execute("SELECT data FROM submissions WHERE id = ?", (submission_id,)).fetchone()
+        if not row:
+            return None
+        submission = json.loads(row["data"])
+        rows = conn.execute(
+            "SELECT data FROM submission_results WHERE submission_id = ? ORDER BY idx", (submission_id,)
+        ).fetchall()
+        submission["results"] = [json.loads(r["data"]) for r in rows]
+        return submission
+
+    def list_submissions(self, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        """列出提交，最新创建的在前
+
+        Args:
+            status: 只返回该状态的提交
+        """
+        conn = self._conn()
+        if status:
+            rows = conn.execute(
+                "SELECT id, data FROM submissions WHERE status = ? ORDER BY created_at DESC", (status,)
+            ).fetchall()
+        else:
+            rows = conn.execute("SELECT id, data FROM submissions ORDER BY created_at DESC").fetchall()
+
+        submissions = {}
+        for row in rows:
+            submissions[row["id"]] = json.loads(row["data"])
+            submissions[row["id"]]["results"] = []
+        if not submissions:
+            return []
+
+        placeholders = ",".join("?" * len(submissions))
+        result_rows = conn.execute(
+            f"SELECT submission_id, data FROM submission_results WHERE submission_id IN ({placeholders}) "
+            "ORDER BY submission_id, idx",
+            list(submissions.keys())
+        ).fetchall()
+        for r in result_rows:
+            submissions[r["submission_id"]]["results"].append(json.loads(r["data"]))
+        return list(submissions.values())
+
+    def delete_submission(self, submission_id: str) -> bool:
+        """删除提交
+
+        Returns:
+            提交是否存在
+        """
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = conn.execute("DELETE FROM submissions WHERE id = ?", (submission_id,))
+            conn.execute("DELETE FROM submission_results WHERE submission_id = ?", (submission_id,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        json_path = Path(self.json_dir) / f"{submission_id}.json"
+        if json_path.exists():
+            json_path.unlink()
+        return cursor.rowcount > 0
+
+    def export_json(self, submission_id: str) -> Optional[str]:
+        """将提交导出为兼容的JSON文件（原子替换）
+
+        Returns:
+            导出的文件路径，提交不存在时返回None
+        """
+        submission = self.get_submission(submission_id)
+        if submission is None:
+            return None
+        path = os.path.join(self.json_dir, f"{submission_id}.json")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(submission, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        return path
+
+    def import_json_files(self) -> int:
+        """导入数据库中尚不存在的JSON提交文件
+
+        Returns:
+            导入的提交数
+        """
+        conn = self._conn()
+        known = {row["id"] for row in conn.execute("SELECT id FROM submissions").fetchall()}
+        imported = 0
+        for file in Path(self.json_dir).glob("*.json"):
+            if file.stem in known:
+                continue
+            try:
+                with open(file, "r", encoding="utf-8") as f:
+                    submission = json.load(f)
+                submission.setdefault("id", file.stem)
+                self.save_submission(submission)
+                imported += 1
+            except Exception as e:
+                print(f"导入提交文件 {file} 失败: {str(e)}")
+        return imported
@@ -15,6 +15,9 @@ from browser_use import Agent, BrowserConfig, Browser, Controller, ActionResult
 from browser_use.browser.context import BrowserContextConfig, BrowserContext
 
 from pydantic import BaseModel
+
+from browser_pool import BrowserPool
+from domain_scheduler import get_domain_scheduler, extract_domain
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -166,15 +169,23 @@ class DirectorySubmitter:
         Path("logs").mkdir(exist_ok=True)
         Path("logs/conversation").mkdir(exist_ok=True)
 
-        self.browser = None
+        # 常驻浏览器池：浏览器进程跨目录复用，每个目录使用全新的上下文
+        self.browser_pool = BrowserPool(
+            launch_browser=self._launch_browser,
+            new_context=self._new_context_for_domain,
+            close_context=self._close_context,
+            close_browser=self._close_browser,
+            max_browsers=int(os.getenv("BROWSER_POOL_SIZE", "1")),
+            max_contexts_per_browser=int(os.getenv("BROWSER_MAX_CONTEXTS", "4")),
+            recycle_after=int(os.getenv("BROWSER_RECYCLE_AFTER", "20")),
+        )
+
+        # 全局域名调度：所有提交任务共享同一域名的并发上限和提交间隔
+        self.domain_scheduler = get_domain_scheduler()
 
     def _extract_domain(self, url: str) -> str:
         """Extract domain from URL."""
-        parsed_url = urllib.parse.urlparse(url)
-        domain = parsed_url.netloc
-        if domain.startswith('www.'):
-            domain = domain[4:]
-        return domain
+        return extract_domain(url)
 
     def _normalize_url(self, url: str) -> str:
         """Normalize URL for filename purposes."""
@@ -183,7 +194,7 @@ class DirectorySubmitter:
         normalized = normalized.replace('/', '_').replace(':', '_').replace('.', '_')
         return normalized
 
-    def _get_context_for_domain(self, domain: str) -> BrowserContext:
+    def _get_context_for_domain(self, browser: Browser, domain: str) -> BrowserContext:
         """Get browser context with cookies specific to the domain."""
         cookies_file = f"accounts/cookies_{domain}.json"
 
@@ -197,16 +208,24 @@ class DirectorySubmitter:
             # viewport_expansion=-1,
         )
 
-        return BrowserContext(browser=self.browser, config=context_config)
+        return BrowserContext(browser=browser, config=context_config)
+
+    async def _new_context_for_domain(self, browser: Browser, domain: str) -> BrowserContext:
+        """Create a fresh context on a pooled browser."""
+        return self._get_context_for_domain(browser, domain)
 
-    def _initialize_browser(self):
-        """Initialize a new browser instance."""
-        self.browser = Browser(config=self.browser_config)
+    async def _launch_browser(self) -> Browser:
+        """Launch a new browser instance for the pool."""
+        return Browser(config=self.browser_config)
 
-    async def _close_browser(self):
-        """Close the current browser instance."""
-        if hasattr(self, 'browser'):
-            await self.browser.close()
+    async def _close_browser(self, browser: Browser):
+        """Close a browser instance retired from the pool."""
+        if browser:
+            await browser.close()
+
+    async def close(self):
+        """Close all pooled browsers."""
+        await self.browser_pool.close()
 
     async def _close_context(self, context):
         """Close a browser context."""
@@ -229,9 +248,8 @@ class DirectorySubmitter:
     async def submit_to_directory(self, submit_url: str, site_info: str, email: str) -> DirectorySubmissionResult:
         """Submit website information to a directory listing."""
         domain = self._extract_domain(submit_url)
-        context = self._get_context_for_domain(domain)
 
-        try:
+        async with self.domain_scheduler.slot(domain), self.browser_pool.lease(domain) as context:
             task_description = f"""
 Go to {submit_url}
 Goal: submit my product to the website.
@@ -275,9 +293,6 @@ If you see a CAPTCHA that you cannot solve, use the `ask_human` tool to solve it
             await self._close_all_tabs(context)
 
             return result
-        finally:
-            # Make sure context is closed
-            await self._close_context(context)
 
     def _save_result(self, result: DirectorySubmissionResult | str, submit_url: str, website_url: str) -> None:
         """Save result to the appropriate output files."""
@@ -303,11 +318,9 @@ If you see a CAPTCHA that you cannot solve, use the `ask_human` tool to solve it
     async def submit_single_directory(self, submit_url: str, site_info: str, email: str) -> DirectorySubmissionResult:
         """Submit to a single directory.
 
-        This method handles initializing and closing the browser.
+        The browser comes from the pool and stays warm for later directories;
+        call close() when all submissions are done.
         """
-        # Initialize a new browser for this URL
-        self._initialize_browser()
-
         try:
             result = await self.submit_to_directory(submit_url, site_info, email)
             website_url = None
@@ -342,9 +355,6 @@ If you see a CAPTCHA that you cannot solve, use the `ask_human` tool to solve it
 
             self._save_result(result, submit_url, website_url)
             return result
-        finally:
-            # Close the browser after processing
-            await self._close_browser()
 
 def read_site_info_file(file_path):
     """Read the entire site information file as a string."""
@@ -397,6 +407,8 @@ async def main():
                 site_info,
                 email
             )
+
+        await directory_submitter.close()
     except Exception as e:
         print(f"Error in main process: {str(e)}")
 
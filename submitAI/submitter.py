@@ -8,6 +8,15 @@ from datetime import datetime
 from pathlib import Path
 from typing import Dict, Any, Optional, List
 from .openai_client import OpenAIClient
+from .llm_router import LLMRouter
+from .browser_pool import BrowserPool
+from .submission_store import SubmissionStore
+from .domain_scheduler import get_domain_scheduler, extract_domain, interleave_by_domain
+from .prefetch import PrefetchPipeline
+from .cancellation import CancellationToken
+from .log_sink import get_log_sink, log_context, current_directory_index
+from .rate_limiter import PRIORITY_BATCH, llm_priority
+from .usage_tracker import llm_directories
 
 # 导入浏览器自动化模块
 from browser_use import Browser, BrowserConfig, Agent, SubmissionResult
@@ -16,180 +25,369 @@ from browser_use import Browser, BrowserConfig, Agent, SubmissionResult
 class SubmissionProcessor:
     """处理提交请求，并管理提交状态"""
 
-    def __init__(self, openai_api_key: Optional[str] = None):
+    def __init__(self, openai_api_key: Optional[str] = None,
+                 max_concurrent_directories: int = 3,
+                 max_global_directories: int = 6,
+                 browser_recycle_after: int = 20,
+                 store: Optional[SubmissionStore] = None,
+                 max_directory_attempts: int = 3,
+                 content_prefetch_depth: int = 2,
+                 content_batch_size: int = 4,
+                 ai_client: Optional[LLMRouter] = None):
         """初始化提交处理器
         
         Args:
             openai_api_key: OpenAI API密钥，用于AI辅助提交
+            max_concurrent_directories: 单个提交同时处理的目录数上限
+            max_global_directories: 所有提交合计同时处理的目录数上限
+            browser_recycle_after: 每个浏览器代理处理多少个目录后重启
+            store: 提交状态存储，默认使用SQLite存储
+            max_directory_attempts: 单个目录因异常失败后最多尝试的次数
+            content_prefetch_depth: AI提交内容最多提前生成的批次数
+            content_batch_size: 一次AI调用生成提交内容的目录数
+            ai_client: LLM路由（多个提供方故障转移），提供时忽略openai_api_key
         """
         # 确保目录存在
         os.makedirs("submissions", exist_ok=True)
         os.makedirs("logs", exist_ok=True)
         os.makedirs("logs/submissions", exist_ok=True)
         
-        # 初始化OpenAI客户端（如果提供了API密钥）
-        self.ai_client = None
-        if openai_api_key:
-            self.ai_client = OpenAIClient(openai_api_key)
-            
-        # 初始化浏览器代理
-        self.browser_agent = None
+        # 日志由后台线程批量写入
+        self.log_sink = get_log_sink()
+        
+        # 提交状态存储
+        self.store = store or SubmissionStore()
+        
+        # 初始化AI客户端：优先使用传入的LLM路由，否则使用OpenAI客户端（如果提供了API密钥）
+        self.ai_client = ai_client
+        if self.ai_client is None and openai_api_key:
+            self.ai_client = LLMRouter([OpenAIClient(openai_api_key)])
+            
+        # 目录级并发控制
+        self.max_concurrent_directories = max(1, max_concurrent_directories)
+        self._global_directory_slots = asyncio.Semaphore(max(1, max_global_directories))
+        self.max_directory_attempts = max(1, max_directory_attempts)
+        self.content_prefetch_depth = max(1, content_prefetch_depth)
+        self.content_batch_size = max(1, content_batch_size)
+        
+        # 正在处理的提交的取消令牌，按提交ID索引
+        self._cancel_tokens: Dict[str, CancellationToken] = {}
+        
+        # 全局域名调度：限制同一目录网站的并发数和提交间隔
+        self.domain_scheduler = get_domain_scheduler()
+        
+        # 常驻浏览器池：代理启动后保持预热，按目录租用，达到次数后回收重启。
+        # 代理本身只包含一个浏览器会话，因此每个代理同一时间只服务一个目录。
+        self.browser_pool = BrowserPool(
+            launch_browser=self._launch_browser_agent,
+            new_context=self._open_agent_session,
+            close_browser=self._close_browser_agent,
+            max_browsers=max(1, max_global_directories),
+            max_contexts_per_browser=1,
+            recycle_after=browser_recycle_after
+        )
+        
+    def _create_browser_agent(self) -> Agent:
+        """创建一个新的浏览器代理"""
+        browser_config = BrowserConfig(
+            headless=True,  # 无界面模式
+            timeout=60000,  # 60秒超时
+            device_scale_factor=1.0,
+            viewport_width=1280,
+            viewport_height=800,
+            user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.114 Safari/537.36"
+        )
+        return Agent(browser_config=browser_config)
+    
+    async def _launch_browser_agent(self) -> Agent:
+        """创建并初始化浏览器代理，供浏览器池使用"""
+        self._log_info("正在启动浏览器代理...")
+        browser_agent = self._create_browser_agent()
+        initialized = await browser_agent.initialize()
+        if not initialized:
+            await browser_agent.close()
+            raise RuntimeError("浏览器初始化失败")
+        self._log_info("浏览器代理启动成功")
+        return browser_agent
+    
+    async def _open_agent_session(self, browser_agent: Agent) -> Agent:
+        """从浏览器池租用代理会话"""
+        return browser_agent
+    
+    async def _close_browser_agent(self, browser_agent: Agent):
+        """关闭浏览器池回收的代理"""
+        await browser_agent.close()
+        self._log_info("浏览器代理已关闭")
         
     async def process_submission(self, submission_id: str):
         """处理一个提交请求"""
+        token = CancellationToken()
+        self._cancel_tokens[submission_id] = token
+        try:
+            # 本次处理中的日志（包括各目录任务）都带上提交ID
+            with log_context(submission_id=submission_id):
+                return await self._process_submission(submission_id, token)
+        finally:
+            self._cancel_tokens.pop(submission_id, None)
+    
+    def cancel_submission(self, submission_id: str, reason: str = "用户取消") -> bool:
+        """取消正在处理的提交
+        
+        进行中的目录会立即中止（浏览器会话随之关闭、AI请求随之断开），
+        尚未开始的目录不再处理，二者的结果都标记为已取消。
+        
+        Args:
+            submission_id: 提交ID
+            reason: 取消原因
+            
+        Returns:
+            提交是否正在本处理器中处理
+        """
+        token = self._cancel_tokens.get(submission_id)
+        if token is None:
+            return False
+        if token.cancel(reason):
+            self._log_info(f"正在取消提交: {reason}", submission_id=submission_id)
+        return True
+    
+    def abandon_submission(self, submission_id: str, reason: str) -> bool:
+        """放弃正在处理的提交，不再写回任何结果和状态
+        
+        任务租约丢失后提交已由其他工作进程接手，本进程中的处理只需立即中止，
+        不能把未完成的目录标记为已取消，也不能改写提交的整体状态。
+        
+        Args:
+            submission_id: 提交ID
+            reason: 放弃原因
+            
+        Returns:
+            提交是否正在本处理器中处理
+        """
+        token = self._cancel_tokens.get(submission_id)
+        if token is None:
+            return False
+        token.abandon(reason)
+        self._log_info(f"放弃处理提交: {reason}", submission_id=submission_id)
+        return True
+    
+    def _is_abandoned(self, submission_id: str) -> bool:
+        token = self._cancel_tokens.get(submission_id)
+        return token is not None and token.abandoned
+    
+    async def _process_submission(self, submission_id: str, token: CancellationToken):
         # 读取提交信息
-        submission_path = f"submissions/{submission_id}.json"
-        if not os.path.exists(submission_path):
+        submission = self.store.get_submission(submission_id)
+        if submission is None:
             self._log_error(f"提交 {submission_id} 不存在")
             return False
         
-        # 加载提交信息
         try:
-            with open(submission_path, "r", encoding="utf-8") as f:
-                submission = json.load(f)
-                
             # 更新状态为处理中
             submission["status"] = "running"
-            self._save_submission(submission)
-            
-            # 创建浏览器代理（如果还没有创建）
-            if not self.browser_agent:
-                try:
-                    # 创建浏览器配置
-                    browser_config = BrowserConfig(
-                        headless=True,  # 无界面模式
-                        timeout=60000,  # 60秒超时
-                        device_scale_factor=1.0,
-                        viewport_width=1280,
-                        viewport_height=800,
-                        user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.114 Safari/537.36"
-                    )
-                    
-                    # 创建浏览器代理
-                    self._log_info(f"正在初始化浏览器代理...")
-                    self.browser_agent = Agent(browser_config=browser_config)
-                    
-                    # 初始化时不再调用initialize方法，留到处理每个目录前调用
-                    self._log_info(f"浏览器代理创建成功")
-                except Exception as e:
-                    error_message = f"创建浏览器代理失败: {str(e)}"
-                    self._log_error(error_message)
-                    
-                    # 更新状态为失败
-                    submission["status"] = "failed"
-                    for result in submission["results"]:
-                        result["is_success"] = False
-                        result["submitted_at"] = datetime.now().isoformat()
-                        result["short_reason_if_failed"] = "浏览器代理创建失败"
-                    
-                    self._save_submission(submission)
-                    return False
+            self._save_status(submission)
             
-            # 处理每个目标目录前初始化浏览器
+            # 断点续传：已成功和不可重试的目录直接跳过
+            pending = {i for i, result in enumerate(submission["results"]) if self._needs_processing(result)}
             for i, result in enumerate(submission["results"]):
-                target_url = result["directory_url"]
-                
-                # 记录日志
-                self._log_info(f"开始处理提交 {submission_id} 到 {target_url}")
-                
-                # 每个目标目录前重新初始化浏览器
-                active_browser = False
-                if self.browser_agent:
-                    try:
-                        self._log_info(f"正在为 {target_url} 初始化浏览器...")
-                        # 先关闭可能已存在的浏览器实例
-                        await self.browser_agent.close()
-                        
-                        # 初始化浏览器，确保每轮提交都使用新的浏览器会话
-                        initialized = await self.browser_agent.initialize()
-                        if initialized:
-                            active_browser = True
-                            self._log_info(f"浏览器初始化成功，准备提交到 {target_url}")
-                        else:
-                            self._log_error(f"浏览器初始化失败，无法提交到 {target_url}")
-                            # 更新结果
-                            result["is_success"] = False
-                            result["submitted_at"] = datetime.now().isoformat()
-                            result["short_reason_if_failed"] = "浏览器初始化失败"
-                            self._save_submission(submission)
-                            continue  # 跳过此目标
-                    except Exception as e:
-                        self._log_error(f"浏览器初始化异常: {str(e)}")
-                        # 更新结果
-                        result["is_success"] = False
-                        result["submitted_at"] = datetime.now().isoformat()
-                        result["short_reason_if_failed"] = f"浏览器初始化异常: {str(e)[:80]}"
-                        self._save_submission(submission)
-                        continue  # 跳过此目标
-                
-                try:
-                    # 如果有AI客户端，使用智能提交
-                    if self.ai_client:
-                        self._log_info(f"使用AI辅助提交到 {target_url}")
-                        await self._ai_submit_to_directory(submission, i)
-                    else:
-                        # 否则使用普通提交
-                        self._log_info(f"使用普通提交到 {target_url}")
-                        await self._submit_to_directory(submission, i)
-                except Exception as e:
-                    # 处理目标提交的错误
-                    error_message = f"提交到 {target_url} 失败: {str(e)}"
-                    self._log_error(error_message)
-                    
-                    # 更新结果
+                if i not in pending and result.get("is_success") is None:
+                    # 多次中断仍未完成的目录不再尝试
                     result["is_success"] = False
                     result["submitted_at"] = datetime.now().isoformat()
-                    result["short_reason_if_failed"] = error_message[:100]
-                    
-                    # 保存更新后的提交
-                    self._save_submission(submission)
+                    result["short_reason_if_failed"] = f"已尝试 {result.get('attempts', 0)} 次仍未完成"
+                    result["retryable"] = False
+                    self._save_result(submission, i)
+            skipped = len(submission["results"]) - len(pending)
+            if skipped:
+                self._log_info(f"跳过 {skipped} 个已完成的目录，继续处理剩余 {len(pending)} 个")
+            
+            # 每个目标目录作为独立任务并发执行，结果完成后即写回提交。
+            # 按域名轮流创建任务，同一域名的目录不会排在一起
+            submission_slots = asyncio.Semaphore(self.max_concurrent_directories)
+            directory_urls = [result["directory_url"] for result in submission["results"]]
+            order = [i for i, _ in interleave_by_domain(directory_urls) if i in pending]
+            
+            # AI内容生成与浏览器提交流水线执行：后续目录的内容在当前目录提交期间提前生成
+            content_pipeline = self._create_content_pipeline(submission, order)
+            try:
+                tasks = [
+                    token.attach(asyncio.create_task(
+                        self._process_directory(submission, i, submission_slots, content_pipeline)
+                    ))
+                    for i in order
+                ]
+                # 被取消的目录任务以CancelledError结束，不影响其他目录
+                outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+                for outcome in outcomes:
+                    if isinstance(outcome, Exception):
+                        raise outcome
+            finally:
+                if content_pipeline:
+                    await content_pipeline.close()
+            
+            if token.abandoned:
+                # 提交已由其他工作进程接手，不写回任何状态
+                self._log_info(f"已放弃处理: {token.reason}")
+                return False
             
             # 完成所有提交后，更新整体状态
             # 检查是否所有提交都失败了
             all_failed = all(result["is_success"] is False for result in submission["results"])
-            if all_failed:
+            if token.cancelled:
+                self._mark_cancelled(submission, order, token.reason)
+                submission["status"] = "cancelled"
+                self._log_info(f"提交已取消: {token.reason}")
+            elif all_failed:
                 submission["status"] = "failed"
                 self._log_error(f"所有提交都失败，整体状态设为失败")
             else:
                 submission["status"] = "completed"
                 self._log_info(f"提交处理完成")
                 
-            self._save_submission(submission)
+            self._save_status(submission)
             
             return True
             
         except Exception as e:
             error_message = f"处理提交 {submission_id} 失败: {str(e)}"
             self._log_error(error_message)
+            if token.abandoned:
+                return False
             
             # 更新提交状态为失败
             try:
-                with open(submission_path, "r", encoding="utf-8") as f:
-                    submission = json.load(f)
+                submission = self.store.get_submission(submission_id)
                 submission["status"] = "failed"
                 
                 # 更新所有未处理的结果
-                for result in submission["results"]:
+                for i, result in enumerate(submission["results"]):
                     if result["is_success"] is None:
                         result["is_success"] = False
                         result["submitted_at"] = datetime.now().isoformat()
                         result["short_reason_if_failed"] = "处理过程中出现错误"
+                        result["retryable"] = True
+                        self._save_result(submission, i)
                 
-                self._save_submission(submission)
+                self._save_status(submission)
             except Exception as save_ex:
                 self._log_error(f"更新提交状态失败: {str(save_ex)}")
                 
             return False
         finally:
-            # 保持浏览器代理活跃，不关闭
             self._log_info(f"提交 {submission_id} 处理完毕")
     
-    async def _ai_submit_to_directory(self, submission: Dict[str, Any], result_index: int):
+    def _create_content_pipeline(self, submission: Dict[str, Any],
+                                 order: List[int]) -> Optional[PrefetchPipeline]:
+        """为提交创建AI内容预取流水线，未配置AI客户端时返回None
+        
+        Args:
+            submission: 提交信息
+            order: 目录的预计处理顺序（结果索引）
+        """
+        if not self.ai_client or not order:
+            return None
+        
+        form_fields = self._extract_form_fields(submission)
+        
+        async def produce_batch(result_indexes: List[int]):
+            # 同一批目录共用一次AI调用
+            target_urls = [submission["results"][i]["directory_url"] for i in result_indexes]
+            # 批量调用的用量按本批目录平分
+            with llm_directories(result_indexes):
+                contents = await self.ai_client.generate_batch_submission_content(form_fields, target_urls)
+            return {i: contents[url] for i, url in zip(result_indexes, target_urls)}
+        
+        pipeline = PrefetchPipeline(
+            order,
+            depth=self.content_prefetch_depth,
+            produce_batch=produce_batch,
+            batch_size=self.content_batch_size
+        )
+        # 生产端任务在启动时复制上下文：后台预取排在浏览器会话正在等待的调用之后，
+        # 而get()按需发起的生成沿用目录任务的上下文，保持交互优先级
+        with llm_priority(PRIORITY_BATCH):
+            pipeline.start()
+        return pipeline
+    
+    async def _process_directory(self, submission: Dict[str, Any], result_index: int,
+                                 submission_slots: asyncio.Semaphore,
+                                 content_pipeline: Optional[PrefetchPipeline] = None):
+        """租用浏览器会话处理单个目标目录
+        
+        Args:
+            submission: 提交信息
+            result_index: 目标结果索引
+            submission_slots: 当前提交的并发槽位
+            content_pipeline: AI内容预取流水线
+        """
+        result = submission["results"][result_index]
+        target_url = result["directory_url"]
+        
+        # 先等待域名槽位再占用并发槽位，冷却中的域名不会挡住其他目录
+        async with self.domain_scheduler.slot(extract_domain(target_url)), \
+                submission_slots, self._global_directory_slots:
+            # 每个目录任务有独立的上下文，此处设置的目录索引不影响其他任务
+            current_directory_index.set(result_index)
+            
+            # 记录日志
+            self._log_info(f"开始处理提交 {submission['id']} 到 {target_url}")
+            
+            # 记录尝试次数作为检查点，进程中断后据此限制重试
+            result["attempts"] = result.get("attempts", 0) + 1
+            result["is_success"] = None
+            result.pop("cancelled", None)
+            self._save_result(submission, result_index)
+            
+            try:
+                # 从浏览器池租用已预热的浏览器代理
+                async with self.browser_pool.lease() as browser_agent:
+                    self._log_info(f"已获取浏览器会话，准备提交到 {target_url}")
+                    
+                    try:
+                        # 如果有AI客户端，使用智能提交
+                        if self.ai_client:
+                            self._log_info(f"使用AI辅助提交到 {target_url}")
+                            await self._ai_submit_to_directory(submission, result_index, browser_agent,
+                                                               content_pipeline)
+                        else:
+                            # 否则使用普通提交
+                            self._log_info(f"使用普通提交到 {target_url}")
+                            await self._submit_to_directory(submission, result_index, browser_agent)
+                    except Exception as e:
+                        # 处理目标提交的错误
+                        error_message = f"提交到 {target_url} 失败: {str(e)}"
+                        self._log_error(error_message)
+                        
+                        # 更新结果
+                        result["is_success"] = False
+                        result["submitted_at"] = datetime.now().isoformat()
+                        result["short_reason_if_failed"] = error_message[:100]
+                        result["retryable"] = True
+                        
+                        # 保存更新后的提交
+                        self._save_result(submission, result_index)
+            except Exception as e:
+                # 浏览器启动失败，无法处理此目标
+                self._log_error(f"浏览器初始化异常，无法提交到 {target_url}: {str(e)}")
+                result["is_success"] = False
+                result["submitted_at"] = datetime.now().isoformat()
+                result["short_reason_if_failed"] = f"浏览器初始化异常: {str(e)[:80]}"
+                result["retryable"] = True
+                self._save_result(submission, result_index)
+            finally:
+                # 未使用的预取内容不再占用缓冲区
+                if content_pipeline:
+                    content_pipeline.discard(result_index)
+    
+    async def _ai_submit_to_directory(self, submission: Dict[str, Any], result_index: int,
+                                      browser_agent: Agent,
+                                      content_pipeline: Optional[PrefetchPipeline] = None):
         """使用AI辅助提交到目录网站
         
         Args:
             submission: 提交信息
             result_index: 目标结果索引
+            browser_agent: 该目录独占的浏览器代理
+            content_pipeline: AI内容预取流水线，提供时从中取预先生成的内容
         """
         # 获取目标结果对象
         result = submission["results"][result_index]
@@ -202,8 +400,11 @@ class SubmissionProcessor:
             # 1. 获取表单字段信息
             form_fields = self._extract_form_fields(submission)
             
-            # 2. 使用AI生成优化的提交内容
-            optimized_content = await self.ai_client.generate_submission_content(form_fields, target_url)
+            # 2. 使用AI生成优化的提交内容（优先使用流水线预取的结果）
+            if content_pipeline:
+                optimized_content = await content_pipeline.get(result_index)
+            else:
+                optimized_content = await self.ai_client.generate_submission_content(form_fields, target_url)
             
             # 3. 记录生成的内容
             log_path = f"logs/submissions/{submission['id']}_{result_index}_content.json"
@@ -212,9 +413,9 @@ class SubmissionProcessor:
             
             # 4. 根据目标网站调用不同的处理逻辑
             if "neilpatel" in target_url.lower():
-                submission_result = await self._submit_to_neilpatel(submission, result_index, form_fields, optimized_content)
+                submission_result = await self._submit_to_neilpatel(submission, result_index, form_fields, optimized_content, browser_agent)
             elif "aitoolslist" in target_url.lower():
-                submission_result = await self._submit_to_aitoolslist(submission, result_index, form_fields, optimized_content)
+                submission_result = await self._submit_to_aitoolslist(submission, result_index, form_fields, optimized_content, browser_agent)
             else:
                 # 通用提交处理
                 task_description = f"提交产品 {submission['product_name']} 到 {target_url}"
@@ -235,7 +436,7 @@ class SubmissionProcessor:
                         enhanced_form_fields['product_tags'] = optimized_content['tags']
                 
                 # 6. 执行表单提交
-                submission_result = await self.browser_agent.run(
+                submission_result = await browser_agent.run(
                     task_description=task_description,
                     form_data=enhanced_form_fields,
                     target_url=target_url,
@@ -246,13 +447,14 @@ class SubmissionProcessor:
             result["has_submission_form"] = submission_result.has_submission_form
             result["is_success"] = submission_result.is_success
             result["submitted_at"] = datetime.now().isoformat()
+            result["retryable"] = False
             result["ai_enhanced"] = True
             
             if not submission_result.is_success:
                 result["short_reason_if_failed"] = submission_result.short_reason_if_failed
             
-            # 保存更新后的提交
-            self._save_submission(submission)
+            # 保存更新后的结果
+            self._save_result(submission, result_index)
             
             # 记录日志
             status = "成功" if submission_result.is_success else "失败"
@@ -267,16 +469,19 @@ class SubmissionProcessor:
             result["is_success"] = False
             result["submitted_at"] = datetime.now().isoformat()
             result["short_reason_if_failed"] = error_message[:100]  # 截断错误信息
+            result["retryable"] = True
             
-            # 保存更新后的提交
-            self._save_submission(submission)
+            # 保存更新后的结果
+            self._save_result(submission, result_index)
     
-    async def _submit_to_directory(self, submission: Dict[str, Any], result_index: int):
+    async def _submit_to_directory(self, submission: Dict[str, Any], result_index: int,
+                                   browser_agent: Agent):
         """使用浏览器代理直接提交到目录网站
         
         Args:
             submission: 提交信息
             result_index: 目标结果索引
+            browser_agent: 该目录独占的浏览器代理
         """
         # 获取目标结果对象
         result = submission["results"][result_index]
@@ -292,7 +497,7 @@ class SubmissionProcessor:
             # 2. 使用浏览器代理执行提交
             task_description = f"提交产品 {submission['product_name']} 到 {target_url}"
             
-            submission_result = await self.browser_agent.run(
+            submission_result = await browser_agent.run(
                 task_description=task_description,
                 form_data=form_fields,
                 target_url=target_url,
@@ -303,12 +508,13 @@ class SubmissionProcessor:
             result["has_submission_form"] = submission_result.has_submission_form
             result["is_success"] = submission_result.is_success
             result["submitted_at"] = datetime.now().isoformat()
+            result["retryable"] = False
             
             if not submission_result.is_success:
                 result["short_reason_if_failed"] = submission_result.short_reason_if_failed
             
-            # 保存更新后的提交
-            self._save_submission(submission)
+            # 保存更新后的结果
+            self._save_result(submission, result_index)
             
             # 记录日志
             status = "成功" if submission_result.is_success else "失败"
@@ -323,20 +529,48 @@ class SubmissionProcessor:
             result["is_success"] = False
             result["submitted_at"] = datetime.now().isoformat()
             result["short_reason_if_failed"] = error_message[:100]  # 截断错误信息
+            result["retryable"] = True
             
-            # 保存更新后的提交
-            self._save_submission(submission)
+            # 保存更新后的结果
+            self._save_result(submission, result_index)
+    
+    def _mark_cancelled(self, submission: Dict[str, Any], result_indexes: List[int], reason: str):
+        """将被取消而未完成的目录结果标记为已取消，重新开始时会再次处理"""
+        for i in result_indexes:
+            result = submission["results"][i]
+            if result.get("is_success") is None:
+                result["is_success"] = False
+                result["submitted_at"] = datetime.now().isoformat()
+                result["short_reason_if_failed"] = f"已取消: {reason}"
+                result["cancelled"] = True
+                result["retryable"] = True
+                self._save_result(submission, i)
+    
+    def _needs_processing(self, result: Dict[str, Any]) -> bool:
+        """判断目录结果是否需要（重新）处理
+        
+        未处理和被取消的结果需要处理；因异常失败且尝试次数未用完的结果可以重试；
+        已成功或由代理判定失败的结果不再重复提交。
+        """
+        if result.get("cancelled"):
+            return True
+        if result.get("is_success") is None:
+            return result.get("attempts", 0) < self.max_directory_attempts
+        if result.get("is_success") is False and result.get("retryable"):
+            return result.get("attempts", 1) < self.max_directory_attempts
+        return False
     
     async def shutdown(self):
         """关闭处理器并释放资源"""
-        if self.browser_agent:
+        try:
+            await self.browser_pool.close()
+        except Exception as e:
+            self._log_error(f"关闭浏览器池失败: {str(e)}")
+        if self.ai_client:
             try:
-                await self.browser_agent.close()
-                self._log_info("浏览器代理已关闭")
+                await self.ai_client.aclose()
             except Exception as e:
-                self._log_error(f"关闭浏览器代理失败: {str(e)}")
-            finally:
-                self.browser_agent = None
+                self._log_error(f"关闭AI客户端失败: {str(e)}")
         return True
     
     def _extract_form_fields(self, submission: Dict[str, Any]) -> Dict[str, Any]:
@@ -370,42 +604,46 @@ class SubmissionProcessor:
         
         return form_fields
     
-    def _save_submission(self, submission):
-        """保存提交信息到文件"""
+    def _save_result(self, submission: Dict[str, Any], result_index: int):
+        """保存单个目录的提交结果，已放弃的提交不再写回"""
+        if self._is_abandoned(submission["id"]):
+            return
+        try:
+            self.store.update_result(submission["id"], result_index, submission["results"][result_index])
+        except Exception as e:
+            self._log_error(f"保存提交 {submission['id']} 的结果 {result_index} 失败: {str(e)}")
+    
+    def _save_status(self, submission: Dict[str, Any]):
+        """保存提交整体状态，并导出兼容的JSON文件，已放弃的提交不再写回"""
+        if self._is_abandoned(submission["id"]):
+            return
         try:
-            with open(f"submissions/{submission['id']}.json", "w", encoding="utf-8") as f:
-                json.dump(submission, f, indent=2, ensure_ascii=False)
+            self.store.update_status(submission["id"], submission["status"])
+            self.store.export_json(submission["id"])
         except Exception as e:
             self._log_error(f"保存提交 {submission['id']} 失败: {str(e)}")
     
-    def _log_info(self, message):
+    def _log_info(self, message, submission_id: Optional[str] = None,
+                  directory_index: Optional[int] = None):
         """记录信息日志"""
-        timestamp = datetime.now().isoformat()
-        print(f"[INFO] {timestamp}: {message}")
-        self._append_log("info", message)
+        self._append_log("info", message, submission_id, directory_index)
     
-    def _log_error(self, message):
+    def _log_error(self, message, submission_id: Optional[str] = None,
+                   directory_index: Optional[int] = None):
         """记录错误日志"""
-        timestamp = datetime.now().isoformat()
-        print(f"[ERROR] {timestamp}: {message}")
-        self._append_log("error", message)
+        self._append_log("error", message, submission_id, directory_index)
     
-    def _append_log(self, level, message):
-        """添加日志到日志文件"""
-        log_file = f"logs/submitter_{datetime.now().strftime('%Y-%m-%d')}.log"
-        try:
-            # 确保日志目录存在
-            os.makedirs(os.path.dirname(log_file), exist_ok=True)
-            
-            with open(log_file, "a", encoding="utf-8") as f:
-                timestamp = datetime.now().isoformat()
-                f.write(f"[{level.upper()}] {timestamp}: {message}\n")
-        except:
-            # 忽略日志写入错误
-            pass
+    def _append_log(self, level, message, submission_id: Optional[str] = None,
+                    directory_index: Optional[int] = None):
+        """将日志放入后台写入队列，控制台回显也由后台线程完成
+        
+        未指定的提交ID和目录索引取自当前任务上下文。
+        """
+        self.log_sink.emit(level, message, submission_id, directory_index)
     
     async def _submit_to_neilpatel(self, submission: Dict[str, Any], result_index: int, 
-                           form_fields: Dict[str, Any], optimized_content: Dict[str, Any]) -> SubmissionResult:
+                           form_fields: Dict[str, Any], optimized_content: Dict[str, Any],
+                           browser_agent: Agent) -> SubmissionResult:
         """提交到Neil Patel AI Tools目录
         
         Args:
@@ -413,6 +651,7 @@ class SubmissionProcessor:
             result_index: 结果索引
             form_fields: 基础表单字段
             optimized_content: AI优化的内容
+            browser_agent: 该目录独占的浏览器代理
             
         Returns:
             提交结果
@@ -420,19 +659,6 @@ class SubmissionProcessor:
         target_url = submission["results"][result_index]["directory_url"]
         self._log_info(f"使用专用逻辑提交到Neil Patel AI Tools目录: {target_url}")
         
-        # 创建浏览器代理（如果还没有）
-        if not self.browser_agent:
-            # 创建浏览器配置
-            browser_config = BrowserConfig(
-                headless=True,  # 无界面模式
-                timeout=60000,  # 60秒超时
-                viewport_width=1280,
-                viewport_height=800
-            )
-            
-            # 创建浏览器代理
-            self.browser_agent = Agent(browser_config=browser_config)
-        
         # 1. 构建Neil Patel专用表单数据
         np_form_fields = {
             "tool_name": form_fields["product_name"],
@@ -457,7 +683,7 @@ class SubmissionProcessor:
         
         # 2. 执行表单提交
         task_description = f"提交产品 {submission['product_name']} 到 Neil Patel AI Tools目录"
-        submission_result = await self.browser_agent.run(
+        submission_result = await browser_agent.run(
             task_description=task_description,
             form_data=np_form_fields,
             target_url=target_url,
@@ -467,7 +693,8 @@ class SubmissionProcessor:
         return submission_result
     
     async def _submit_to_aitoolslist(self, submission: Dict[str, Any], result_index: int, 
-                             form_fields: Dict[str, Any], optimized_content: Dict[str, Any]) -> SubmissionResult:
+                             form_fields: Dict[str, Any], optimized_content: Dict[str, Any],
+                             browser_agent: Agent) -> SubmissionResult:
         """提交到AI Tools List目录
         
         Args:
@@ -475,6 +702,7 @@ class SubmissionProcessor:
             result_index: 结果索引
             form_fields: 基础表单字段
             optimized_content: AI优化的内容
+            browser_agent: 该目录独占的浏览器代理
             
         Returns:
             提交结果
@@ -482,19 +710,6 @@ class SubmissionProcessor:
         target_url = submission["results"][result_index]["directory_url"]
         self._log_info(f"使用专用逻辑提交到AI Tools List目录: {target_url}")
         
-        # 创建浏览器代理（如果还没有）
-        if not self.browser_agent:
-            # 创建浏览器配置
-            browser_config = BrowserConfig(
-                headless=True,  # 无界面模式
-                timeout=60000,  # 60秒超时
-                viewport_width=1280,
-                viewport_height=800
-            )
-            
-            # 创建浏览器代理
-            self.browser_agent = Agent(browser_config=browser_config)
-        
         # 1. 构建AI Tools List专用表单数据
         atl_form_fields = {
             "tool_name": form_fields["product_name"],
@@ -519,7 +734,7 @@ class SubmissionProcessor:
         
         # 2. 执行表单提交
         task_description = f"提交产品 {submission['product_name']} 到 AI Tools List目录"
-        submission_result = await self.browser_agent.run(
+        submission_result = await browser_agent.run(
             task_description=task_description,
             form_data=atl_form_fields,
             target_url=target_url,
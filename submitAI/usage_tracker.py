@@ -0,0 +1,244 @@
+"""
+LLM用量统计模块，记录每次调用的令牌数、耗时和估算费用
+
+每条记录带有提交ID、目录索引（取自日志上下文）和调用用途，
+可按提交、目录和用途汇总，用于找出消耗最多费用和时间的提示词与目录。
+一次调用为多个目录批量生成内容时，按目录拆成多条记录平分用量，这些记录共用同一个调用ID。
+"""
+
+import contextvars
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from .log_sink import current_directory_index, current_submission_id
+
+DEFAULT_DB_PATH = os.getenv("LLM_USAGE_DB", "data/llm_usage.db")
+
+# 每百万令牌的价格（美元）：(输入, 输出)，可通过环境变量LLM_PRICING以JSON覆盖或补充
+DEFAULT_PRICING = {
+    "gpt-3.5-turbo": (0.5, 1.5),
+    "gpt-4o-mini": (0.15, 0.6),
+    "gpt-4o": (2.5, 10.0),
+    "grok-3-latest": (3.0, 15.0),
+    "grok-3-mini-latest": (0.3, 0.5),
+}
+
+current_llm_purpose: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "current_llm_purpose", default=None
+)
+
+current_llm_directories: contextvars.ContextVar[Optional[List[int]]] = contextvars.ContextVar(
+    "current_llm_directories", default=None
+)
+
+
+@contextmanager
+def llm_purpose(purpose: str):
+    """在当前上下文中标记LLM调用的用途（外层已有标记时保留外层）"""
+    if current_llm_purpose.get() is not None:
+        yield
+        return
+    token = current_llm_purpose.set(purpose)
+    try:
+        yield
+    finally:
+        current_llm_purpose.reset(token)
+
+
+@contextmanager
+def llm_directories(indexes: List[int]):
+    """在当前上下文中标记LLM调用所服务的目录，用量按这些目录平分"""
+    token = current_llm_directories.set(list(indexes))
+    try:
+        yield
+    finally:
+        current_llm_directories.reset(token)
+
+
+def _split(total: int, parts: int) -> List[int]:
+    """把整数尽量平均地分成parts份，余数分给前几份"""
+    base, extra = divmod(int(total), parts)
+    return [base + (1 if i < extra else 0) for i in range(parts)]
+
+
+def _load_pricing() -> Dict[str, tuple]:
+    pricing = dict(DEFAULT_PRICING)
+    override = os.getenv("LLM_PRICING")
+    if override:
+        try:
+            for model, prices in json.loads(override).items():
+                pricing[model] = (float(prices[0]), float(prices[1]))
+        except Exception as e:
+            print(f"解析LLM_PRICING失败: {str(e)}")
+    return pricing
+
+
+class UsageTracker:
+    """LLM调用用量的SQLite存储"""
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, enabled: bool = True):
+        """初始化存储
+
+        Args:
+            db_path: SQLite数据库文件路径
+            enabled: 是否记录用量
+        """
+        self.db_path = db_path
+        self.enabled = enabled
+        self.pricing = _load_pricing()
+        self._local = threading.local()
+
+        if enabled:
+            db_dir = os.path.dirname(db_path)
+            if db_dir:
+                os.makedirs(db_dir, exist_ok=True)
+            self._init_db()
+
+    def _conn(self) -> sqlite3.Connection:
+        """获取当前线程的数据库连接"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def _init_db(self) -> None:
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_usage (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                submission_id TEXT,
+                directory_index INTEGER,
+                purpose TEXT,
+                provider TEXT,
+                model TEXT,
+                prompt_tokens INTEGER NOT NULL DEFAULT 0,
+                completion_tokens INTEGER NOT NULL DEFAULT 0,
+                latency_ms INTEGER NOT NULL DEFAULT 0,
+                cost_usd REAL NOT NULL DEFAULT 0,
+                cached INTEGER NOT NULL DEFAULT 0,
+                estimated INTEGER NOT NULL DEFAULT 0,
+                success INTEGER NOT NULL DEFAULT 1,
+                created_at REAL NOT NULL,
+                call_id TEXT
+            )
+        """)
+        # 旧版数据库没有call_id列
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(llm_usage)")}
+        if "call_id" not in columns:
+            conn.execute("ALTER TABLE llm_usage ADD COLUMN call_id TEXT")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_usage_submission ON llm_usage (submission_id)")
+
+    def estimate_cost(self, model: str, prompt_tokens: int, completion_tokens: int) -> float:
+        """按模型价格估算费用（美元），未知模型按0计"""
+        input_price, output_price = self.pricing.get(model, (0.0, 0.0))
+        return (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+
+    def record(self, provider: str, model: str, prompt_tokens: int = 0, completion_tokens: int = 0,
+               latency: float = 0.0, cached: bool = False, estimated: bool = False,
+               success: bool = True, submission_id: Optional[str] = None,
+               directory_index: Optional[int] = None, purpose: Optional[str] = None) -> None:
+        """记录一次调用，未指定的提交ID、目录索引和用途取自当前上下文
+
+        未指定目录索引而上下文标记了多个目录（批量生成）时，每个目录记录一条，
+        令牌数、耗时和费用在这些目录间平分。
+
+        Args:
+            provider: 提供方名称
+            model: 模型名称
+            prompt_tokens: 输入令牌数
+            completion_tokens: 输出令牌数
+            latency: 耗时秒数
+            cached: 是否命中响应缓存
+            estimated: 令牌数是否为估算值（流式提前结束时接口不返回用量）
+            success: 调用是否成功
+        """
+        if not self.enabled:
+            return
+        directories = current_llm_directories.get() if directory_index is None else None
+        if not directories:
+            directories = [directory_index if directory_index is not None else current_directory_index.get()]
+        parts = len(directories)
+        call_id = uuid.uuid4().hex if parts > 1 else None
+        submission_id = submission_id if submission_id is not None else current_submission_id.get()
+        purpose = purpose or current_llm_purpose.get() or "other"
+        created_at = time.time()
+
+        rows = []
+        for index, prompt_part, completion_part, latency_part in zip(
+                directories, _split(prompt_tokens, parts), _split(completion_tokens, parts),
+                _split(latency * 1000, parts)):
+            cost = 0.0 if cached else self.estimate_cost(model, prompt_part, completion_part)
+            rows.append((
+                submission_id, index, purpose, provider, model,
+                prompt_part, completion_part, latency_part,
+                cost, int(cached), int(estimated), int(success), created_at, call_id,
+            ))
+        self._conn().executemany(
+            "INSERT INTO llm_usage (submission_id, directory_index, purpose, provider, model, "
+            "prompt_tokens, completion_tokens, latency_ms, cost_usd, cached, estimated, success, created_at, call_id) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            rows
+        )
+
+    def _aggregate(self, group_by: Optional[str], submission_id: str) -> List[Dict[str, Any]]:
+        columns = f"{group_by}, " if group_by else ""
+        # 批量调用拆成的多条记录按调用ID只计一次调用，令牌数、耗时和费用照常求和
+        call = "COALESCE(call_id, id)"
+        rows = self._conn().execute(
+            f"SELECT {columns}COUNT(DISTINCT {call}) AS calls, "
+            f"COUNT(DISTINCT CASE WHEN cached = 1 THEN {call} END) AS cached_calls, "
+            "SUM(prompt_tokens) AS prompt_tokens, SUM(completion_tokens) AS completion_tokens, "
+            "SUM(latency_ms) AS latency_ms, MAX(latency_ms) AS max_latency_ms, "
+            f"SUM(cost_usd) AS cost_usd, COUNT(DISTINCT CASE WHEN success = 0 THEN {call} END) AS failed_calls "
+            f"FROM llm_usage WHERE submission_id = ?"
+            + (f" GROUP BY {group_by} ORDER BY cost_usd DESC, latency_ms DESC" if group_by else ""),
+            (submission_id,)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def summary(self, submission_id: str) -> Dict[str, Any]:
+        """汇总一个提交的用量
+
+        Returns:
+            包含total、by_directory、by_purpose和by_provider的字典
+        """
+        if not self.enabled:
+            return {"total": {}, "by_directory": [], "by_purpose": [], "by_provider": []}
+        total = self._aggregate(None, submission_id)
+        return {
+            "total": total[0] if total and total[0]["calls"] else {},
+            "by_directory": self._aggregate("directory_index", submission_id),
+            "by_purpose": self._aggregate("purpose", submission_id),
+            "by_provider": self._aggregate("provider", submission_id),
+        }
+
+    def delete_submission(self, submission_id: str) -> None:
+        """删除一个提交的用量记录"""
+        if self.enabled:
+            self._conn().execute("DELETE FROM llm_usage WHERE submission_id = ?", (submission_id,))
+
+
+_default_tracker: Optional[UsageTracker] = None
+_default_tracker_lock = threading.Lock()
+
+
+def get_usage_tracker() -> UsageTracker:
+    """获取进程内共享的用量统计，配置来自环境变量"""
+    global _default_tracker
+    with _default_tracker_lock:
+        if _default_tracker is None:
+            _default_tracker = UsageTracker(
+                enabled=os.getenv("LLM_USAGE_ENABLED", "true").lower() not in ("0", "false", "no"),
+            )
+        return _default_tracker
@@ -0,0 +1,273 @@
+"""
+提交任务工作进程模块
+
+从持久化任务队列领取提交任务并执行，可独立于Web进程运行：
+
+    python -m submitAI.worker --workers 4
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from typing import Any, Dict, List, Optional
+
+from .job_queue import JobQueue, DEFAULT_DB_PATH, JOB_QUEUED, JOB_RUNNING, JOB_CANCELLED
+from .submission_store import SubmissionStore
+from .llm_router import create_llm_client
+from .submitter import SubmissionProcessor
+
+
+def create_processor() -> SubmissionProcessor:
+    """根据环境变量创建提交处理器"""
+    return SubmissionProcessor(
+        ai_client=create_llm_client(),
+        max_concurrent_directories=int(os.getenv("SUBMISSION_CONCURRENCY", "3")),
+        max_global_directories=int(os.getenv("GLOBAL_SUBMISSION_CONCURRENCY", "6")),
+        browser_recycle_after=int(os.getenv("BROWSER_RECYCLE_AFTER", "20")),
+        content_prefetch_depth=int(os.getenv("CONTENT_PREFETCH_DEPTH", "2")),
+        content_batch_size=int(os.getenv("CONTENT_BATCH_SIZE", "4"))
+    )
+
+
+def recover_orphaned_submissions(store: SubmissionStore, queue: JobQueue) -> int:
+    """重新入队处于running状态但没有排队或运行中任务的提交
+    
+    进程在入队前崩溃、或任务用完尝试次数后，提交会一直停留在running状态。
+    重新入队后处理器只会继续处理未完成和可重试的目录。
+    
+    Returns:
+        重新入队的提交数
+    """
+    queue.requeue_expired()
+    recovered = 0
+    for submission in store.list_submissions(status="running"):
+        jobs = queue.jobs_for_submission(submission["id"])
+        if any(job["status"] in (JOB_QUEUED, JOB_RUNNING) for job in jobs):
+            continue
+        if jobs and jobs[0]["status"] == JOB_CANCELLED:
+            # 工作进程在取消过程中退出
+            store.update_status(submission["id"], "cancelled")
+            continue
+        queue.enqueue(submission["id"])
+        recovered += 1
+        print(f"提交 {submission['id']} 处于中断状态，已重新入队")
+    return recovered
+
+
+class SubmissionWorker:
+    """在单个进程内循环领取并执行提交任务"""
+
+    def __init__(self, worker_id: str, queue: JobQueue, processor: SubmissionProcessor,
+                 max_jobs: int = 1, poll_interval: float = 2.0):
+        """初始化工作者
+
+        Args:
+            worker_id: 工作者标识，写入任务租约
+            queue: 任务队列
+            processor: 提交处理器
+            max_jobs: 同时执行的任务数上限
+            poll_interval: 队列为空时的轮询间隔（秒）
+        """
+        self.worker_id = worker_id
+        self.queue = queue
+        self.processor = processor
+        self.max_jobs = max(1, max_jobs)
+        self.poll_interval = poll_interval
+        self._running: Dict[str, asyncio.Task] = {}
+        self._stopping = False
+
+    async def run(self) -> None:
+        """持续领取任务，直到调用stop()"""
+        print(f"[{self.worker_id}] 工作进程已启动")
+        try:
+            while not self._stopping:
+                claimed = False
+                while len(self._running) < self.max_jobs and not self._stopping:
+                    job = await asyncio.to_thread(self.queue.claim, self.worker_id)
+                    if not job:
+                        break
+                    claimed = True
+                    task = asyncio.create_task(self._run_job(job))
+                    self._running[job["id"]] = task
+                    task.add_done_callback(lambda _, job_id=job["id"]: self._running.pop(job_id, None))
+
+                if not claimed:
+                    await asyncio.sleep(self.poll_interval)
+        finally:
+            for task in list(self._running.values()):
+                task.cancel()
+            if self._running:
+                await asyncio.gather(*self._running.values(), return_exceptions=True)
+            await self.processor.shutdown()
+            print(f"[{self.worker_id}] 工作进程已停止")
+
+    def stop(self) -> None:
+        """停止领取新任务，并中止正在执行的任务"""
+        self._stopping = True
+
+    async def _heartbeat(self, job_id: str, submission_id: str) -> None:
+        """定期续约，防止任务被其他工作进程重新领取；同时检查取消请求
+        
+        单次数据库错误（如database is locked）只记录日志，下个周期重试；
+        租约丢失说明任务已被放回队列，立即放弃本进程中的提交且不再写回结果，避免重复提交和覆盖新的处理进度。
+        """
+        interval = max(1, self.queue.lease_seconds // 3)
+        last_renewed = time.monotonic()
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                if await asyncio.to_thread(self.queue.is_cancel_requested, job_id):
+                    self.processor.cancel_submission(submission_id)
+                
+                if time.monotonic() - last_renewed >= interval:
+                    still_owned = await asyncio.to_thread(self.queue.heartbeat, job_id, self.worker_id)
+                    if not still_owned:
+                        print(f"[{self.worker_id}] 任务 {job_id} 的租约已丢失，放弃提交 {submission_id}")
+                        self.processor.abandon_submission(submission_id, "任务租约已丢失")
+                        return
+                    last_renewed = time.monotonic()
+            except Exception as e:
+                print(f"[{self.worker_id}] 任务 {job_id} 续约失败，稍后重试: {str(e)}")
+
+    async def _run_job(self, job: Dict[str, Any]) -> None:
+        job_id = job["id"]
+        submission_id = job["submission_id"]
+        print(f"[{self.worker_id}] 领取任务 {job_id}（提交 {submission_id}，第 {job['attempts']} 次尝试）")
+
+        heartbeat = asyncio.create_task(self._heartbeat(job_id, submission_id))
+        try:
+            await self.processor.process_submission(submission_id)
+            if await asyncio.to_thread(self.queue.is_cancel_requested, job_id):
+                await asyncio.to_thread(self.queue.mark_cancelled, job_id, self.worker_id)
+                print(f"[{self.worker_id}] 任务 {job_id} 已取消")
+            else:
+                await asyncio.to_thread(self.queue.complete, job_id, self.worker_id)
+                print(f"[{self.worker_id}] 任务 {job_id} 完成")
+        except asyncio.CancelledError:
+            # 进程停止时立即放回队列，由其他工作进程接手
+            await asyncio.to_thread(self.queue.fail, job_id, self.worker_id, "工作进程停止", True)
+            raise
+        except Exception as e:
+            print(f"[{self.worker_id}] 任务 {job_id} 失败: {str(e)}")
+            await asyncio.to_thread(self.queue.fail, job_id, self.worker_id, str(e), True)
+        finally:
+            heartbeat.cancel()
+
+
+async def _run_worker_process(worker_id: str, db_path: str, max_jobs: int) -> None:
+    worker = SubmissionWorker(worker_id, JobQueue(db_path), create_processor(), max_jobs=max_jobs)
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, worker.stop)
+        except NotImplementedError:
+            # Windows不支持add_signal_handler
+            pass
+
+    await worker.run()
+
+
+def _worker_main(worker_id: str, db_path: str, max_jobs: int) -> None:
+    """工作进程入口"""
+    # 每个工作进程写入自己的日志文件，避免多个进程同时轮转同一个文件
+    os.environ["LOG_FILE_SUFFIX"] = str(os.getpid())
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass
+    asyncio.run(_run_worker_process(worker_id, db_path, max_jobs))
+
+
+class WorkerSupervisor:
+    """启动并看护多个工作进程，进程意外退出时自动重启"""
+
+    def __init__(self, num_workers: int, db_path: str = DEFAULT_DB_PATH, jobs_per_worker: int = 1):
+        """初始化看护器
+
+        Args:
+            num_workers: 工作进程数
+            db_path: 任务队列数据库路径
+            jobs_per_worker: 每个工作进程同时执行的任务数
+        """
+        self.num_workers = num_workers
+        self.db_path = db_path
+        self.jobs_per_worker = jobs_per_worker
+        self._ctx = multiprocessing.get_context("spawn")
+        self._processes: List[Optional[multiprocessing.Process]] = [None] * num_workers
+
+    def _spawn(self, index: int) -> None:
+        worker_id = f"{socket.gethostname()}-{os.getpid()}-w{index}-{int(time.time())}"
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(worker_id, self.db_path, self.jobs_per_worker),
+            name=f"submission-worker-{index}",
+            daemon=True
+        )
+        process.start()
+        self._processes[index] = process
+
+    def start(self) -> None:
+        """启动全部工作进程"""
+        for index in range(self.num_workers):
+            self._spawn(index)
+
+    def check(self) -> int:
+        """重启已退出的工作进程
+
+        Returns:
+            本次重启的进程数
+        """
+        restarted = 0
+        for index, process in enumerate(self._processes):
+            if process is None or not process.is_alive():
+                if process is not None:
+                    print(f"工作进程 {process.name} 已退出（退出码 {process.exitcode}），正在重启")
+                self._spawn(index)
+                restarted += 1
+        return restarted
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """通知全部工作进程退出并等待结束"""
+        for process in self._processes:
+            if process is not None and process.is_alive():
+                process.terminate()
+        for process in self._processes:
+            if process is not None:
+                process.join(timeout)
+                if process.is_alive():
+                    process.kill()
+        self._processes = [None] * self.num_workers
+
+
+def main():
+    parser = argparse.ArgumentParser(description="提交任务工作进程")
+    parser.add_argument("--workers", "-w", type=int, default=int(os.getenv("SUBMISSION_WORKERS", "2")),
+                        help="工作进程数")
+    parser.add_argument("--jobs-per-worker", "-j", type=int, default=int(os.getenv("JOBS_PER_WORKER", "1")),
+                        help="每个工作进程同时执行的任务数")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="任务队列数据库路径")
+    args = parser.parse_args()
+
+    recover_orphaned_submissions(SubmissionStore(), JobQueue(args.db))
+
+    supervisor = WorkerSupervisor(args.workers, args.db, args.jobs_per_worker)
+    supervisor.start()
+    print(f"已启动 {args.workers} 个工作进程")
+    try:
+        while True:
+            time.sleep(5)
+            supervisor.check()
+    except KeyboardInterrupt:
+        print("正在停止工作进程...")
+    finally:
+        supervisor.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -29,6 +29,8 @@ async def test_openai_client():
             
     except Exception as e:
         print(f"错误: {str(e)}")
+    finally:
+        await client.aclose()
 
 if __name__ == "__main__":
     asyncio.run(test_openai_client()) 
\ No newline at end of file
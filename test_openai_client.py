@@ -34,6 +34,8 @@ async def main(api_key: str):
         
     except Exception as e:
         print(f"请求失败，错误: {str(e)}")
+    finally:
+        await client.aclose()
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='测试 OpenAI API 连接')